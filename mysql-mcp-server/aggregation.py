@@ -0,0 +1,440 @@
+"""
+Compile structured aggregation specs into parameterized GROUP BY SQL
+"""
+
+import re
+import math
+import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+METRIC_FUNCTIONS = ("count", "sum", "avg", "min", "max", "count_distinct")
+
+FILTER_OPERATORS = (
+    "=", "!=", "<", "<=", ">", ">=",
+    "in", "not_in", "between", "like", "is_null", "is_not_null",
+)
+
+TIME_BUCKETS = ("minute", "hour", "day", "week", "month", "quarter", "year")
+
+NUMERIC_TYPES = {
+    "tinyint", "smallint", "mediumint", "int", "integer", "bigint",
+    "decimal", "numeric", "float", "double", "real", "bit", "year",
+}
+TEMPORAL_TYPES = {"date", "datetime", "timestamp"}
+
+_ALIAS = re.compile(r"^[A-Za-z_][A-Za-z0-9_]{0,63}$")
+
+MAX_GROUPS = 1000
+
+
+class AggregationSpecError(ValueError):
+    """Raised when an aggregation spec references unknown columns or operations"""
+
+
+def _quote(identifier: str) -> str:
+    return "`" + identifier.replace("`", "``") + "`"
+
+
+class ColumnCatalog:
+    """Case-insensitive lookup of a table's columns and their data types"""
+
+    def __init__(self, columns: List[Dict[str, Any]]):
+        self._columns = {
+            column["COLUMN_NAME"].lower(): (
+                column["COLUMN_NAME"],
+                (column.get("DATA_TYPE") or "").lower(),
+            )
+            for column in columns
+        }
+
+    def __contains__(self, name: str) -> bool:
+        return isinstance(name, str) and name.lower() in self._columns
+
+    def resolve(self, name: Any, role: str) -> Tuple[str, str]:
+        """Return ``(column_name, data_type)`` or raise for an unknown column"""
+        if not isinstance(name, str) or name.lower() not in self._columns:
+            raise AggregationSpecError(f"Unknown {role} column '{name}'")
+        return self._columns[name.lower()]
+
+
+def bucket_expression(column_sql: str, granularity: str) -> str:
+    """SQL truncating a DATE/DATETIME column to the start of its bucket"""
+    if granularity == "minute":
+        return f"DATE_FORMAT({column_sql}, '%Y-%m-%d %H:%i:00')"
+    if granularity == "hour":
+        return f"DATE_FORMAT({column_sql}, '%Y-%m-%d %H:00:00')"
+    if granularity == "day":
+        return f"DATE({column_sql})"
+    if granularity == "week":
+        # Weeks start on Monday
+        return f"DATE_SUB(DATE({column_sql}), INTERVAL WEEKDAY({column_sql}) DAY)"
+    if granularity == "month":
+        return f"DATE_FORMAT({column_sql}, '%Y-%m-01')"
+    if granularity == "quarter":
+        return (
+            f"MAKEDATE(YEAR({column_sql}), 1) + INTERVAL (QUARTER({column_sql}) - 1) QUARTER"
+        )
+    if granularity == "year":
+        return f"DATE_FORMAT({column_sql}, '%Y-01-01')"
+    raise AggregationSpecError(
+        f"Unknown time bucket '{granularity}', expected one of {TIME_BUCKETS}"
+    )
+
+
+def metric_alias(metric: Dict[str, Any]) -> str:
+    alias = metric.get("alias")
+    if alias:
+        return alias
+    column = metric.get("column")
+    if not column or column == "*":
+        return metric["fn"]
+    return f"{metric['fn']}_{column}"
+
+
+def normalize_metrics(metrics: Optional[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Default to COUNT(*) and normalize function names"""
+    if not metrics:
+        return [{"fn": "count", "column": None}]
+    normalized = []
+    for metric in metrics:
+        if not isinstance(metric, dict):
+            raise AggregationSpecError(f"Metric must be an object, got {metric!r}")
+        fn = str(metric.get("fn") or metric.get("function") or "").lower()
+        if fn not in METRIC_FUNCTIONS:
+            raise AggregationSpecError(
+                f"Unknown metric function '{fn}', expected one of {METRIC_FUNCTIONS}"
+            )
+        normalized.append(
+            {"fn": fn, "column": metric.get("column"), "alias": metric.get("alias")}
+        )
+    return normalized
+
+
+def compile_filters(
+    filters: Optional[List[Dict[str, Any]]], catalog: ColumnCatalog
+) -> Tuple[List[str], List[Any]]:
+    """WHERE conditions and their parameters; values are never inlined"""
+    conditions: List[str] = []
+    params: List[Any] = []
+    for spec in filters or []:
+        if not isinstance(spec, dict):
+            raise AggregationSpecError(f"Filter must be an object, got {spec!r}")
+        column, _ = catalog.resolve(spec.get("column"), "filter")
+        column_sql = _quote(column)
+        op = str(spec.get("op", "=")).lower()
+        value = spec.get("value")
+
+        if op not in FILTER_OPERATORS:
+            raise AggregationSpecError(
+                f"Unknown filter operator '{op}', expected one of {FILTER_OPERATORS}"
+            )
+        if op == "is_null":
+            conditions.append(f"{column_sql} IS NULL")
+        elif op == "is_not_null":
+            conditions.append(f"{column_sql} IS NOT NULL")
+        elif op in ("in", "not_in"):
+            if not isinstance(value, list) or not value:
+                raise AggregationSpecError(f"'{op}' filter on '{column}' needs a non-empty list")
+            placeholders = ", ".join(["%s"] * len(value))
+            keyword = "IN" if op == "in" else "NOT IN"
+            conditions.append(f"{column_sql} {keyword} ({placeholders})")
+            params.extend(value)
+        elif op == "between":
+            if not isinstance(value, list) or len(value) != 2:
+                raise AggregationSpecError(f"'between' filter on '{column}' needs [low, high]")
+            conditions.append(f"{column_sql} BETWEEN %s AND %s")
+            params.extend(value)
+        elif op == "like":
+            conditions.append(f"{column_sql} LIKE %s")
+            params.append(value)
+        else:
+            if value is None or isinstance(value, (list, dict)):
+                raise AggregationSpecError(f"'{op}' filter on '{column}' needs a scalar value")
+            conditions.append(f"{column_sql} {'<>' if op == '!=' else op} %s")
+            params.append(value)
+    return conditions, params
+
+
+def resolve_aggregation(
+    catalog: ColumnCatalog,
+    metrics: Optional[List[Dict[str, Any]]],
+    group_by: Optional[List[str]],
+    time_column: Optional[str],
+    time_bucket: Optional[str],
+) -> Tuple[List[Tuple[str, str]], List[Tuple[str, Optional[str], str]]]:
+    """Validate a spec into ``(select_sql, alias)`` groups and ``(fn, column, alias)`` metrics"""
+    groups: List[Tuple[str, str]] = []
+    metric_items: List[Tuple[str, Optional[str], str]] = []
+    output: List[str] = []
+
+    if time_bucket:
+        if not time_column:
+            raise AggregationSpecError("time_bucket requires time_column")
+        column, data_type = catalog.resolve(time_column, "time")
+        if data_type not in TEMPORAL_TYPES:
+            raise AggregationSpecError(
+                f"time_column '{column}' is {data_type}, expected DATE, DATETIME or TIMESTAMP"
+            )
+        alias = f"{column}_{time_bucket.lower()}"
+        expression = bucket_expression(_quote(column), time_bucket.lower())
+        groups.append((f"{expression} AS {_quote(alias)}", alias))
+        output.append(alias)
+
+    for name in group_by or []:
+        column, _ = catalog.resolve(name, "group_by")
+        groups.append((_quote(column), column))
+        output.append(column)
+
+    for metric in normalize_metrics(metrics):
+        fn = metric["fn"]
+        raw_column = metric["column"]
+        column = None
+        if not (fn == "count" and (not raw_column or raw_column == "*")):
+            column, data_type = catalog.resolve(raw_column, f"{fn} metric")
+            if fn in ("sum", "avg") and data_type not in NUMERIC_TYPES:
+                raise AggregationSpecError(
+                    f"{fn} needs a numeric column, '{column}' is {data_type}"
+                )
+            metric = dict(metric, column=column)
+        alias = metric_alias(metric)
+        if not _ALIAS.match(alias):
+            raise AggregationSpecError(f"Invalid metric alias '{alias}'")
+        if alias in output:
+            raise AggregationSpecError(f"Duplicate output column '{alias}'")
+        metric_items.append((fn, column, alias))
+        output.append(alias)
+    return groups, metric_items
+
+
+def _metric_expression(fn: str, column: Optional[str]) -> str:
+    if column is None:
+        return "COUNT(*)"
+    if fn == "count_distinct":
+        return f"COUNT(DISTINCT {_quote(column)})"
+    return f"{fn.upper()}({_quote(column)})"
+
+
+def compile_aggregation(
+    schema_name: str,
+    table_name: str,
+    columns: List[Dict[str, Any]],
+    metrics: Optional[List[Dict[str, Any]]] = None,
+    group_by: Optional[List[str]] = None,
+    filters: Optional[List[Dict[str, Any]]] = None,
+    time_column: Optional[str] = None,
+    time_bucket: Optional[str] = None,
+    order_by: Optional[str] = None,
+    descending: bool = True,
+    limit: int = 100,
+) -> Tuple[str, Tuple, List[str]]:
+    """Build a parameterized GROUP BY query from a structured spec
+
+    Every identifier is checked against ``columns`` (the table's
+    INFORMATION_SCHEMA column rows) and quoted; every value becomes a
+    parameter.
+
+    Returns:
+        Tuple[str, Tuple, List[str]]: SQL, parameters and output column names
+    """
+    catalog = ColumnCatalog(columns)
+    group_items, metric_items = resolve_aggregation(
+        catalog, metrics, group_by, time_column, time_bucket
+    )
+    select = [select_sql for select_sql, _ in group_items]
+    select += [
+        f"{_metric_expression(fn, column)} AS {_quote(alias)}" for fn, column, alias in metric_items
+    ]
+    groups = [_quote(alias) for _, alias in group_items]
+    output = [alias for _, alias in group_items] + [alias for _, _, alias in metric_items]
+
+    conditions, params = compile_filters(filters, catalog)
+
+    sql = f"SELECT {', '.join(select)} FROM {_quote(schema_name)}.{_quote(table_name)}"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    if groups:
+        sql += " GROUP BY " + ", ".join(groups)
+
+    if order_by:
+        if order_by not in output:
+            raise AggregationSpecError(
+                f"order_by '{order_by}' must be one of the output columns {output}"
+            )
+        sql += f" ORDER BY {_quote(order_by)} {'DESC' if descending else 'ASC'}"
+    elif time_bucket:
+        # Time series read naturally in chronological order
+        sql += f" ORDER BY {groups[0]} ASC"
+    elif groups:
+        first_metric = output[len(groups)]
+        sql += f" ORDER BY {_quote(first_metric)} DESC"
+
+    limit = max(1, min(int(limit or MAX_GROUPS), MAX_GROUPS))
+    sql += f" LIMIT {limit}"
+    return sql, tuple(params), output
+
+
+# Metrics whose per-shard results can be combined exactly
+MERGEABLE_FUNCTIONS = ("count", "sum", "avg", "min", "max")
+
+
+def partial_metric_select(metric_items: List[Tuple[str, Optional[str], str]]) -> List[str]:
+    """Mergeable partial aggregates ``_p<i>`` (and ``_p<i>_n`` counts for avg)"""
+    select = []
+    for index, (fn, column, _) in enumerate(metric_items):
+        if fn not in MERGEABLE_FUNCTIONS:
+            raise AggregationSpecError(f"{fn} cannot be merged from partial results")
+        if fn == "avg":
+            select.append(f"SUM({_quote(column)}) AS `_p{index}`")
+            select.append(f"COUNT({_quote(column)}) AS `_p{index}_n`")
+        else:
+            select.append(f"{_metric_expression(fn, column)} AS `_p{index}`")
+    return select
+
+
+def compile_partial_aggregation(
+    schema_name: str,
+    table_name: str,
+    columns: List[Dict[str, Any]],
+    shard_column: Optional[str],
+    inclusive_upper: bool,
+    metrics: Optional[List[Dict[str, Any]]] = None,
+    group_by: Optional[List[str]] = None,
+    filters: Optional[List[Dict[str, Any]]] = None,
+    time_column: Optional[str] = None,
+    time_bucket: Optional[str] = None,
+) -> Tuple[str, Tuple, List[Tuple[str, str]], List[Tuple[str, Optional[str], str]]]:
+    """GROUP BY over one shard range of ``shard_column``, returning partial aggregates
+
+    The SQL takes the shard's lower and upper bound as its last two
+    parameters; with no ``shard_column`` it covers the whole table, for
+    running on each of several database shards. ``avg`` is computed as a
+    sum and a count so shards can be merged; every group is returned,
+    since ordering and LIMIT only make sense after merging. Raises
+    AggregationSpecError for ``count_distinct``, which cannot be merged
+    from partial results.
+    """
+    catalog = ColumnCatalog(columns)
+    group_items, metric_items = resolve_aggregation(
+        catalog, metrics, group_by, time_column, time_bucket
+    )
+    select = [select_sql for select_sql, _ in group_items] + partial_metric_select(metric_items)
+    conditions, params = compile_filters(filters, catalog)
+    if shard_column:
+        shard, _ = catalog.resolve(shard_column, "shard")
+        conditions.append(
+            f"{_quote(shard)} >= %s AND {_quote(shard)} {'<=' if inclusive_upper else '<'} %s"
+        )
+    sql = f"SELECT {', '.join(select)} FROM {_quote(schema_name)}.{_quote(table_name)}"
+    if conditions:
+        sql += f" WHERE {' AND '.join(conditions)}"
+    if group_items:
+        sql += " GROUP BY " + ", ".join(_quote(alias) for _, alias in group_items)
+    return sql, tuple(params), group_items, metric_items
+
+
+def _add(left: Any, right: Any) -> Any:
+    if left is None:
+        return right
+    if right is None:
+        return left
+    return left + right
+
+
+def merge_partials(
+    partials: List[List[Dict[str, Any]]],
+    group_items: List[Tuple[str, str]],
+    metric_items: List[Tuple[str, Optional[str], str]],
+) -> List[Dict[str, Any]]:
+    """Combine per-shard partial rows into final aggregate rows
+
+    Counts and sums add up, min and max take the extreme, and avg divides
+    the summed sums by the summed counts.
+    """
+    aliases = [alias for _, alias in group_items]
+    merged: Dict[Tuple, List[Any]] = {}
+    for rows in partials:
+        for row in rows:
+            key = tuple(row[alias] for alias in aliases)
+            state = merged.get(key)
+            if state is None:
+                state = merged[key] = [None] * len(metric_items)
+            for index, (fn, _, _) in enumerate(metric_items):
+                value = row[f"_p{index}"]
+                if fn == "avg":
+                    value = (value, row[f"_p{index}_n"] or 0)
+                    current = state[index] or (None, 0)
+                    state[index] = (_add(current[0], value[0]), current[1] + value[1])
+                elif fn in ("count", "sum"):
+                    state[index] = _add(state[index], value)
+                elif value is not None:
+                    current = state[index]
+                    if current is None or (value < current if fn == "min" else value > current):
+                        state[index] = value
+
+    results = []
+    for key, state in merged.items():
+        row = dict(zip(aliases, key))
+        for (fn, _, alias), value in zip(metric_items, state):
+            if fn == "avg":
+                total, count = value or (None, 0)
+                value = total / count if count else None
+            elif fn == "count":
+                value = value or 0
+            row[alias] = value
+        results.append(row)
+    return results
+
+
+def order_and_limit(
+    rows: List[Dict[str, Any]],
+    group_aliases: List[str],
+    metric_aliases: List[str],
+    order_by: Optional[str],
+    descending: bool,
+    time_bucket: Optional[str],
+    limit: int,
+) -> List[Dict[str, Any]]:
+    """Apply compile_aggregation's ORDER BY and LIMIT to merged rows
+
+    Follows MySQL's NULL ordering: first when ascending, last when descending.
+    """
+    if order_by:
+        key, reverse = order_by, descending
+    elif time_bucket:
+        key, reverse = group_aliases[0], False
+    elif group_aliases:
+        key, reverse = metric_aliases[0], True
+    else:
+        key, reverse = None, False
+    if key:
+        rows = sorted(
+            rows, key=lambda row: (row[key] is not None, row[key] if row[key] is not None else 0),
+            reverse=reverse,
+        )
+    return rows[: max(1, min(int(limit or MAX_GROUPS), MAX_GROUPS))]
+
+
+def split_range(low: Any, high: Any, shards: int) -> List[Tuple[Any, Any, bool]]:
+    """Split ``[low, high]`` into up to ``shards`` ``(lower, upper, inclusive_upper)`` ranges
+
+    Integer keys split on whole numbers; DATE/DATETIME bounds split by time.
+    """
+    shards = max(1, int(shards))
+    if isinstance(low, datetime.date) and not isinstance(low, datetime.datetime):
+        low = datetime.datetime.combine(low, datetime.time())
+        high = datetime.datetime.combine(high, datetime.time.max)
+    if isinstance(low, datetime.datetime):
+        step = (high - low) / shards
+        if step <= datetime.timedelta(0):
+            return [(low, high, True)]
+        edges = [low + step * index for index in range(shards)] + [high]
+    else:
+        low, high = int(low), int(high)
+        step = max(1, math.ceil((high - low + 1) / shards))
+        edges = list(range(low, high + 1, step)) + [high]
+        if edges[-2] == high:
+            edges.pop()
+    return [
+        (edges[index], edges[index + 1], index == len(edges) - 2)
+        for index in range(len(edges) - 1)
+    ] or [(low, high, True)]
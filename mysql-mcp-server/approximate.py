@@ -0,0 +1,247 @@
+"""
+Block-sampled approximate aggregates with confidence intervals
+"""
+
+import math
+import random
+from statistics import NormalDist
+from typing import Dict, List, Any, Optional, Tuple
+
+# Key-range blocks the table is divided into; each sampled block is one range scan
+MAX_BLOCKS = 4096
+
+# Blocks read in the first round; every later round doubles the sample
+INITIAL_BLOCKS = 32
+
+# Key ranges OR'ed into one statement; larger rounds are split across statements
+MAX_RANGES_PER_QUERY = 256
+
+CONFIDENCE = 0.95
+
+
+def _quote(identifier: str) -> str:
+    return "`" + identifier.replace("`", "``") + "`"
+
+
+def z_score(confidence: float = CONFIDENCE) -> float:
+    return NormalDist().inv_cdf((1 + confidence) / 2)
+
+
+def block_layout(low: int, high: int, max_blocks: int = MAX_BLOCKS) -> Tuple[int, int]:
+    """``(block_width, block_count)`` covering the key range ``[low, high]``"""
+    span = high - low + 1
+    width = max(1, math.ceil(span / max_blocks))
+    return width, math.ceil(span / width)
+
+
+def sample_order(block_count: int, rng: random.Random) -> List[int]:
+    """Every block index in random order; rounds take successive slices"""
+    order = list(range(block_count))
+    rng.shuffle(order)
+    return order
+
+
+def block_batches(blocks: List[int], max_ranges: int = MAX_RANGES_PER_QUERY) -> List[List[int]]:
+    """Split a round's blocks into batches of at most ``max_ranges`` key ranges
+
+    Adjacent blocks share one range, so they never split across batches.
+    """
+    batches: List[List[int]] = []
+    ranges = 0
+    previous = None
+    for block in sorted(blocks):
+        if previous is None or block != previous + 1:
+            if not batches or ranges == max_ranges:
+                batches.append([])
+                ranges = 0
+            ranges += 1
+        batches[-1].append(block)
+        previous = block
+    return batches
+
+
+def key_ranges(key: str, low: int, width: int, blocks: List[int]) -> Tuple[str, Tuple]:
+    """OR'ed primary-key ranges covering ``blocks``, adjacent blocks merged"""
+    key_sql = _quote(key)
+    spans: List[List[int]] = []
+    for block in sorted(blocks):
+        if spans and block == spans[-1][1]:
+            spans[-1][1] = block + 1
+        else:
+            spans.append([block, block + 1])
+    ranges = []
+    params: List[Any] = []
+    for first, end in spans:
+        ranges.append(f"({key_sql} >= %s AND {key_sql} < %s)")
+        params.extend([low + first * width, low + end * width])
+    return f"({' OR '.join(ranges)})", tuple(params)
+
+
+def block_query(
+    table_sql: str,
+    key: str,
+    low: int,
+    width: int,
+    blocks: List[int],
+    group_selects: List[str],
+    group_aliases: List[str],
+    partial_selects: List[str],
+    conditions: List[str],
+) -> Tuple[str, Tuple]:
+    """Partial aggregates per ``(block, group)`` for a set of key-range blocks
+
+    The blocks become OR'ed primary-key ranges (adjacent blocks merged), so
+    MySQL reads only those ranges of the clustered index.
+    """
+    key_sql = _quote(key)
+    range_sql, params = key_ranges(key, low, width, blocks)
+    where = list(conditions) + [range_sql]
+    block_select = f"FLOOR(({key_sql} - {int(low)}) / {int(width)}) AS `_block`"
+    select = group_selects + [block_select, "COUNT(*) AS `_rows`"] + partial_selects
+    group = [_quote(alias) for alias in group_aliases] + ["`_block`"]
+    return (
+        f"SELECT {', '.join(select)} FROM {table_sql} WHERE {' AND '.join(where)} "
+        f"GROUP BY {', '.join(group)}",
+        params,
+    )
+
+
+def _number(value: Any) -> float:
+    return float(value) if value is not None else 0.0
+
+
+def _total_estimate(values: List[float], sampled: int, total: int) -> Tuple[float, float]:
+    """Expansion estimate of a population total and its standard error"""
+    mean = sum(values) / sampled
+    if sampled >= total or sampled < 2:
+        return mean * total, 0.0 if sampled >= total else math.inf
+    variance = sum((v - mean) ** 2 for v in values) / (sampled - 1)
+    return mean * total, total * math.sqrt((1 - sampled / total) * variance / sampled)
+
+
+def _ratio_estimate(
+    numerators: List[float], denominators: List[float], sampled: int, total: int
+) -> Tuple[Optional[float], float]:
+    """Ratio estimate (an average) with its delta-method standard error"""
+    x_mean = sum(denominators) / sampled
+    if not x_mean:
+        return None, math.inf
+    ratio = (sum(numerators) / sampled) / x_mean
+    if sampled >= total or sampled < 2:
+        return ratio, 0.0 if sampled >= total else math.inf
+    residuals = [y - ratio * x for y, x in zip(numerators, denominators)]
+    variance = sum(r * r for r in residuals) / (sampled - 1)
+    return ratio, math.sqrt((1 - sampled / total) * variance / sampled) / x_mean
+
+
+class BlockEstimator:
+    """Accumulates per-block partial aggregates and scales them to the table
+
+    Totals (count, sum) use the expansion estimator over sampled blocks with
+    a finite-population correction; averages use the ratio estimator; min
+    and max are the sample's extremes and carry no interval. Blocks that
+    returned no rows count as sampled zeros.
+    """
+
+    def __init__(
+        self,
+        group_aliases: List[str],
+        metric_items: List[Tuple[str, Optional[str], str]],
+        block_count: int,
+        confidence: float = CONFIDENCE,
+    ):
+        self.group_aliases = group_aliases
+        self.metric_items = metric_items
+        self.block_count = block_count
+        self.z = z_score(confidence)
+        self.confidence = confidence
+        self.sampled_blocks: List[int] = []
+        self.rows_read = 0
+        # group key -> block -> partial row
+        self._groups: Dict[Tuple, Dict[int, Dict[str, Any]]] = {}
+
+    def add(self, blocks: List[int], rows: List[Dict[str, Any]]) -> None:
+        self.sampled_blocks.extend(blocks)
+        for row in rows:
+            key = tuple(row[alias] for alias in self.group_aliases)
+            self._groups.setdefault(key, {})[int(row["_block"])] = row
+            self.rows_read += int(row["_rows"] or 0)
+
+    @property
+    def exact(self) -> bool:
+        return len(self.sampled_blocks) >= self.block_count
+
+    def _series(self, per_block: Dict[int, Dict[str, Any]], field: str) -> List[float]:
+        return [_number((per_block.get(block) or {}).get(field)) for block in self.sampled_blocks]
+
+    def _estimate(
+        self, per_block: Dict[int, Dict[str, Any]], index: int
+    ) -> Tuple[Any, Optional[float]]:
+        """Point estimate and standard error of one metric for one group"""
+        fn = self.metric_items[index][0]
+        sampled = len(self.sampled_blocks)
+        if fn in ("count", "sum"):
+            values = self._series(per_block, f"_p{index}")
+            if fn == "sum" and all(
+                (per_block.get(b) or {}).get(f"_p{index}") is None for b in self.sampled_blocks
+            ):
+                return None, None
+            return _total_estimate(values, sampled, self.block_count)
+        if fn == "avg":
+            return _ratio_estimate(
+                self._series(per_block, f"_p{index}"),
+                self._series(per_block, f"_p{index}_n"),
+                sampled,
+                self.block_count,
+            )
+        values = [row[f"_p{index}"] for row in per_block.values() if row[f"_p{index}"] is not None]
+        if not values:
+            return None, None
+        return (min(values) if fn == "min" else max(values)), None
+
+    def results(self) -> List[Dict[str, Any]]:
+        """One row per group: each metric's estimate plus ``_low``/``_high`` bounds"""
+        groups = self._groups
+        if not self.group_aliases and not groups:
+            groups = {(): {}}
+        rows = []
+        for key, per_block in groups.items():
+            row: Dict[str, Any] = dict(zip(self.group_aliases, key))
+            for index, (fn, _, alias) in enumerate(self.metric_items):
+                value, error = self._estimate(per_block, index)
+                if error is None or value is None:
+                    row[alias] = value
+                    continue
+                margin = self.z * error
+                low, high = value - margin, value + margin
+                if fn == "count":
+                    value, low, high = round(value), max(0, math.floor(low)), math.ceil(high)
+                row[alias] = value
+                row[f"{alias}_low"] = low if math.isfinite(low) else None
+                row[f"{alias}_high"] = high if math.isfinite(high) else None
+            rows.append(row)
+        return rows
+
+    def relative_error(self) -> float:
+        """Largest relative half-width among the metrics' intervals over the whole table
+
+        MIN and MAX are skipped, since sample extremes have no interval to
+        shrink; with only those metrics the error is 0.
+        """
+        if self.exact:
+            return 0.0
+        worst = 0.0
+        for index, (fn, _, _) in enumerate(self.metric_items):
+            if fn in ("min", "max"):
+                continue
+            merged: Dict[int, Dict[str, Any]] = {}
+            for per_block in self._groups.values():
+                for block, row in per_block.items():
+                    target = merged.setdefault(block, {f"_p{index}": 0.0, f"_p{index}_n": 0.0})
+                    target[f"_p{index}"] += _number(row.get(f"_p{index}"))
+                    target[f"_p{index}_n"] += _number(row.get(f"_p{index}_n"))
+            value, error = self._estimate(merged, index)
+            if not value or error is None or not math.isfinite(error):
+                return math.inf
+            worst = max(worst, self.z * error / abs(value))
+        return worst
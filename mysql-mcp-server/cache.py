@@ -0,0 +1,332 @@
+"""
+In-process caches for the MySQL MCP server
+"""
+
+import re
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Callable, Hashable, Optional, Set, Tuple
+
+
+class MetadataCache:
+    """Size-bounded LRU cache for schema metadata with TTL and version checks
+
+    Entries are tagged with the schema they describe (``None`` for
+    instance-wide metadata such as the schema list). Each schema also carries
+    a version fingerprint; when a fresh fingerprint differs from the stored
+    one, every entry for that schema and every instance-wide entry is dropped.
+    """
+
+    def __init__(
+        self, max_entries: int = 1024, ttl: float = 300.0, validate_interval: float = 10.0
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.validate_interval = validate_interval
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float, Optional[str]]]" = OrderedDict()
+        self._versions: Dict[Optional[str], Tuple[Any, float]] = {}
+        self._lock = threading.Lock()
+        self._metrics = {
+            "hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "evictions": 0,
+            "invalidations": 0,
+            "version_checks": 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """Return ``(hit, value)`` for a key, refreshing its LRU position"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._metrics["misses"] += 1
+                return False, None
+            value, stored_at, _ = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self._metrics["expired"] += 1
+                self._metrics["misses"] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._metrics["hits"] += 1
+            return True, value
+
+    def put(self, key: Hashable, value: Any, schema_name: Optional[str]) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic(), schema_name)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._metrics["evictions"] += 1
+
+    def needs_validation(self, schema_name: Optional[str]) -> bool:
+        """Whether the schema's version fingerprint is due for a re-check"""
+        with self._lock:
+            version = self._versions.get(schema_name)
+        return version is None or time.monotonic() - version[1] > self.validate_interval
+
+    def record_version(self, schema_name: Optional[str], fingerprint: Any) -> None:
+        """Store a fresh fingerprint, invalidating the schema if it changed"""
+        with self._lock:
+            self._metrics["version_checks"] += 1
+            previous = self._versions.get(schema_name)
+            self._versions[schema_name] = (fingerprint, time.monotonic())
+            changed = previous is not None and previous[0] != fingerprint
+        if changed:
+            self.invalidate_schema(schema_name)
+
+    def invalidate_schema(self, schema_name: Optional[str]) -> int:
+        """Drop entries for a schema plus all instance-wide entries"""
+        with self._lock:
+            stale = [
+                key
+                for key, (_, _, entry_schema) in self._entries.items()
+                if entry_schema is None or entry_schema == schema_name
+            ]
+            for key in stale:
+                del self._entries[key]
+            if stale:
+                self._metrics["invalidations"] += 1
+            return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._metrics)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        stats.update(
+            {"max_entries": self.max_entries, "ttl_seconds": self.ttl}
+        )
+        return stats
+
+
+_TABLE_REFERENCE = re.compile(
+    r"\b(?:FROM|JOIN|INTO|UPDATE)\s+((?:`[^`]+`|\w+)(?:\s*\.\s*(?:`[^`]+`|\w+))?)",
+    re.IGNORECASE,
+)
+
+
+def referenced_tables(query: str, default_schema: Optional[str]) -> Set[Tuple[str, str]]:
+    """Best-effort ``(schema, table)`` pairs a statement reads or writes"""
+    tables = set()
+    for match in _TABLE_REFERENCE.finditer(query):
+        parts = [part.strip().strip("`").lower() for part in match.group(1).split(".")]
+        if len(parts) == 2:
+            tables.add((parts[0], parts[1]))
+        else:
+            tables.add(((default_schema or "").lower(), parts[0]))
+    return tables
+
+
+_WHITESPACE = re.compile(r"\s+")
+_QUOTED = re.compile(r"""('(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|`[^`]*`)""")
+
+
+class _Flight:
+    """An in-progress load that concurrent identical requests wait on"""
+
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ResultCache:
+    """Size-bounded LRU + TTL cache for SELECT results with single-flight loading
+
+    Keys are the whitespace-normalized SQL plus its parameters. While a query
+    is being loaded, identical requests wait for that load instead of hitting
+    MySQL again. Entries remember the tables they read so writes can
+    invalidate them per table.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 30.0, max_rows: int = 1000):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float, Set[Tuple[str, str]]]]" = OrderedDict()
+        self._inflight: Dict[Hashable, _Flight] = {}
+        # Bumped on invalidation so loads that started earlier are not stored
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._metrics = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "expired": 0,
+            "evictions": 0,
+            "invalidations": 0,
+            "uncacheable": 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    @staticmethod
+    def make_key(query: str, params: Optional[Tuple]) -> Hashable:
+        # Collapse whitespace outside of quoted literals and identifiers only
+        pieces = _QUOTED.split(query.strip().rstrip(";"))
+        normalized = "".join(
+            piece if index % 2 else _WHITESPACE.sub(" ", piece)
+            for index, piece in enumerate(pieces)
+        ).strip()
+        return normalized, repr(tuple(params or ()))
+
+    def get_or_load(
+        self,
+        query: str,
+        params: Optional[Tuple],
+        default_schema: Optional[str],
+        loader: Callable[[], List[Dict[str, Any]]],
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Return ``(rows, cache_info)``, loading through ``loader`` on a miss
+
+        ``cache_info`` holds ``hit`` (served from cache or a concurrent
+        identical load) and ``age_seconds`` of the data served.
+        """
+        key = self.make_key(query, params)
+        with self._lock:
+            cached = self._fresh(key)
+            if cached is not None:
+                return cached
+
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+                generation = self._generation
+                self._metrics["misses"] += 1
+            else:
+                self._metrics["coalesced"] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value, {"hit": True, "age_seconds": 0.0, "coalesced": True}
+
+        try:
+            rows = loader()
+            flight.value = rows
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+                if flight.error is None:
+                    self._store(key, query, default_schema, flight.value, generation)
+            flight.done.set()
+        return rows, {"hit": False, "age_seconds": 0.0}
+
+    def lookup(
+        self, query: str, params: Optional[Tuple]
+    ) -> Tuple[Optional[List[Dict[str, Any]]], Dict[str, Any], int]:
+        """Return ``(rows, cache_info, generation)``; rows are ``None`` on a miss
+
+        For callers that stream the result themselves and then hand it to
+        ``store`` with the generation returned here. Misses are not
+        coalesced with concurrent identical queries.
+        """
+        key = self.make_key(query, params)
+        with self._lock:
+            cached = self._fresh(key)
+            if cached is not None:
+                return cached[0], cached[1], self._generation
+            self._metrics["misses"] += 1
+            return None, {"hit": False, "age_seconds": 0.0}, self._generation
+
+    def store(
+        self,
+        query: str,
+        params: Optional[Tuple],
+        default_schema: Optional[str],
+        rows: Optional[List[Dict[str, Any]]],
+        generation: int,
+    ) -> None:
+        """Cache a streamed result; ``None`` rows mean it outgrew ``max_rows``"""
+        with self._lock:
+            self._store(self.make_key(query, params), query, default_schema, rows, generation)
+
+    def _fresh(self, key: Hashable) -> Optional[Tuple[List[Dict[str, Any]], Dict[str, Any]]]:
+        """Unexpired cached rows and their cache info (caller holds the lock)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        rows, stored_at, _ = entry
+        age = time.monotonic() - stored_at
+        if age > self.ttl:
+            del self._entries[key]
+            self._metrics["expired"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self._metrics["hits"] += 1
+        return rows, {"hit": True, "age_seconds": round(age, 3)}
+
+    def _store(
+        self,
+        key: Hashable,
+        query: str,
+        default_schema: Optional[str],
+        rows: Optional[List[Dict[str, Any]]],
+        generation: int,
+    ) -> None:
+        # Caller holds the lock; loads that straddled an invalidation are dropped
+        if generation != self._generation:
+            return
+        if rows is None or len(rows) > self.max_rows:
+            self._metrics["uncacheable"] += 1
+            return
+        self._entries[key] = (rows, time.monotonic(), referenced_tables(query, default_schema))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._metrics["evictions"] += 1
+
+    def invalidate_table(self, schema_name: str, table_name: str) -> int:
+        """Drop every cached result that read the given table"""
+        target = (schema_name.lower(), table_name.lower())
+        with self._lock:
+            stale = [key for key, (_, _, tables) in self._entries.items() if target in tables]
+            for key in stale:
+                del self._entries[key]
+            self._generation += 1
+            if stale:
+                self._metrics["invalidations"] += 1
+            return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._metrics)
+            stats["entries"] = len(self._entries)
+            stats["inflight"] = len(self._inflight)
+        lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+        stats["hit_ratio"] = (
+            round((stats["hits"] + stats["coalesced"]) / lookups, 3) if lookups else 0.0
+        )
+        stats.update(
+            {"max_entries": self.max_entries, "ttl_seconds": self.ttl, "max_rows": self.max_rows}
+        )
+        return stats
@@ -0,0 +1,149 @@
+"""
+Catalog of named, parameterized SELECTs exposed as MCP tools
+"""
+
+import re
+import json
+import inspect
+import datetime
+from typing import Dict, List, Any, Optional
+
+PARAMETER_TYPES = {
+    "string": str,
+    "integer": int,
+    "number": float,
+    "boolean": bool,
+    "date": datetime.date,
+    "datetime": datetime.datetime,
+}
+
+_NAME = re.compile(r"^[a-z][a-z0-9_]{0,63}$")
+_PLACEHOLDER = re.compile(r"%s")
+
+
+class CatalogError(ValueError):
+    """Raised when the query catalog file is malformed"""
+
+
+class CatalogParameter:
+    """A typed parameter of a catalog query"""
+
+    def __init__(
+        self,
+        name: str,
+        type: str = "string",
+        description: str = "",
+        default: Any = inspect.Parameter.empty,
+    ):
+        if not _NAME.match(name or ""):
+            raise CatalogError(f"Invalid parameter name '{name}'")
+        if type not in PARAMETER_TYPES:
+            raise CatalogError(
+                f"Parameter '{name}' has unknown type '{type}', expected one of {list(PARAMETER_TYPES)}"
+            )
+        self.name = name
+        self.type = type
+        self.description = description
+        self.default = default
+
+    @property
+    def annotation(self) -> Any:
+        python_type = PARAMETER_TYPES[self.type]
+        if self.default is None:
+            return Optional[python_type]
+        return python_type
+
+
+class CatalogQuery:
+    """A named SELECT with ``%s`` placeholders bound to its parameters in order"""
+
+    def __init__(
+        self,
+        name: str,
+        sql: str,
+        description: str = "",
+        parameters: Optional[List[Dict[str, Any]]] = None,
+    ):
+        if not _NAME.match(name or ""):
+            raise CatalogError(
+                f"Invalid query name '{name}': use lowercase letters, digits and underscores"
+            )
+        if not (sql or "").strip().upper().startswith(("SELECT", "WITH")):
+            raise CatalogError(f"Catalog query '{name}' must be a SELECT")
+        self.name = name
+        self.sql = sql.strip().rstrip(";")
+        self.description = description or f"Run the '{name}' catalog query."
+        try:
+            self.parameters = [CatalogParameter(**spec) for spec in parameters or []]
+        except TypeError as e:
+            raise CatalogError(f"Catalog query '{name}' has a malformed parameter: {e}")
+
+        placeholders = len(_PLACEHOLDER.findall(self.sql))
+        if placeholders != len(self.parameters):
+            raise CatalogError(
+                f"Catalog query '{name}' has {placeholders} placeholders "
+                f"but {len(self.parameters)} parameters"
+            )
+
+    def signature(self) -> inspect.Signature:
+        """Typed signature used to generate the tool's input schema"""
+        parameters = [
+            inspect.Parameter(
+                parameter.name,
+                inspect.Parameter.KEYWORD_ONLY,
+                default=parameter.default,
+                annotation=parameter.annotation,
+            )
+            for parameter in self.parameters
+        ]
+        return inspect.Signature(parameters, return_annotation=str)
+
+    def docstring(self) -> str:
+        lines = [self.description]
+        if self.parameters:
+            lines += ["", "Args:"]
+            for parameter in self.parameters:
+                lines.append(
+                    f"    {parameter.name} ({parameter.type}): {parameter.description}".rstrip()
+                )
+        return "\n".join(lines)
+
+    def bind(self, arguments: Dict[str, Any]) -> tuple:
+        """Positional parameters for the prepared statement"""
+        return tuple(
+            arguments.get(parameter.name, parameter.default)
+            for parameter in self.parameters
+        )
+
+
+def load_catalog(path: str) -> List[CatalogQuery]:
+    """Read a JSON catalog: ``{"queries": [{"name", "sql", "description", "parameters"}]}``"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            document = json.load(f)
+    except (OSError, ValueError) as e:
+        raise CatalogError(f"Cannot read query catalog '{path}': {e}")
+
+    entries = document.get("queries") if isinstance(document, dict) else None
+    if not isinstance(entries, list):
+        raise CatalogError(f"Query catalog '{path}' needs a 'queries' list")
+
+    queries = []
+    names = set()
+    for entry in entries:
+        if not isinstance(entry, dict):
+            raise CatalogError(f"Catalog entry must be an object, got {entry!r}")
+        try:
+            query = CatalogQuery(
+                name=entry.get("name"),
+                sql=entry.get("sql"),
+                description=entry.get("description", ""),
+                parameters=entry.get("parameters"),
+            )
+        except TypeError as e:
+            raise CatalogError(f"Malformed catalog entry {entry.get('name')!r}: {e}")
+        if query.name in names:
+            raise CatalogError(f"Duplicate catalog query '{query.name}'")
+        names.add(query.name)
+        queries.append(query)
+    return queries
@@ -3,12 +3,82 @@ MySQL Database Connection and Utilities
 """
 
 import os
+import time
+import random
+import tempfile
+import asyncio
 import logging
-from typing import Dict, List, Any, Optional, Tuple
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple, Callable, Iterator
 from contextlib import contextmanager
 import mysql.connector
 from mysql.connector import Error
+from mysql.connector.errors import PoolError
 from dotenv import load_dotenv
+from pool import ConnectionPool
+from replicas import Replica, ReplicaRouter, parse_replica_hosts
+from shards import Shard, parse_shard_map
+from cache import MetadataCache, ResultCache, referenced_tables
+from query_guard import QueryGuard, QueryRejectedError
+from query_stats import QueryStats
+from join_graph import JoinGraph
+from exports import ExportStore
+from watermarks import (
+    build_changes_query,
+    build_latest_query,
+    classify_change_column,
+    decode_watermark,
+    detect_change_column,
+    encode_watermark,
+)
+from aggregation import (
+    ColumnCatalog,
+    compile_filters,
+    partial_metric_select,
+    resolve_aggregation,
+)
+from approximate import (
+    INITIAL_BLOCKS,
+    BlockEstimator,
+    block_batches,
+    block_layout,
+    block_query,
+    sample_order,
+)
+from sampling import (
+    MAX_STRATA,
+    Reservoir,
+    allocate_strata,
+    make_rng,
+    probe_union_query,
+    random_points,
+    stratum_condition,
+    stratum_index,
+    stratum_key,
+)
+from profiling import (
+    apply_histograms,
+    apply_top_values,
+    build_histogram_query,
+    build_summary_query,
+    block_sample_source,
+    build_top_values_query,
+    parse_summary,
+    source_columns,
+)
+from search import (
+    escape_like,
+    fulltext_index,
+    fulltext_query,
+    fulltext_searchable,
+    leading_btree_index,
+    prefix_query,
+    scan_query,
+)
+
+_INTEGER_TYPES = {"tinyint", "smallint", "mediumint", "int", "integer", "bigint"}
 
 # Load environment variables
 load_dotenv()
@@ -44,21 +114,243 @@ class MySQLConnection:
             if ssl_config:
                 self.config["ssl"] = ssl_config
 
+        # Connection pool configuration
+        self.pool = ConnectionPool(
+            self.config,
+            min_size=int(os.getenv("MYSQL_POOL_MIN_SIZE", 1)),
+            max_size=int(os.getenv("MYSQL_POOL_MAX_SIZE", 10)),
+            idle_timeout=float(os.getenv("MYSQL_POOL_IDLE_TIMEOUT", 300)),
+            acquire_timeout=float(os.getenv("MYSQL_POOL_ACQUIRE_TIMEOUT", 30)),
+            health_check_interval=float(
+                os.getenv("MYSQL_POOL_HEALTH_CHECK_INTERVAL", 30)
+            ),
+            max_lifetime=float(os.getenv("MYSQL_POOL_MAX_LIFETIME", 3600)),
+        )
+
+        # Reads are spread over replicas with the same credentials and pool
+        # settings; writes and metadata version checks stay on the primary
+        replicas = [
+            Replica(
+                ConnectionPool(
+                    dict(self.config, host=host, port=port),
+                    min_size=self.pool.min_size,
+                    max_size=self.pool.max_size,
+                    idle_timeout=self.pool.idle_timeout,
+                    acquire_timeout=self.pool.acquire_timeout,
+                    health_check_interval=self.pool.health_check_interval,
+                    max_lifetime=self.pool.max_lifetime,
+                ),
+                weight,
+            )
+            for host, port, weight in parse_replica_hosts(
+                os.getenv("MYSQL_REPLICA_HOSTS"), self.config["port"]
+            )
+        ]
+        # Shards holding the same schema for different data (e.g. per region);
+        # fan-out tools query them directly, bypassing the replica router
+        self.shards: Dict[str, Shard] = {
+            name: Shard(
+                name,
+                ConnectionPool(
+                    dict(self.config, host=host, port=port, database=database),
+                    min_size=self.pool.min_size,
+                    max_size=self.pool.max_size,
+                    idle_timeout=self.pool.idle_timeout,
+                    acquire_timeout=self.pool.acquire_timeout,
+                    health_check_interval=self.pool.health_check_interval,
+                    max_lifetime=self.pool.max_lifetime,
+                ),
+            )
+            for name, host, port, database in parse_shard_map(
+                os.getenv("MYSQL_SHARDS"), self.config["port"], self.config["database"]
+            )
+        }
+
+        self.router = ReplicaRouter(
+            self.pool,
+            replicas,
+            strategy=os.getenv("MYSQL_REPLICA_BALANCE", "round_robin").lower(),
+            max_lag_seconds=float(os.getenv("MYSQL_REPLICA_MAX_LAG_SECONDS", 30)),
+            check_interval=float(os.getenv("MYSQL_REPLICA_CHECK_INTERVAL", 5)),
+        )
+
+        # mysql.connector is blocking, so database work is offloaded to a
+        # bounded thread pool to keep the MCP event loop responsive
+        self.max_inflight = int(
+            os.getenv("MYSQL_MAX_INFLIGHT_QUERIES", self.pool.max_size)
+        )
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.max_inflight, thread_name_prefix="mysql-query"
+        )
+        self._inflight = 0
+        self._inflight_lock = threading.Lock()
+
+        # Rows pulled per fetchmany() when streaming results to the encoder
+        self.stream_batch_size = int(os.getenv("MYSQL_STREAM_BATCH_SIZE", 200))
+
+        # Concurrent per-table work in the summary tools
+        self.summary_concurrency = int(
+            os.getenv("MYSQL_SUMMARY_CONCURRENCY", max(1, self.max_inflight // 2))
+        )
+
+        # Schema metadata cache (set MYSQL_METADATA_CACHE_TTL=0 to disable)
+        self.metadata_cache = MetadataCache(
+            max_entries=int(os.getenv("MYSQL_METADATA_CACHE_MAX_ENTRIES", 1024)),
+            ttl=float(os.getenv("MYSQL_METADATA_CACHE_TTL", 300)),
+            validate_interval=float(
+                os.getenv("MYSQL_METADATA_CACHE_VALIDATE_INTERVAL", 10)
+            ),
+        )
+
+        # SELECT result cache (set MYSQL_RESULT_CACHE_TTL=0 to disable)
+        self.result_cache = ResultCache(
+            max_entries=int(os.getenv("MYSQL_RESULT_CACHE_MAX_ENTRIES", 256)),
+            ttl=float(os.getenv("MYSQL_RESULT_CACHE_TTL", 30)),
+            max_rows=int(os.getenv("MYSQL_RESULT_CACHE_MAX_ROWS", 1000)),
+        )
+
+        self._prepared_metrics = {"prepared": 0, "reused": 0}
+        self._prepared_lock = threading.Lock()
+
+        # Shard-parallel aggregate_mysql_table on large tables
+        self.aggregate_parallelism = int(os.getenv("MYSQL_AGGREGATE_PARALLELISM", 4))
+        self.parallel_aggregate_min_rows = int(
+            os.getenv("MYSQL_PARALLEL_AGGREGATE_MIN_ROWS", 1000000)
+        )
+
+        # Time limit for approximate=True sampling rounds
+        self.approximate_time_budget = float(
+            os.getenv("MYSQL_APPROXIMATE_TIME_BUDGET_SECONDS", 2)
+        )
+
+        # Overall time limit for find_value_in_mysql_schema probes
+        self.value_search_time_budget = float(
+            os.getenv("MYSQL_VALUE_SEARCH_TIME_BUDGET_SECONDS", 5)
+        )
+
+        # Per-digest latency/rows/bytes and the slow-query ring buffer
+        self.query_stats = QueryStats(
+            max_digests=int(os.getenv("MYSQL_QUERY_STATS_MAX_DIGESTS", 500)),
+            slow_query_ms=float(os.getenv("MYSQL_SLOW_QUERY_MS", 1000)),
+            slow_log_size=int(os.getenv("MYSQL_SLOW_QUERY_LOG_SIZE", 50)),
+        )
+
+        # Pre-flight EXPLAIN checks for agent-written SELECTs
+        self.query_guard = QueryGuard(
+            mode=os.getenv("MYSQL_COST_GUARD_MODE", "reject").lower(),
+            full_scan_row_limit=int(os.getenv("MYSQL_FULL_SCAN_ROW_LIMIT", 100000)),
+            max_examined_rows=int(os.getenv("MYSQL_MAX_EXAMINED_ROWS", 10000000)),
+            max_execution_time_ms=int(os.getenv("MYSQL_MAX_EXECUTION_TIME_MS", 30000)),
+        )
+
+        # Large results streamed to local files and read back by handle
+        self.exports = ExportStore(
+            directory=os.getenv("MYSQL_EXPORT_DIR")
+            or os.path.join(tempfile.gettempdir(), "mysql-mcp-exports"),
+            ttl_seconds=float(os.getenv("MYSQL_EXPORT_TTL_SECONDS", 3600)),
+            max_rows=int(os.getenv("MYSQL_EXPORT_MAX_ROWS", 10000000)),
+        )
+        self.export_max_execution_time_ms = int(
+            os.getenv("MYSQL_EXPORT_MAX_EXECUTION_TIME_MS", 600000)
+        )
+
+    @contextmanager
+    def get_connection(self, primary: bool = False, shard: Optional[str] = None):
+        """Context manager that borrows a connection from the pool
+
+        Reads go to a healthy replica when replicas are configured; pass
+        ``primary=True`` for writes and anything that must see the primary,
+        or a ``shard`` name to use that shard's pool.
+        """
+        with self._borrow(primary, shard) as pooled:
+            yield pooled.connection
+
     @contextmanager
-    def get_connection(self):
-        """Context manager for database connections"""
-        connection = None
+    def _borrow(self, primary: bool = False, shard: Optional[str] = None):
+        """Borrow the pool's wrapper, for state kept per physical connection"""
+        if shard is not None:
+            pool = self.shards[shard].pool
+        else:
+            pool = self.pool if primary else self.router.choose()
         try:
-            connection = mysql.connector.connect(**self.config)
-            print("Successfully connected to MySQL database")
-            yield connection
+            pooled = pool.acquire()
         except Error as e:
-            print(f"Error connecting to MySQL: {e}")
+            if pool is self.pool or shard is not None:
+                print(f"Error connecting to MySQL: {e}")
+                raise
+            # Replica unreachable or saturated: fail over to the primary
+            if not isinstance(e, PoolError):
+                self.router.mark_failed(pool, e)
+            pool = self.pool
+            try:
+                pooled = pool.acquire()
+            except Error as e:
+                print(f"Error connecting to MySQL: {e}")
+                raise
+
+        discard = False
+        try:
+            yield pooled
+        except Error as e:
+            # Connection-level failures (lost connection, server gone away)
+            # leave the socket unusable, so don't hand it out again
+            discard = not pooled.connection.is_connected()
+            raise
+        except BaseException:
+            discard = True
             raise
         finally:
-            if connection and connection.is_connected():
-                connection.close()
-                logger.debug("MySQL connection closed")
+            pool.release(pooled, discard=discard)
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Connection pool sizing, wait and exhaustion metrics"""
+        return self.pool.stats()
+
+    def replica_stats(self) -> Dict[str, Any]:
+        """Replica health, lag and selection counts"""
+        return self.router.stats()
+
+    def shard_stats(self) -> List[Dict[str, Any]]:
+        """Per-shard query and error counts and pool usage"""
+        return [
+            {
+                "name": shard.name,
+                "host": shard.host,
+                "database": shard.pool.config.get("database"),
+                "queries": shard.queries,
+                "errors": shard.errors,
+                "last_error": shard.last_error,
+                "in_use": shard.pool.in_use,
+            }
+            for shard in self.shards.values()
+        ]
+
+    def query_stats_summary(self) -> Dict[str, Any]:
+        """Digest and slow-log counts for the runtime stats"""
+        return self.query_stats.summary()
+
+    def executor_stats(self) -> Dict[str, Any]:
+        """In-flight query counts for the async execution layer"""
+        with self._inflight_lock:
+            inflight = self._inflight
+        return {"max_inflight": self.max_inflight, "inflight": inflight}
+
+    def _run_tracked(self, func: Callable, *args, **kwargs):
+        with self._inflight_lock:
+            self._inflight += 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with self._inflight_lock:
+                self._inflight -= 1
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Run a blocking database call on the query executor and await it"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor,
+            functools.partial(self._run_tracked, func, *args, **kwargs),
+        )
 
     def test_connection(self) -> bool:
         """Test database connection"""
@@ -73,40 +365,371 @@ class MySQLConnection:
             logger.error(f"Connection test failed: {e}")
             return False
 
+    def _record_query(
+        self,
+        query: str,
+        params: Optional[Tuple],
+        start: float,
+        rows: int,
+        error: bool,
+        shard: Optional[str] = None,
+    ) -> None:
+        """Add one execution to the digest stats, logging it if it was slow"""
+        elapsed_ms = (time.monotonic() - start) * 1000
+        if self.query_stats.record(query, elapsed_ms, rows, error) and not error:
+            logger.warning(f"Slow query ({elapsed_ms:.0f} ms): {query[:200]}")
+            self.query_stats.record_slow(
+                query, elapsed_ms, rows, self._explain_for_log(query, params, shard)
+            )
+
+    def _explain_for_log(
+        self, query: str, params: Optional[Tuple], shard: Optional[str] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Best-effort EXPLAIN of a slow SELECT, bypassing the stats hooks"""
+        if not query.strip().upper().startswith("SELECT"):
+            return None
+        try:
+            with self.get_connection(shard=shard) as conn:
+                cursor = conn.cursor(dictionary=True)
+                cursor.execute(f"EXPLAIN {query}", params or ())
+                plan = cursor.fetchall()
+                cursor.close()
+                return plan
+        except Exception as e:
+            logger.debug(f"EXPLAIN for slow query failed: {e}")
+            return None
+
     def execute_query(
-        self, query: str, params: Optional[Tuple] = None
+        self, query: str, params: Optional[Tuple] = None, shard: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """Execute a SELECT query and return results as list of dictionaries"""
+        start = time.monotonic()
         try:
-            with self.get_connection() as conn:
+            with self.get_connection(shard=shard) as conn:
                 cursor = conn.cursor(dictionary=True)
                 cursor.execute(query, params or ())
                 results = cursor.fetchall()
                 cursor.close()
-                return results
         except Error as e:
-            logger.error(f"Query execution failed: {e}")
+            logger.error(f"Query execution failed{f' on shard {shard}' if shard else ''}: {e}")
+            self._record_query(query, params, start, 0, True, shard)
+            if shard:
+                self.shards[shard].record(e)
             raise
+        self._record_query(query, params, start, len(results), False, shard)
+        if shard:
+            self.shards[shard].record()
+        return results
+
+    def execute_query_cached(
+        self, query: str, params: Optional[Tuple] = None
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Execute a SELECT through the result cache
+
+        Identical concurrent queries share a single execution. Returns the rows
+        and cache info (``hit`` and ``age_seconds``). Cached rows are shared
+        between callers and must be treated as read-only.
+        """
+        if not self.result_cache.enabled:
+            return self.execute_query(query, params), {"hit": False, "age_seconds": 0.0}
+        return self.result_cache.get_or_load(
+            query,
+            params,
+            self.config["database"],
+            lambda: self.execute_query(query, params),
+        )
+
+    def iter_query_cached(
+        self, query: str, params: Optional[Tuple] = None, batch_size: int = 500
+    ) -> Tuple[Iterator[List[Dict[str, Any]]], Dict[str, Any]]:
+        """Stream a SELECT, serving and filling the result cache on the way
+
+        Returns ``(batches, cache_info)``. A hit yields the cached rows; a
+        miss streams from the server like ``iter_query`` and keeps a copy
+        only while it stays within the cache's ``max_rows``, storing it once
+        the stream is fully read.
+        """
+        cache = self.result_cache
+        if not cache.enabled:
+            return self.iter_query(query, params, batch_size), {"hit": False, "age_seconds": 0.0}
+        rows, cache_info, generation = cache.lookup(query, params)
+        if rows is not None:
+            return iter([rows]), cache_info
+
+        def _stream() -> Iterator[List[Dict[str, Any]]]:
+            kept: Optional[List[Dict[str, Any]]] = []
+            for batch in self.iter_query(query, params, batch_size):
+                if kept is not None:
+                    kept.extend(batch)
+                    if len(kept) > cache.max_rows:
+                        kept = None
+                yield batch
+            cache.store(query, params, self.config["database"], kept, generation)
+
+        return _stream(), cache_info
+
+    def invalidate_cached_results(self, schema_name: str, table_name: str) -> int:
+        """Drop cached SELECT results that read a table; returns entries removed"""
+        return self.result_cache.invalidate_table(schema_name, table_name)
+
+    def result_cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss/coalescing counters for the SELECT result cache"""
+        return self.result_cache.stats()
+
+    def explain_query(
+        self, query: str, params: Optional[Tuple] = None, shard: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Tabular EXPLAIN output for a SELECT"""
+        return self.execute_query(f"EXPLAIN {query}", params, shard)
+
+    def guard_query(
+        self, query: str, params: Optional[Tuple] = None, shard: Optional[str] = None
+    ) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Check a SELECT's plan against the cost guard and add the time limit
+
+        Returns the query to run (with the MAX_EXECUTION_TIME hint) and the
+        plan summary, or ``None`` when the guard is off. Raises
+        QueryRejectedError when the plan exceeds a threshold in reject mode.
+        """
+        plan = None
+        if self.query_guard.enabled:
+            plan = self.query_guard.summarize(query, self.explain_query(query, params, shard))
+            reason, warnings = self.query_guard.check(plan)
+            if reason:
+                logger.warning(f"Cost guard rejected query: {reason}")
+                raise QueryRejectedError(reason, plan)
+            if warnings:
+                plan["warnings"] = warnings
+        return self.query_guard.add_time_limit(query), plan
+
+    def execute_snapshot(self, queries: List[str]) -> List[Dict[str, Any]]:
+        """Run SELECTs on one connection inside a consistent-snapshot transaction
+
+        All queries see the same point-in-time view of InnoDB tables. A failing
+        query does not stop the others. Returns, in order, ``{"rows",
+        "elapsed_ms"}`` or ``{"error", "elapsed_ms"}`` per query.
+        """
+        outcomes: List[Dict[str, Any]] = []
+        with self.get_connection() as conn:
+            conn.start_transaction(consistent_snapshot=True, readonly=True)
+            try:
+                cursor = conn.cursor(dictionary=True)
+                for query in queries:
+                    start = time.monotonic()
+                    try:
+                        cursor.execute(query)
+                        outcome: Dict[str, Any] = {"rows": cursor.fetchall()}
+                    except Error as e:
+                        logger.error(f"Snapshot query failed: {e}")
+                        outcome = {"error": e}
+                    self._record_query(
+                        query, None, start, len(outcome.get("rows", ())), "error" in outcome
+                    )
+                    outcome["elapsed_ms"] = round((time.monotonic() - start) * 1000, 2)
+                    outcomes.append(outcome)
+                cursor.close()
+            finally:
+                conn.rollback()
+        return outcomes
+
+    def execute_prepared(
+        self, name: str, query: str, params: Tuple
+    ) -> List[Dict[str, Any]]:
+        """Run a catalog query as a server-side prepared statement
+
+        The prepared cursor is kept on the pooled connection, so later calls
+        on that connection skip the PREPARE round trip and only send
+        COM_STMT_EXECUTE with binary-encoded parameters.
+        """
+        start = time.monotonic()
+        with self._borrow() as pooled:
+            cursor = pooled.statements.get(name)
+            reused = cursor is not None
+            if not reused:
+                cursor = pooled.connection.cursor(prepared=True, dictionary=True)
+                pooled.statements[name] = cursor
+            try:
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
+            except Error as e:
+                pooled.statements.pop(name, None)
+                logger.error(f"Prepared query '{name}' failed: {e}")
+                self._record_query(query, params, start, 0, True)
+                raise
+        self._record_query(query, params, start, len(rows), False)
+        with self._prepared_lock:
+            self._prepared_metrics["reused" if reused else "prepared"] += 1
+        return rows
+
+    def prepared_statement_stats(self) -> Dict[str, Any]:
+        """How often catalog queries reused a prepared statement"""
+        with self._prepared_lock:
+            return dict(self._prepared_metrics)
+
+    def iter_query(
+        self, query: str, params: Optional[Tuple] = None, batch_size: int = 500
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """Stream a SELECT in batches over an unbuffered (server-side) cursor
+
+        Rows are pulled from the server ``batch_size`` at a time so the full
+        result never sits in memory. The pooled connection is held until the
+        generator is exhausted or closed; closing it early discards the
+        connection instead of draining the remaining rows.
+        """
+        start = time.monotonic()
+        row_count = 0
+        failed = False
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor(dictionary=True, buffered=False)
+                try:
+                    cursor.execute(query, params or ())
+                    while True:
+                        rows = cursor.fetchmany(batch_size)
+                        if not rows:
+                            break
+                        row_count += len(rows)
+                        yield rows
+                except Error as e:
+                    logger.error(f"Query streaming failed: {e}")
+                    failed = True
+                    raise
+                finally:
+                    # Skip cursor cleanup when abandoned mid-stream: the pool
+                    # discards the connection rather than reading what is left
+                    if not conn.unread_result:
+                        cursor.close()
+        finally:
+            # Timing includes the consumer's encoding work between batches
+            self._record_query(query, params, start, row_count, failed)
+
+    def export_query(self, query: str, format: str = "auto") -> Dict[str, Any]:
+        """Stream a SELECT into an export file and return the export's metadata
+
+        Exports skip the EXPLAIN cost guard, since large results are their
+        purpose, and run under the longer export execution time limit.
+        """
+        limited = self.query_guard.add_time_limit(query, self.export_max_execution_time_ms)
+        # Rows per fetch matter more than JSON batch size here
+        batches = self.iter_query(limited, batch_size=max(self.stream_batch_size, 1000))
+        return self.exports.create(batches, format, query)
+
+    def fetch_page(
+        self, query: str, params: Optional[Tuple] = None, page_size: int = 100
+    ) -> List[Dict[str, Any]]:
+        """Fetch at most ``page_size`` rows of a LIMIT-bounded page query
+
+        The result is read to EOF, so the connection goes back to the pool
+        instead of being discarded for an unread result.
+        """
+        return self.execute_query(query, params)[:page_size]
 
     def execute_update(self, query: str, params: Optional[Tuple] = None) -> int:
         """Execute an INSERT, UPDATE, or DELETE query and return affected rows"""
         try:
-            with self.get_connection() as conn:
+            with self.get_connection(primary=True) as conn:
                 cursor = conn.cursor()
                 cursor.execute(query, params or ())
                 affected_rows = cursor.rowcount
                 cursor.close()
-                return affected_rows
+            for schema_name, table_name in referenced_tables(query, self.config["database"]):
+                self.invalidate_cached_results(schema_name, table_name)
+            return affected_rows
         except Error as e:
             logger.error(f"Update execution failed: {e}")
             raise
 
+    def _metadata_version(self, schema_name: Optional[str]) -> Tuple:
+        """Fingerprint that changes when tables in a schema change
+
+        Combines table count and CREATE_TIME/UPDATE_TIME from
+        INFORMATION_SCHEMA.TABLES with the server's DDL statement counters.
+        ``schema_name=None`` fingerprints every user schema.
+        """
+        if schema_name is None:
+            tables_query = """
+            SELECT COUNT(*) AS table_count, MAX(CREATE_TIME) AS created, MAX(UPDATE_TIME) AS updated
+            FROM INFORMATION_SCHEMA.TABLES
+            WHERE TABLE_SCHEMA NOT IN ('information_schema', 'performance_schema', 'mysql', 'sys')
+            """
+            params = ()
+        else:
+            tables_query = """
+            SELECT COUNT(*) AS table_count, MAX(CREATE_TIME) AS created, MAX(UPDATE_TIME) AS updated
+            FROM INFORMATION_SCHEMA.TABLES
+            WHERE TABLE_SCHEMA = %s
+            """
+            params = (schema_name,)
+        ddl_query = """
+        SHOW GLOBAL STATUS WHERE Variable_name IN (
+            'Com_create_table', 'Com_alter_table', 'Com_drop_table', 'Com_rename_table',
+            'Com_create_index', 'Com_drop_index', 'Com_create_db', 'Com_drop_db'
+        )
+        """
+        # Always the primary: counters differ between servers
+        with self.get_connection(primary=True) as conn:
+            cursor = conn.cursor()
+            cursor.execute(tables_query, params)
+            table_count, created, updated = cursor.fetchone()
+            try:
+                cursor.execute(ddl_query)
+                ddl_counter = sum(int(value) for _, value in cursor.fetchall())
+            except Error as e:
+                logger.debug(f"DDL counters unavailable: {e}")
+                ddl_counter = None
+            cursor.close()
+        return (table_count, str(created), str(updated), ddl_counter)
+
+    def _validate_metadata(self, schema_name: Optional[str]) -> None:
+        """Re-check a schema's version fingerprint if the validate interval elapsed"""
+        cache = self.metadata_cache
+        if not cache.needs_validation(schema_name):
+            return
+        try:
+            cache.record_version(schema_name, self._metadata_version(schema_name))
+        except Exception as e:
+            # Fall back to TTL-only expiry when the fingerprint is unavailable
+            logger.debug(f"Metadata version check failed for {schema_name}: {e}")
+
+    def _cached_metadata(
+        self, key: Tuple, schema_name: Optional[str], loader: Callable[[], Any]
+    ) -> Any:
+        """Serve metadata from the cache, re-validating the schema version first
+
+        Cached values are shared between callers and must be treated as read-only.
+        """
+        cache = self.metadata_cache
+        if not cache.enabled:
+            return loader()
+
+        self._validate_metadata(schema_name)
+        hit, value = cache.get(key)
+        if hit:
+            return value
+        value = loader()
+        # Empty results are usually transient privilege/fallback failures
+        if value:
+            cache.put(key, value, schema_name)
+        return value
+
+    def metadata_cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for the schema metadata cache"""
+        return self.metadata_cache.stats()
+
     def get_table_schema(
         self, table_name: str, schema_name: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """Get schema information for a specific table"""
         target_schema = schema_name or self.config["database"]
-        
+        return self._cached_metadata(
+            ("columns", target_schema, table_name),
+            target_schema,
+            lambda: self._load_table_schema(table_name, target_schema),
+        )
+
+    def _load_table_schema(
+        self, table_name: str, target_schema: str
+    ) -> List[Dict[str, Any]]:
         try:
             # Try INFORMATION_SCHEMA first
             query = """
@@ -139,11 +762,9 @@ class MySQLConnection:
             with self.get_connection() as conn:
                 cursor = conn.cursor(dictionary=True)
                 
-                # Switch to target schema if needed
-                if target_schema != self.config["database"]:
-                    cursor.execute(f"USE `{target_schema}`")
-                
-                cursor.execute(f"DESCRIBE `{table_name}`")
+                # Qualify the table instead of switching schema, so the
+                # pooled connection keeps its default database
+                cursor.execute(f"DESCRIBE `{target_schema}`.`{table_name}`")
                 raw_results = cursor.fetchall()
                 cursor.close()
                 
@@ -169,8 +790,88 @@ class MySQLConnection:
             print(f"DESCRIBE also failed: {e}")
             return []
 
+    def get_table_schemas(
+        self, tables_by_schema: Dict[str, List[str]]
+    ) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+        """Get column information for many tables with one INFORMATION_SCHEMA query
+
+        Returns columns grouped as ``{schema: {table: [columns]}}`` in the same
+        format as ``get_table_schema``. Tables already in the metadata cache are
+        served from it and the rest are loaded together, warming the per-table
+        cache entries. Tables the catalog query does not return (e.g. for
+        low-privilege users) fall back to ``get_table_schema``.
+        """
+        cache = self.metadata_cache
+        columns_by_schema = {name: {} for name in tables_by_schema}
+        missing = {}
+        for schema_name, tables in tables_by_schema.items():
+            for table_name in tables:
+                if cache.enabled:
+                    self._validate_metadata(schema_name)
+                    hit, columns = cache.get(("columns", schema_name, table_name))
+                    if hit:
+                        columns_by_schema[schema_name][table_name] = columns
+                        continue
+                missing.setdefault(schema_name, []).append(table_name)
+        if not missing:
+            return columns_by_schema
+
+        loaded = {}
+        try:
+            schema_names = list(missing)
+            placeholders = ", ".join(["%s"] * len(schema_names))
+            query = f"""
+            SELECT 
+                TABLE_SCHEMA,
+                TABLE_NAME,
+                COLUMN_NAME,
+                DATA_TYPE,
+                COLUMN_TYPE,
+                IS_NULLABLE,
+                COLUMN_DEFAULT,
+                COLUMN_KEY,
+                EXTRA,
+                COLUMN_COMMENT,
+                ORDINAL_POSITION,
+                CHARACTER_MAXIMUM_LENGTH,
+                NUMERIC_PRECISION,
+                NUMERIC_SCALE
+            FROM INFORMATION_SCHEMA.COLUMNS 
+            WHERE TABLE_SCHEMA IN ({placeholders})
+            ORDER BY TABLE_SCHEMA, TABLE_NAME, ORDINAL_POSITION
+            """
+            results = self.execute_query(query, tuple(schema_names))
+            for row in results:
+                schema_name = row.pop("TABLE_SCHEMA")
+                table_name = row.pop("TABLE_NAME")
+                loaded.setdefault((schema_name, table_name), []).append(row)
+        except Exception as e:
+            print(f"INFORMATION_SCHEMA bulk columns query failed: {e}")
+
+        # Fall back per table for anything the catalog query did not cover
+        fallback_count = 0
+        for schema_name, tables in missing.items():
+            for table_name in tables:
+                columns = loaded.get((schema_name, table_name))
+                if columns:
+                    cache.put(("columns", schema_name, table_name), columns, schema_name)
+                else:
+                    fallback_count += 1
+                    columns = self.get_table_schema(table_name, schema_name)
+                columns_by_schema[schema_name][table_name] = columns
+
+        table_count = sum(len(tables) for tables in missing.values())
+        print(
+            f"Fetched columns for {table_count} tables with 1 catalog query and "
+            f"{fallback_count} per-table fallbacks (previously {table_count} queries)"
+        )
+        return columns_by_schema
+
     def list_schemas(self) -> List[Dict[str, Any]]:
         """List all schemas/databases in the MySQL instance"""
+        return self._cached_metadata(("schemas",), None, self._load_schemas)
+
+    def _load_schemas(self) -> List[Dict[str, Any]]:
         try:
             # Try INFORMATION_SCHEMA first (works with full privileges)
             query = """
@@ -219,7 +920,13 @@ class MySQLConnection:
     def list_tables(self, schema_name: Optional[str] = None) -> List[str]:
         """List all tables in the database or specific schema"""
         target_schema = schema_name or self.config["database"]
-        
+        return self._cached_metadata(
+            ("tables", target_schema),
+            target_schema,
+            lambda: self._load_tables(target_schema),
+        )
+
+    def _load_tables(self, target_schema: str) -> List[str]:
         try:
             # Try INFORMATION_SCHEMA first
             query = """
@@ -240,11 +947,9 @@ class MySQLConnection:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
-                # Switch to the target database if different from current
-                if target_schema != self.config["database"]:
-                    cursor.execute(f"USE `{target_schema}`")
-                
-                cursor.execute("SHOW TABLES")
+                # Qualify the schema instead of switching to it, so the
+                # pooled connection keeps its default database
+                cursor.execute(f"SHOW TABLES FROM `{target_schema}`")
                 raw_results = cursor.fetchall()
                 cursor.close()
                 
@@ -255,6 +960,11 @@ class MySQLConnection:
 
     def list_tables_by_schema(self) -> Dict[str, List[str]]:
         """List all tables grouped by schema"""
+        return self._cached_metadata(
+            ("tables_by_schema",), None, self._load_tables_by_schema
+        )
+
+    def _load_tables_by_schema(self) -> Dict[str, List[str]]:
         print("Starting list_tables_by_schema with privilege-aware approach")
         
         try:
@@ -323,7 +1033,13 @@ class MySQLConnection:
     ) -> Dict[str, Any]:
         """Get comprehensive information about a table"""
         target_schema = schema_name or self.config["database"]
+        return self._cached_metadata(
+            ("table_info", target_schema, table_name),
+            target_schema,
+            lambda: self._load_table_info(table_name, target_schema),
+        )
 
+    def _load_table_info(self, table_name: str, target_schema: str) -> Dict[str, Any]:
         # Get basic table info
         table_info_query = """
         SELECT 
@@ -383,6 +1099,748 @@ class MySQLConnection:
             "foreign_keys": foreign_keys,
         }
 
+    def get_foreign_keys(self, schema_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Every foreign key column pair declared by tables in a schema"""
+        target_schema = schema_name or self.config["database"]
+        return self._cached_metadata(
+            ("foreign_keys", target_schema),
+            target_schema,
+            lambda: self._load_foreign_keys(target_schema),
+        )
+
+    def _load_foreign_keys(self, target_schema: str) -> List[Dict[str, Any]]:
+        fk_query = """
+        SELECT 
+            kcu.TABLE_SCHEMA as source_schema,
+            kcu.TABLE_NAME as source_table,
+            kcu.COLUMN_NAME as source_column,
+            kcu.REFERENCED_TABLE_SCHEMA as target_schema,
+            kcu.REFERENCED_TABLE_NAME as target_table,
+            kcu.REFERENCED_COLUMN_NAME as target_column,
+            kcu.CONSTRAINT_NAME as constraint_name,
+            rc.UPDATE_RULE,
+            rc.DELETE_RULE
+        FROM INFORMATION_SCHEMA.KEY_COLUMN_USAGE kcu
+        JOIN INFORMATION_SCHEMA.REFERENTIAL_CONSTRAINTS rc 
+            ON kcu.CONSTRAINT_NAME = rc.CONSTRAINT_NAME 
+            AND kcu.CONSTRAINT_SCHEMA = rc.CONSTRAINT_SCHEMA
+        WHERE kcu.TABLE_SCHEMA = %s 
+        AND kcu.REFERENCED_TABLE_NAME IS NOT NULL
+        ORDER BY kcu.TABLE_NAME, kcu.CONSTRAINT_NAME, kcu.ORDINAL_POSITION
+        """
+        return self.execute_query(fk_query, (target_schema,))
+
+    def get_join_graph(self, schema_name: Optional[str] = None) -> JoinGraph:
+        """Foreign-key graph of a schema, rebuilt only when its metadata changes"""
+        target_schema = schema_name or self.config["database"]
+        return self._cached_metadata(
+            ("join_graph", target_schema),
+            target_schema,
+            lambda: JoinGraph.from_rows(self.get_foreign_keys(target_schema)),
+        )
+
+    def get_leading_index_columns(
+        self, schema_name: Optional[str] = None
+    ) -> Dict[str, Dict[str, str]]:
+        """``{table: {column_lower: index_name}}`` for columns that lead a B-tree index
+
+        Loaded with one STATISTICS query for the whole schema. A column that
+        leads several indexes maps to the primary key, then a unique index.
+        """
+        target_schema = schema_name or self.config["database"]
+        return self._cached_metadata(
+            ("leading_index_columns", target_schema),
+            target_schema,
+            lambda: self._load_leading_index_columns(target_schema),
+        )
+
+    def _load_leading_index_columns(self, target_schema: str) -> Dict[str, Dict[str, str]]:
+        index_query = """
+        SELECT TABLE_NAME, COLUMN_NAME, INDEX_NAME, NON_UNIQUE
+        FROM INFORMATION_SCHEMA.STATISTICS
+        WHERE TABLE_SCHEMA = %s AND SEQ_IN_INDEX = 1 AND INDEX_TYPE <> 'FULLTEXT'
+        ORDER BY TABLE_NAME, INDEX_NAME <> 'PRIMARY', NON_UNIQUE, INDEX_NAME
+        """
+        leading: Dict[str, Dict[str, str]] = {}
+        for row in self.execute_query(index_query, (target_schema,)):
+            table = leading.setdefault(row["TABLE_NAME"], {})
+            table.setdefault(row["COLUMN_NAME"].lower(), row["INDEX_NAME"])
+        return leading
+
+    def get_unique_key(
+        self, table_name: str, schema_name: Optional[str] = None
+    ) -> Optional[List[str]]:
+        """Columns of the primary key, or of a NOT NULL unique index if there is none"""
+        table_info = self.get_table_info(table_name, schema_name)
+        if not table_info:
+            return None
+
+        key_columns: Dict[str, List[str]] = {}
+        for index in table_info["indexes"]:
+            if int(index["NON_UNIQUE"]) == 0:
+                key_columns.setdefault(index["INDEX_NAME"], []).append(index["COLUMN_NAME"])
+        if "PRIMARY" in key_columns:
+            return key_columns["PRIMARY"]
+
+        nullable = {
+            column["COLUMN_NAME"]
+            for column in table_info["columns"]
+            if column["IS_NULLABLE"] == "YES"
+        }
+        for columns in key_columns.values():
+            if not nullable.intersection(columns):
+                return columns
+        return None
+
+    def get_row_count(
+        self,
+        table_name: str,
+        schema_name: Optional[str] = None,
+        exact: bool = False,
+        max_execution_time_ms: Optional[int] = None,
+    ) -> Tuple[int, bool]:
+        """Get a table's row count as ``(count, is_exact)``
+
+        By default the InnoDB ``TABLE_ROWS`` estimate from the (cached) table
+        metadata is used; ``exact=True`` runs ``COUNT(*)``, which is a full
+        scan on InnoDB and can be capped with ``max_execution_time_ms``.
+        """
+        target_schema = schema_name or self.config["database"]
+        if not exact:
+            table_info = self.get_table_info(table_name, target_schema)
+            estimate = (table_info.get("table_info") or {}).get("TABLE_ROWS")
+            if estimate is not None:
+                return int(estimate), False
+
+        query = f"SELECT COUNT(*) as count FROM `{target_schema}`.`{table_name}`"
+        if max_execution_time_ms:
+            query = self.query_guard.add_time_limit(query, max_execution_time_ms)
+        results = self.execute_query(query)
+        return (results[0]["count"] if results else 0), True
+
+    def search_table(
+        self,
+        table_name: str,
+        schema_name: str,
+        column_name: str,
+        search_term: str,
+        limit: int,
+        mode: str = "auto",
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Search a column using the cheapest strategy its indexes allow
+
+        ``auto`` tries MATCH ... AGAINST on a FULLTEXT index, then a prefix
+        LIKE on a B-tree index, then a substring scan capped at the cost
+        guard's full-scan row limit. Returns the rows and a description of
+        the strategy used.
+        """
+        table_sql = f"`{schema_name}`.`{table_name}`"
+        table_info = self.get_table_info(table_name, schema_name) or {}
+        indexes = table_info.get("indexes") or []
+        escaped = escape_like(search_term)
+        strategy: Dict[str, Any] = {}
+
+        if mode in ("auto", "fulltext"):
+            index = fulltext_index(indexes, column_name)
+            if index and fulltext_searchable(search_term):
+                name, match_columns = index
+                rows = self.execute_query(
+                    self.query_guard.add_time_limit(
+                        fulltext_query(table_sql, match_columns, limit)
+                    ),
+                    (search_term, search_term),
+                )
+                strategy = {"strategy": "fulltext", "index": name, "match_columns": match_columns}
+                if rows or mode == "fulltext":
+                    return rows, strategy
+            elif mode == "fulltext":
+                raise ValueError(
+                    f"No FULLTEXT index on '{column_name}' usable for '{search_term}'"
+                )
+
+        rows: List[Dict[str, Any]] = []
+        if mode in ("auto", "prefix"):
+            index_name = leading_btree_index(indexes, column_name)
+            if index_name or mode == "prefix":
+                rows = self.execute_query(
+                    self.query_guard.add_time_limit(prefix_query(table_sql, column_name, limit)),
+                    (escaped + "%",),
+                )
+                strategy = {"strategy": "prefix", "index": index_name}
+                if len(rows) >= limit or mode == "prefix":
+                    return rows, strategy
+
+        # Leading-wildcard LIKE cannot use an index; bound the rows it reads
+        row_cap = self.query_guard.full_scan_row_limit
+        scanned = self.execute_query(
+            self.query_guard.add_time_limit(scan_query(table_sql, column_name, limit, row_cap)),
+            (f"%{escaped}%", search_term, escaped + "%", search_term),
+        )
+        estimate, _ = self.get_row_count(table_name, schema_name)
+        seen = {repr(sorted(row.items())) for row in rows}
+        for row in scanned:
+            if len(rows) >= limit:
+                break
+            if repr(sorted(row.items())) not in seen:
+                rows.append(row)
+        strategy = {
+            "strategy": "prefix+scan" if strategy.get("strategy") == "prefix" else "scan",
+            "scan_row_cap": row_cap,
+            "scan_complete": estimate <= row_cap,
+        }
+        return rows, strategy
+
+    def profile_table(
+        self,
+        table_name: str,
+        schema_name: Optional[str] = None,
+        column_names: Optional[List[str]] = None,
+        histogram_bins: int = 10,
+        top_k: int = 10,
+        max_rows: int = 1000000,
+    ) -> Dict[str, Any]:
+        """Per-column statistics for a table, cached with the schema metadata
+
+        Uses at most three queries: one aggregate pass for nulls, distinct
+        counts and min/max, one for numeric histograms, and one unpivoting
+        GROUP BY for top values of low-cardinality columns, each under the
+        query time limit. Tables larger than ``max_rows`` (by the TABLE_ROWS
+        estimate) are profiled over random primary-key blocks holding about
+        ``max_rows`` rows, or over their first ``max_rows`` rows (reported as
+        ``truncated``) when there is no integer key to sample by. Distinct
+        counts are exact COUNT(DISTINCT) over the profiled rows, so their
+        cost grows with ``max_rows`` rather than being estimated.
+        """
+        target_schema = schema_name or self.config["database"]
+        key = (
+            "profile",
+            target_schema,
+            table_name,
+            tuple(sorted(name.lower() for name in column_names or ())),
+            histogram_bins,
+            top_k,
+            max_rows,
+        )
+        return self._cached_metadata(
+            key,
+            target_schema,
+            lambda: self._load_profile(
+                table_name, target_schema, column_names, histogram_bins, top_k, max_rows
+            ),
+        )
+
+    def _load_profile(
+        self,
+        table_name: str,
+        target_schema: str,
+        column_names: Optional[List[str]],
+        histogram_bins: int,
+        top_k: int,
+        max_rows: int,
+    ) -> Dict[str, Any]:
+        columns = self.get_table_schema(table_name, target_schema)
+        if column_names:
+            wanted = {name.lower() for name in column_names}
+            columns = [c for c in columns if c["COLUMN_NAME"].lower() in wanted]
+        if not columns:
+            return {}
+
+        estimate, _ = self.get_row_count(table_name, target_schema)
+        table_sql = f"`{target_schema}`.`{table_name}`"
+        source_sql, source_params = table_sql, ()
+        sample_method = None
+        if max_rows and estimate > max_rows:
+            key = self.get_sampling_key(table_name, target_schema)
+            low, high = self._key_bounds(table_sql, f"`{key}`") if key else (None, None)
+            if low is not None:
+                source_sql, source_params = block_sample_source(
+                    table_sql, columns, key, low, high, max_rows / estimate, random.Random()
+                )
+                sample_method = "primary_key_blocks"
+            else:
+                # No key to sample by: the first rows are all that can be read cheaply
+                source_sql = (
+                    f"(SELECT {source_columns(columns)} FROM {table_sql} "
+                    f"LIMIT {int(max_rows)}) AS _profile"
+                )
+                sample_method = "first_rows"
+
+        limit = self.query_guard.add_time_limit
+        summary = self.execute_query(
+            limit(build_summary_query(source_sql, columns)), source_params
+        )
+        row_count, profiles = parse_summary(summary[0] if summary else {}, columns)
+
+        histogram_query, params, layout = build_histogram_query(
+            source_sql, profiles, histogram_bins
+        )
+        if histogram_query:
+            histograms = self.execute_query(limit(histogram_query), params + source_params)
+            apply_histograms(histograms[0] if histograms else {}, profiles, layout)
+
+        top_values_query = build_top_values_query(source_sql, profiles)
+        if top_values_query:
+            apply_top_values(
+                self.execute_query(limit(top_values_query), source_params), profiles, top_k
+            )
+
+        return {
+            "rows_profiled": row_count,
+            # Only a random block sample stands for the whole table
+            "sampled": sample_method == "primary_key_blocks",
+            "truncated": sample_method == "first_rows",
+            "columns": profiles,
+        }
+
+    def get_changes(
+        self,
+        table_name: str,
+        schema_name: Optional[str] = None,
+        watermark: Optional[str] = None,
+        change_column: Optional[str] = None,
+        limit: int = 1000,
+        from_now: bool = False,
+    ) -> Dict[str, Any]:
+        """Rows added or changed after a watermark, and the watermark after them
+
+        The change column comes from the watermark, ``change_column``, or
+        detection (``updated_at``-style, then ``created_at``-style timestamps,
+        then an auto-increment key). The table's unique key breaks timestamp
+        ties. Deleted rows and rows whose change column is NULL are not seen.
+        """
+        target_schema = schema_name or self.config["database"]
+        columns = self.get_table_schema(table_name, target_schema)
+        if not columns:
+            raise ValueError(f"Table '{target_schema}.{table_name}' not found")
+        by_name = {column["COLUMN_NAME"].lower(): column for column in columns}
+        key_columns = self.get_unique_key(table_name, target_schema) or []
+
+        state = decode_watermark(watermark, target_schema, table_name) if watermark else None
+        if state:
+            strategy, column = state["s"], state["c"]
+            if column.lower() not in by_name:
+                raise ValueError(f"Watermark column '{column}' no longer exists")
+        elif change_column:
+            if change_column.lower() not in by_name:
+                raise ValueError(f"Unknown change column '{change_column}'")
+            column = by_name[change_column.lower()]["COLUMN_NAME"]
+            strategy = classify_change_column(by_name[column.lower()])
+            if not strategy:
+                raise ValueError(
+                    f"Change column '{column}' must be a DATE/DATETIME/TIMESTAMP or integer column"
+                )
+        else:
+            detected = detect_change_column(columns, key_columns)
+            if not detected:
+                raise ValueError(
+                    f"No change column found in '{target_schema}.{table_name}'; "
+                    "pass change_column (a timestamp or increasing integer)"
+                )
+            strategy, column = detected
+
+        tie_keys = [] if strategy == "auto_increment" else key_columns
+        if state and len(state.get("k") or []) != len(tie_keys):
+            raise ValueError("The table's unique key has changed; restart without a watermark")
+        table_sql = f"`{target_schema}`.`{table_name}`"
+        indexes = self.get_table_info(table_name, target_schema).get("indexes", [])
+        result: Dict[str, Any] = {
+            "strategy": strategy,
+            "change_column": column,
+            "tie_break_columns": [name for name in tie_keys if name.lower() != column.lower()],
+            "indexed": leading_btree_index(indexes, column) is not None,
+            # Without a unique key, rows sharing the last timestamp can be missed
+            "exact": strategy == "auto_increment" or bool(tie_keys),
+        }
+
+        if from_now and state is None:
+            latest = self.execute_query(
+                self.query_guard.add_time_limit(build_latest_query(table_sql, column, tie_keys))
+            )
+            result.update({"rows": [], "has_more": False, "plan": None})
+            result["watermark"] = (
+                encode_watermark(target_schema, table_name, strategy, column, tie_keys, latest[0])
+                if latest else None
+            )
+            return result
+
+        query, params = build_changes_query(table_sql, column, tie_keys, state, limit)
+        guarded_query, plan = self.guard_query(query, params)
+        rows = self.execute_query(guarded_query, params)
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        result.update(
+            {
+                "rows": rows,
+                "has_more": has_more,
+                "plan": plan,
+                "watermark": encode_watermark(
+                    target_schema, table_name, strategy, column, tie_keys, rows[-1]
+                )
+                if rows
+                else watermark,
+            }
+        )
+        return result
+
+    def get_sampling_key(
+        self, table_name: str, schema_name: Optional[str] = None
+    ) -> Optional[str]:
+        """Single-column integer primary/unique key usable for range sampling"""
+        target_schema = schema_name or self.config["database"]
+        key_columns = self.get_unique_key(table_name, target_schema)
+        if not key_columns or len(key_columns) != 1:
+            return None
+        for column in self.get_table_schema(table_name, target_schema):
+            if column["COLUMN_NAME"].lower() == key_columns[0].lower():
+                if (column.get("DATA_TYPE") or "").lower() in _INTEGER_TYPES:
+                    return column["COLUMN_NAME"]
+        return None
+
+    def _key_bounds(self, table_sql: str, key_sql: str) -> Tuple[Any, Any]:
+        bounds = self.execute_query(
+            f"SELECT MIN({key_sql}) AS low, MAX({key_sql}) AS high FROM {table_sql}"
+        )
+        if not bounds or bounds[0]["low"] is None:
+            return None, None
+        return int(bounds[0]["low"]), int(bounds[0]["high"])
+
+    def get_shard_range(
+        self,
+        table_name: str,
+        schema_name: Optional[str] = None,
+        time_column: Optional[str] = None,
+    ) -> Optional[Tuple[str, Any, Any]]:
+        """Column and ``(low, high)`` bounds to split a table into range shards
+
+        Prefers a single-column integer key, then ``time_column`` when an
+        index starts with it; both make each shard an index range scan.
+        Nullable columns are skipped, since no range would cover NULL rows.
+        """
+        target_schema = schema_name or self.config["database"]
+        candidates = []
+        key = self.get_sampling_key(table_name, target_schema)
+        if key:
+            candidates.append(key)
+        if time_column:
+            indexes = self.get_table_info(table_name, target_schema).get("indexes", [])
+            if leading_btree_index(indexes, time_column):
+                candidates.append(time_column)
+        not_null = {
+            column["COLUMN_NAME"].lower()
+            for column in self.get_table_schema(table_name, target_schema)
+            if column.get("IS_NULLABLE") == "NO"
+        }
+
+        table_sql = f"`{target_schema}`.`{table_name}`"
+        for column in candidates:
+            if column.lower() not in not_null:
+                continue
+            column_sql = f"`{column}`"
+            bounds = self.execute_query(
+                f"SELECT MIN({column_sql}) AS low, MAX({column_sql}) AS high FROM {table_sql}"
+            )
+            if bounds and bounds[0]["low"] is not None:
+                return column, bounds[0]["low"], bounds[0]["high"]
+        return None
+
+    def approximate_aggregate(
+        self,
+        table_name: str,
+        schema_name: Optional[str],
+        columns: List[Dict[str, Any]],
+        metrics: Optional[List[Dict[str, Any]]] = None,
+        group_by: Optional[List[str]] = None,
+        filters: Optional[List[Dict[str, Any]]] = None,
+        time_column: Optional[str] = None,
+        time_bucket: Optional[str] = None,
+        error_bound: float = 0.05,
+        seed: Optional[int] = None,
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Estimate an aggregate from random primary-key blocks
+
+        The key range is cut into equal-width blocks; rounds read a growing
+        random set of blocks (32, then doubling) until every count, sum
+        and avg metric's 95% interval over the whole table is within
+        ``error_bound`` of its estimate, the time budget runs out, or every block has been read.
+        Rows are unordered and unlimited; returns ``(rows, sampling_info)``.
+        """
+        target_schema = schema_name or self.config["database"]
+        key = self.get_sampling_key(table_name, target_schema)
+        if not key:
+            raise ValueError("Approximate mode needs a single-column integer primary key")
+
+        catalog = ColumnCatalog(columns)
+        group_items, metric_items = resolve_aggregation(
+            catalog, metrics, group_by, time_column, time_bucket
+        )
+        partial_selects = partial_metric_select(metric_items)
+        conditions, params = compile_filters(filters, catalog)
+
+        table_sql = f"`{target_schema}`.`{table_name}`"
+        low, high = self._key_bounds(table_sql, f"`{key}`")
+        if low is None:
+            low = high = 0
+        width, block_count = block_layout(low, high)
+        rng, seed = make_rng(seed)
+        order = sample_order(block_count, rng)
+        estimator = BlockEstimator([alias for _, alias in group_items], metric_items, block_count)
+
+        deadline = time.monotonic() + self.approximate_time_budget
+        taken = 0
+        round_size = INITIAL_BLOCKS
+        stopped = "all_blocks"
+        while taken < block_count:
+            blocks = order[taken: taken + round_size]
+            taken += len(blocks)
+            for batch in block_batches(blocks):
+                query, range_params = block_query(
+                    table_sql,
+                    key,
+                    low,
+                    width,
+                    batch,
+                    [select_sql for select_sql, _ in group_items],
+                    [alias for _, alias in group_items],
+                    partial_selects,
+                    conditions,
+                )
+                rows = self.execute_query(
+                    self.query_guard.add_time_limit(query), tuple(params) + range_params
+                )
+                estimator.add(batch, rows)
+            if estimator.exact:
+                break
+            if estimator.relative_error() <= error_bound:
+                stopped = "error_bound"
+                break
+            if time.monotonic() >= deadline:
+                stopped = "time_budget"
+                break
+            round_size = taken  # double the sample each round
+
+        relative_error = estimator.relative_error()
+        return estimator.results(), {
+            "method": "primary_key_block_sample",
+            "key": key,
+            "blocks_sampled": taken,
+            "blocks_total": block_count,
+            "sampled_fraction": round(taken / block_count, 4),
+            "rows_read": estimator.rows_read,
+            "confidence": estimator.confidence,
+            "error_bound": error_bound,
+            "relative_error": round(relative_error, 4) if relative_error != float("inf") else None,
+            "stopped_by": stopped,
+            "exact": estimator.exact,
+            "seed": seed,
+        }
+
+    def sample_pk_range(
+        self,
+        table_name: str,
+        schema_name: str,
+        key_column: str,
+        sample_size: int,
+        rng: random.Random,
+        max_rounds: int = 3,
+    ) -> List[Dict[str, Any]]:
+        """Sample rows by seeking to random points in the integer key range
+
+        Costs one MIN/MAX lookup plus ``sample_size`` index dives per round,
+        independent of table size. Rows that follow large key gaps are
+        somewhat more likely to be picked.
+        """
+        table_sql = f"`{schema_name}`.`{table_name}`"
+        key_sql = f"`{key_column}`"
+        low, high = self._key_bounds(table_sql, key_sql)
+        if low is None:
+            return []
+
+        rows_by_key: Dict[Any, Dict[str, Any]] = {}
+        for round_number in range(max_rounds):
+            needed = sample_size - len(rows_by_key)
+            if needed <= 0:
+                break
+            # Oversample on retries; seeks past a gap land on the same row
+            points = random_points(rng, low, high, needed * (2 if round_number else 1))
+            query = probe_union_query(table_sql, key_sql, len(points))
+            for row in self.execute_query(query, tuple(points)):
+                if len(rows_by_key) >= sample_size:
+                    break
+                rows_by_key.setdefault(row[key_column], row)
+            if len(rows_by_key) > high - low:
+                break  # fewer distinct keys than requested
+        return [rows_by_key[key] for key in sorted(rows_by_key)]
+
+    def sample_reservoir(
+        self,
+        table_name: str,
+        schema_name: str,
+        sample_size: int,
+        rng: random.Random,
+        time_budget_seconds: float,
+    ) -> Tuple[List[Dict[str, Any]], int, bool]:
+        """Uniform sample over a streamed scan, stopped at the time budget
+
+        Returns ``(rows, rows_scanned, complete)``. When the budget runs out
+        the sample is uniform over the rows scanned so far only.
+        """
+        deadline = time.monotonic() + time_budget_seconds
+        reservoir = Reservoir(sample_size, rng)
+        complete = True
+        stream = self.iter_query(
+            f"SELECT * FROM `{schema_name}`.`{table_name}`",
+            batch_size=self.stream_batch_size,
+        )
+        try:
+            for batch in stream:
+                for row in batch:
+                    reservoir.add(row)
+                if time.monotonic() > deadline:
+                    complete = False
+                    break
+        finally:
+            stream.close()
+        return reservoir.rows, reservoir.seen, complete
+
+    def sample_stratified(
+        self,
+        table_name: str,
+        schema_name: str,
+        column_name: str,
+        sample_size: int,
+        rng: random.Random,
+        key_column: Optional[str] = None,
+        max_rounds: int = 3,
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Dict[str, Any]]:
+        """Sample an equal share of rows from each of the most common values
+
+        Returns ``(rows, strata, plan)`` where strata lists each sampled value
+        and its row count and plan names the index used. The ``sample_size``
+        rows are split evenly, extra rows going to the most common values;
+        when there are more values than rows, the least common values are
+        skipped and counted in ``plan["strata_skipped"]``. Counting the strata
+        reads the whole column, which stays an index-only scan when an index
+        leads with it; tables above ``MYSQL_FULL_SCAN_ROW_LIMIT`` rows without
+        such an index are refused.
+
+        Rows within a stratum are random key seeks inside the stratum's key
+        range when that index also orders rows by the integer key, else a
+        reservoir over one scan of a small table. Large tables without key
+        seeks fall back to each stratum's first rows, reported with
+        ``plan["random_within_strata"]`` false.
+        """
+        table_sql = f"`{schema_name}`.`{table_name}`"
+        column_sql = f"`{column_name}`"
+        indexes = self.get_table_info(table_name, schema_name).get("indexes", [])
+        index, seekable = stratum_index(indexes, column_name, key_column)
+        estimate, _ = self.get_row_count(table_name, schema_name)
+        row_cap = self.query_guard.full_scan_row_limit
+        if index is None and estimate > row_cap:
+            raise ValueError(
+                f"stratified sampling of '{table_name}' (~{estimate} rows) needs an index "
+                f"starting with `{column_name}`, otherwise every stratum scans more than "
+                f"MYSQL_FULL_SCAN_ROW_LIMIT ({row_cap}) rows; add one or use mode='pk_range'"
+            )
+        plan: Dict[str, Any] = {"index": index, "key_seeks": False}
+
+        key_sql = f"`{key_column}`" if key_column else None
+        # The index ends with the key, so per-stratum key bounds come with the count
+        bounds = f", MIN({key_sql}) AS _low, MAX({key_sql}) AS _high" if seekable else ""
+        strata = self.execute_query(
+            self.query_guard.add_time_limit(
+                f"SELECT {column_sql} AS value, COUNT(*) AS row_count{bounds} FROM {table_sql} "
+                f"GROUP BY {column_sql} ORDER BY row_count DESC LIMIT {MAX_STRATA}"
+            )
+        )
+        # Strata come most common first; any beyond sample_size get no rows
+        shares = [share for share in allocate_strata(sample_size, len(strata)) if share]
+        plan["strata_skipped"] = len(strata) - len(shares)
+        strata = strata[: len(shares)]
+        key_bounds = [(stratum.pop("_low", None), stratum.pop("_high", None)) for stratum in strata]
+        if not strata:
+            return [], [], plan
+
+        slot_of = {stratum_key(stratum["value"]): slot for slot, stratum in enumerate(strata)}
+        if seekable:
+            picked = self._stratum_seeks(
+                table_sql, column_name, key_column, strata, shares, key_bounds, slot_of, rng, max_rounds
+            )
+            plan.update({"key_seeks": True, "random_within_strata": True})
+        elif estimate <= row_cap:
+            reservoirs = [Reservoir(share, rng) for share in shares]
+            stream = self.iter_query(
+                self.query_guard.add_time_limit(f"SELECT * FROM {table_sql}"),
+                batch_size=self.stream_batch_size,
+            )
+            try:
+                for batch in stream:
+                    for row in batch:
+                        slot = slot_of.get(stratum_key(row[column_name]))
+                        if slot is not None:
+                            reservoirs[slot].add(row)
+            finally:
+                stream.close()
+            picked = [reservoir.rows for reservoir in reservoirs]
+            plan["random_within_strata"] = True
+        else:
+            parts: List[str] = []
+            params: List[Any] = []
+            for stratum, share in zip(strata, shares):
+                condition, condition_params = stratum_condition(column_sql, stratum["value"])
+                parts.append(f"(SELECT * FROM {table_sql} WHERE {condition} LIMIT {share})")
+                params.extend(condition_params)
+            picked = [[] for _ in strata]
+            for row in self.execute_query(" UNION ALL ".join(parts), tuple(params)):
+                slot = slot_of.get(stratum_key(row[column_name]))
+                if slot is not None and len(picked[slot]) < shares[slot]:
+                    picked[slot].append(row)
+            plan["random_within_strata"] = False
+
+        return [row for rows in picked for row in rows][:sample_size], strata, plan
+
+    def _stratum_seeks(
+        self,
+        table_sql: str,
+        column_name: str,
+        key_column: str,
+        strata: List[Dict[str, Any]],
+        shares: List[int],
+        key_bounds: List[Tuple[Any, Any]],
+        slot_of: Dict[Any, int],
+        rng: random.Random,
+        max_rounds: int,
+    ) -> List[List[Dict[str, Any]]]:
+        """Random key seeks within each stratum, like ``sample_pk_range`` per value"""
+        column_sql = f"`{column_name}`"
+        key_sql = f"`{key_column}`"
+        picked: List[Dict[Any, Dict[str, Any]]] = [{} for _ in strata]
+        for round_number in range(max_rounds):
+            parts: List[str] = []
+            params: List[Any] = []
+            for slot, (stratum, share) in enumerate(zip(strata, shares)):
+                needed = min(share, int(stratum["row_count"])) - len(picked[slot])
+                low, high = key_bounds[slot]
+                if needed <= 0 or low is None:
+                    continue
+                condition, condition_params = stratum_condition(column_sql, stratum["value"])
+                if int(stratum["row_count"]) <= share:
+                    # The whole stratum fits in its share
+                    parts.append(f"(SELECT * FROM {table_sql} WHERE {condition} LIMIT {share})")
+                    params.extend(condition_params)
+                    continue
+                # Oversample on retries; seeks past a gap land on the same row
+                points = random_points(rng, int(low), int(high), needed * (2 if round_number else 1))
+                parts.append(probe_union_query(table_sql, key_sql, len(points), condition))
+                for point in points:
+                    params.extend(condition_params + [point])
+            if not parts:
+                break
+            for row in self.execute_query(" UNION ALL ".join(parts), tuple(params)):
+                slot = slot_of.get(stratum_key(row[column_name]))
+                if slot is not None and len(picked[slot]) < shares[slot]:
+                    picked[slot].setdefault(row[key_column], row)
+        return [[rows[key] for key in sorted(rows)] for rows in picked]
+
 
 # Global database instance
-db = MySQLConnection()
\ No newline at end of file
+db = MySQLConnection()
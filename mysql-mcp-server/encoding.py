@@ -0,0 +1,104 @@
+"""
+Streaming JSON encoding for MySQL tool results
+"""
+
+import json
+import datetime
+from decimal import Decimal
+from typing import Dict, List, Any, Iterable, Tuple
+
+_COMPACT = (",", ":")
+
+RESULT_FORMATS = ("rows", "columnar")
+
+
+def normalize_value(value: Any) -> Any:
+    """JSON-friendly form of MySQL driver types (used for the columnar format)"""
+    if isinstance(value, Decimal):
+        if value == value.to_integral_value():
+            return int(value)
+        return float(value)
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, datetime.timedelta):
+        return str(value)
+    if isinstance(value, (bytes, bytearray)):
+        try:
+            return value.decode("utf-8")
+        except UnicodeDecodeError:
+            return value.hex()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    return str(value)
+
+
+def encode_rows_json(
+    header: Dict[str, Any],
+    batches: Iterable[List[Dict[str, Any]]],
+    rows_key: str = "results",
+    count_key: str = "row_count",
+    format: str = "rows",
+) -> Tuple[str, int]:
+    """Encode ``header`` plus streamed row batches as one compact JSON object
+
+    Rows are serialized batch by batch as they arrive from the cursor, so only
+    the current batch and the output text are held in memory. The row count
+    is written after the rows, once it is known.
+
+    With ``format="columnar"`` the rows are written as ``"columns"`` (the
+    column names, once) plus ``rows_key`` holding one array per row, and
+    Decimal/datetime values are normalized to JSON numbers and ISO strings.
+
+    Returns:
+        Tuple[str, int]: The JSON document and the number of rows written
+    """
+    if format not in RESULT_FORMATS:
+        raise ValueError(f"Unknown result format '{format}', expected one of {RESULT_FORMATS}")
+    columnar = format == "columnar"
+
+    parts = ["{"]
+    for key, value in header.items():
+        parts.append(json.dumps(key))
+        parts.append(":")
+        parts.append(json.dumps(value, separators=_COMPACT, default=str))
+        parts.append(",")
+    if columnar:
+        parts.append('"format":"columnar",')
+        columns_index = len(parts)
+        parts.append('"columns":[],')
+    parts.append(json.dumps(rows_key))
+    parts.append(":[")
+
+    count = 0
+    if columnar:
+        encoder = json.JSONEncoder(separators=_COMPACT, default=normalize_value)
+    else:
+        encoder = json.JSONEncoder(separators=_COMPACT, default=str)
+    try:
+        for batch in batches:
+            if not batch:
+                continue
+            if columnar:
+                if not count:
+                    columns = list(batch[0].keys())
+                    parts[columns_index] = (
+                        '"columns":' + json.dumps(columns, separators=_COMPACT) + ","
+                    )
+                encoded = ",".join(encoder.encode(list(row.values())) for row in batch)
+            else:
+                encoded = ",".join(encoder.encode(row) for row in batch)
+            # One string per batch keeps the part list small
+            if count:
+                parts.append(",")
+            parts.append(encoded)
+            count += len(batch)
+    finally:
+        # Release the cursor's connection promptly if encoding fails midway
+        close = getattr(batches, "close", None)
+        if close:
+            close()
+
+    parts.append("],")
+    parts.append(json.dumps(count_key))
+    parts.append(f":{count}}}")
+    return "".join(parts), count
@@ -0,0 +1,471 @@
+"""
+Export large SELECT results to local Parquet/CSV files addressed by handle
+"""
+
+import os
+import re
+import csv
+import json
+import time
+import secrets
+import datetime
+import threading
+from decimal import Decimal
+from typing import Dict, List, Any, Optional, Tuple, Iterable, Iterator
+
+from aggregation import MAX_GROUPS, AggregationSpecError, metric_alias, normalize_metrics
+from encoding import normalize_value
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet exports are optional; CSV always works
+    pa = None
+    pq = None
+
+EXPORT_FORMATS = ("auto", "parquet", "csv")
+
+# Rows buffered per Parquet row group
+ROW_GROUP_ROWS = 50000
+
+# Distinct groups an export aggregate may hold in memory
+MAX_EXPORT_GROUPS = 100000
+
+_HANDLE = re.compile(r"^[0-9a-f]{16}$")
+
+
+class ExportError(ValueError):
+    """Raised for unknown or expired handles and unusable export requests"""
+
+
+def _kind(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, int):
+        return "integer"
+    if isinstance(value, (float, Decimal)):
+        return "number"
+    if isinstance(value, datetime.datetime):
+        return "datetime"
+    if isinstance(value, datetime.date):
+        return "date"
+    return "string"
+
+
+def _widen(current: Optional[str], value: Any) -> Optional[str]:
+    kind = _kind(value)
+    if kind is None or kind == current:
+        return current
+    if current is None:
+        return kind
+    if {current, kind} <= {"integer", "number", "boolean"}:
+        return "number" if "number" in (current, kind) else "integer"
+    return "string"
+
+
+class _CsvWriter:
+    """Appends batches to a CSV file; NULL is written as an empty field"""
+
+    extension = "csv"
+
+    def __init__(self, path: str):
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self.columns: Optional[List[str]] = None
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        if self.columns is None:
+            self.columns = list(rows[0].keys())
+            self._writer.writerow(self.columns)
+        for row in rows:
+            self._writer.writerow(
+                [
+                    "" if value is None
+                    else value if isinstance(value, (str, int, float))
+                    else normalize_value(value)
+                    for value in (row.get(column) for column in self.columns)
+                ]
+            )
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class _ParquetWriter:
+    """Buffers batches into row groups of a single Parquet file
+
+    The Arrow schema is inferred from the first row group. DECIMAL values
+    are stored as doubles, and a column that was entirely NULL in the first
+    row group is stored as strings.
+    """
+
+    extension = "parquet"
+
+    def __init__(self, path: str):
+        self._path = path
+        self._writer = None
+        self._schema = None
+        self._buffer: List[Dict[str, Any]] = []
+        self.columns: Optional[List[str]] = None
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        if self.columns is None:
+            self.columns = list(rows[0].keys())
+        self._buffer.extend(rows)
+        if len(self._buffer) >= ROW_GROUP_ROWS:
+            self._flush()
+
+    def _convert(self, rows: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+        data: Dict[str, List[Any]] = {}
+        for column in self.columns:
+            values = [row.get(column) for row in rows]
+            values = [float(v) if isinstance(v, Decimal) else v for v in values]
+            if self._schema is not None and pa.types.is_string(self._schema.field(column).type):
+                values = [
+                    v if v is None or isinstance(v, str) else str(normalize_value(v))
+                    for v in values
+                ]
+            data[column] = values
+        return data
+
+    def _flush(self) -> None:
+        if not self._buffer:
+            return
+        data = self._convert(self._buffer)
+        self._buffer = []
+        if self._schema is None:
+            table = pa.table(data)
+            fields = [
+                pa.field(field.name, pa.string()) if pa.types.is_null(field.type) else field
+                for field in table.schema
+            ]
+            self._schema = pa.schema(fields)
+            table = table.cast(self._schema)
+            self._writer = pq.ParquetWriter(self._path, self._schema, compression="snappy")
+        else:
+            table = pa.table(data, schema=self._schema)
+        self._writer.write_table(table)
+
+    def close(self) -> None:
+        self._flush()
+        if self._writer is not None:
+            self._writer.close()
+
+
+class ExportStore:
+    """Export files and their metadata under one directory
+
+    Each export is ``<handle>.parquet`` or ``<handle>.csv`` plus a
+    ``<handle>.json`` sidecar holding the row count, column types and byte
+    size. Exports older than ``ttl_seconds`` are deleted on the next export.
+    """
+
+    def __init__(self, directory: str, ttl_seconds: float = 3600.0, max_rows: int = 10000000):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+
+    @property
+    def parquet_available(self) -> bool:
+        return pa is not None
+
+    def resolve_format(self, format: str) -> str:
+        format = (format or "auto").lower()
+        if format not in EXPORT_FORMATS:
+            raise ExportError(f"Unknown export format '{format}', expected one of {EXPORT_FORMATS}")
+        if format == "auto":
+            return "parquet" if self.parquet_available else "csv"
+        if format == "parquet" and not self.parquet_available:
+            raise ExportError("Parquet exports need pyarrow (pip install pyarrow); use format='csv'")
+        return format
+
+    def _path(self, handle: str, extension: str) -> str:
+        return os.path.join(self.directory, f"{handle}.{extension}")
+
+    def create(
+        self, batches: Iterable[List[Dict[str, Any]]], format: str, query: str
+    ) -> Dict[str, Any]:
+        """Stream ``batches`` into a new export file and return its metadata"""
+        format = self.resolve_format(format)
+        os.makedirs(self.directory, exist_ok=True)
+        self.purge_expired()
+
+        handle = secrets.token_hex(8)
+        writer = _ParquetWriter if format == "parquet" else _CsvWriter
+        path = self._path(handle, writer.extension)
+        output = writer(path)
+        start = time.monotonic()
+        row_count = 0
+        truncated = False
+        types: Dict[str, Optional[str]] = {}
+        try:
+            for batch in batches:
+                if not batch:
+                    continue
+                if self.max_rows and row_count + len(batch) > self.max_rows:
+                    batch = batch[: self.max_rows - row_count]
+                    truncated = True
+                for row in batch:
+                    for column, value in row.items():
+                        types[column] = _widen(types.get(column), value)
+                output.write(batch)
+                row_count += len(batch)
+                if truncated:
+                    break
+            output.close()
+        except BaseException:
+            output.close()
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+        finally:
+            # Stops an abandoned streaming cursor
+            close = getattr(batches, "close", None)
+            if close:
+                close()
+
+        columns = output.columns or []
+        created = time.time()
+        expires = created + self.ttl_seconds if self.ttl_seconds else None
+        meta = {
+            "handle": handle,
+            "format": format,
+            "path": os.path.abspath(path) if os.path.exists(path) else None,
+            "query": query,
+            "row_count": row_count,
+            "truncated": truncated,
+            "columns": [{"name": c, "type": types.get(c) or "string"} for c in columns],
+            "bytes": os.path.getsize(path) if os.path.exists(path) else 0,
+            "elapsed_ms": round((time.monotonic() - start) * 1000, 2),
+            "created_at": _timestamp(created),
+            "expires_at": _timestamp(expires) if expires else None,
+        }
+        with open(self._path(handle, "json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        return meta
+
+    def get(self, handle: str) -> Dict[str, Any]:
+        """Metadata of an existing export"""
+        if not isinstance(handle, str) or not _HANDLE.match(handle):
+            raise ExportError(f"Invalid export handle '{handle}'")
+        try:
+            with open(self._path(handle, "json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            raise ExportError(f"Unknown or expired export handle '{handle}'")
+        if meta["row_count"] and not os.path.exists(meta["path"] or ""):
+            raise ExportError(f"Export '{handle}' has no data file")
+        return meta
+
+    def iter_rows(
+        self, meta: Dict[str, Any], columns: Optional[List[str]] = None, batch_size: int = 1000
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """Read an export back in batches of row dictionaries"""
+        if not meta["row_count"]:
+            return
+        names = [column["name"] for column in meta["columns"]]
+        if columns:
+            lookup = {name.lower(): name for name in names}
+            unknown = [c for c in columns if not isinstance(c, str) or c.lower() not in lookup]
+            if unknown:
+                raise ExportError(f"Unknown export columns {unknown}, available: {names}")
+            columns = [lookup[c.lower()] for c in columns]
+
+        if meta["format"] == "parquet":
+            if pq is None:
+                raise ExportError("Reading Parquet exports needs pyarrow (pip install pyarrow)")
+            parquet = pq.ParquetFile(meta["path"])
+            for record_batch in parquet.iter_batches(batch_size=batch_size, columns=columns):
+                yield record_batch.to_pylist()
+            return
+
+        types = {column["name"]: column["type"] for column in meta["columns"]}
+        with open(meta["path"], "r", newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            header = next(reader, None) or []
+            wanted = columns or header
+            positions = [(name, header.index(name), types.get(name)) for name in wanted]
+            batch = []
+            for record in reader:
+                batch.append(
+                    {name: _parse_csv(record[index], kind) for name, index, kind in positions}
+                )
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+
+    def read_slice(
+        self, handle: str, offset: int = 0, limit: int = 100, columns: Optional[List[str]] = None
+    ) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        meta = self.get(handle)
+        offset = max(0, int(offset))
+        rows: List[Dict[str, Any]] = []
+        seen = 0
+        for batch in self.iter_rows(meta, columns):
+            if seen + len(batch) <= offset:
+                seen += len(batch)
+                continue
+            start = max(0, offset - seen)
+            rows.extend(batch[start: start + limit - len(rows)])
+            seen += len(batch)
+            if len(rows) >= limit:
+                break
+        return meta, rows
+
+    def aggregate(
+        self,
+        handle: str,
+        metrics: Optional[List[Dict[str, Any]]] = None,
+        group_by: Optional[List[str]] = None,
+        order_by: Optional[str] = None,
+        descending: bool = True,
+        limit: int = 100,
+    ) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """GROUP BY over an export, streamed in one pass"""
+        meta = self.get(handle)
+        names = {column["name"].lower(): column["name"] for column in meta["columns"]}
+        kinds = {column["name"]: column["type"] for column in meta["columns"]}
+
+        def resolve(name: Any, role: str) -> str:
+            if not isinstance(name, str) or name.lower() not in names:
+                raise AggregationSpecError(f"Unknown {role} column '{name}'")
+            return names[name.lower()]
+
+        groups = [resolve(name, "group_by") for name in group_by or []]
+        specs = []
+        for metric in normalize_metrics(metrics):
+            column = metric["column"]
+            if column in (None, "*"):
+                if metric["fn"] not in ("count",):
+                    raise AggregationSpecError(f"{metric['fn']} needs a column")
+                column = None
+            else:
+                column = resolve(column, f"{metric['fn']} metric")
+                if metric["fn"] in ("sum", "avg") and kinds[column] not in ("integer", "number", "boolean"):
+                    raise AggregationSpecError(
+                        f"{metric['fn']} needs a numeric column, '{column}' is {kinds[column]}"
+                    )
+            specs.append((metric["fn"], column, metric_alias(dict(metric, column=column))))
+        output = groups + [alias for _, _, alias in specs]
+        if len(set(output)) != len(output):
+            raise AggregationSpecError(f"Duplicate output columns in {output}")
+
+        needed = sorted(set(groups) | {column for _, column, _ in specs if column})
+        accumulators: Dict[Tuple, List[Any]] = {}
+        for batch in self.iter_rows(meta, needed or None):
+            for row in batch:
+                key = tuple(row.get(name) for name in groups)
+                state = accumulators.get(key)
+                if state is None:
+                    if len(accumulators) >= MAX_EXPORT_GROUPS:
+                        raise ExportError(
+                            f"More than {MAX_EXPORT_GROUPS} groups; group by fewer columns"
+                        )
+                    state = accumulators[key] = [_initial(fn) for fn, _, _ in specs]
+                for index, (fn, column, _) in enumerate(specs):
+                    value = row.get(column) if column else True
+                    if value is not None:
+                        state[index] = _accumulate(fn, state[index], value)
+
+        rows = []
+        for key, state in accumulators.items():
+            row = dict(zip(groups, key))
+            for (fn, _, alias), value in zip(specs, state):
+                row[alias] = _finish(fn, value)
+            rows.append(row)
+        if not groups and not rows:
+            rows.append({alias: _finish(fn, _initial(fn)) for fn, _, alias in specs})
+
+        sort_key = order_by or output[len(groups)]
+        if sort_key not in output:
+            raise AggregationSpecError(f"Cannot order by '{sort_key}', expected one of {output}")
+        # NULLs sort last in both directions
+        present = [row for row in rows if row[sort_key] is not None]
+        present.sort(key=lambda row: row[sort_key], reverse=descending)
+        rows = present + [row for row in rows if row[sort_key] is None]
+        return meta, rows[: max(1, min(int(limit), MAX_GROUPS))]
+
+    def delete(self, handle: str) -> bool:
+        meta = self.get(handle)
+        for path in (meta["path"] or "", self._path(handle, "json")):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        return True
+
+    def purge_expired(self) -> int:
+        """Remove exports past their TTL"""
+        if not self.ttl_seconds or not os.path.isdir(self.directory):
+            return 0
+        cutoff = time.time() - self.ttl_seconds
+        removed = 0
+        with self._lock:
+            for name in os.listdir(self.directory):
+                handle, _, extension = name.partition(".")
+                if not _HANDLE.match(handle) or extension not in ("json", "csv", "parquet"):
+                    continue
+                path = os.path.join(self.directory, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                        removed += extension == "json"
+                except OSError:
+                    pass
+        return removed
+
+
+def _timestamp(epoch: float) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(epoch))
+
+
+def _parse_csv(text: str, kind: Optional[str]) -> Any:
+    if text == "":
+        return None
+    try:
+        if kind == "integer":
+            return int(text)
+        if kind == "number":
+            return float(text)
+    except ValueError:
+        return text
+    return text
+
+
+def _initial(fn: str) -> Any:
+    if fn == "count":
+        return 0
+    if fn == "count_distinct":
+        return set()
+    if fn == "avg":
+        return (0.0, 0)
+    return None
+
+
+def _accumulate(fn: str, state: Any, value: Any) -> Any:
+    if fn == "count":
+        return state + 1
+    if fn == "count_distinct":
+        state.add(value)
+        return state
+    if fn == "sum":
+        return (state or 0) + value
+    if fn == "avg":
+        return (state[0] + float(value), state[1] + 1)
+    if fn == "min":
+        return value if state is None or value < state else state
+    return value if state is None or value > state else state
+
+
+def _finish(fn: str, state: Any) -> Any:
+    if fn == "count_distinct":
+        return len(state)
+    if fn == "avg":
+        return state[0] / state[1] if state[1] else None
+    return state
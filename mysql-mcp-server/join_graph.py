@@ -0,0 +1,205 @@
+"""
+Foreign-key graph and join-path search for find_mysql_join_path
+"""
+
+from collections import deque
+from typing import Dict, List, Any, Optional, Tuple
+
+Table = Tuple[str, str]
+
+
+def _quote(identifier: str) -> str:
+    return "`" + identifier.replace("`", "``") + "`"
+
+
+def table_label(table: Table) -> str:
+    return f"{table[0]}.{table[1]}"
+
+
+class ForeignKey:
+    """One (possibly multi-column) foreign key constraint"""
+
+    def __init__(
+        self,
+        name: str,
+        source: Table,
+        target: Table,
+        column_pairs: List[Tuple[str, str]],
+    ):
+        self.name = name
+        self.source = source
+        self.target = target
+        self.column_pairs = column_pairs
+
+    def predicate(self, source_alias: str, target_alias: str) -> str:
+        return " AND ".join(
+            f"{_quote(source_alias)}.{_quote(source_column)} = "
+            f"{_quote(target_alias)}.{_quote(target_column)}"
+            for source_column, target_column in self.column_pairs
+        )
+
+
+class JoinGraph:
+    """Undirected graph of tables linked by foreign keys
+
+    Built once per schema from KEY_COLUMN_USAGE rows and cached with the
+    schema metadata, so join paths are found without touching the server.
+    """
+
+    def __init__(self, foreign_keys: List[ForeignKey]):
+        self.foreign_keys = foreign_keys
+        self.tables: Dict[Tuple[str, str], Table] = {}
+        self._edges: Dict[Table, List[Tuple[Table, ForeignKey]]] = {}
+        for fk in foreign_keys:
+            for table in (fk.source, fk.target):
+                self.tables[(table[0].lower(), table[1].lower())] = table
+                self._edges.setdefault(table, [])
+            self._edges[fk.source].append((fk.target, fk))
+            if fk.target != fk.source:
+                self._edges[fk.target].append((fk.source, fk))
+        for neighbours in self._edges.values():
+            neighbours.sort(key=lambda edge: (table_label(edge[0]), edge[1].name))
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict[str, Any]]) -> "JoinGraph":
+        """Group KEY_COLUMN_USAGE rows (ordered by constraint and position) into keys"""
+        grouped: Dict[Tuple[str, str], ForeignKey] = {}
+        for row in rows:
+            key = (row["source_schema"], row["constraint_name"])
+            if key not in grouped:
+                grouped[key] = ForeignKey(
+                    row["constraint_name"],
+                    (row["source_schema"], row["source_table"]),
+                    (row["target_schema"], row["target_table"]),
+                    [],
+                )
+            grouped[key].column_pairs.append((row["source_column"], row["target_column"]))
+        return cls(list(grouped.values()))
+
+    @classmethod
+    def merge(cls, graphs: List["JoinGraph"]) -> "JoinGraph":
+        seen = set()
+        foreign_keys = []
+        for graph in graphs:
+            for fk in graph.foreign_keys:
+                if (fk.source[0], fk.name) not in seen:
+                    seen.add((fk.source[0], fk.name))
+                    foreign_keys.append(fk)
+        return cls(foreign_keys)
+
+    def resolve(self, schema: str, table: str) -> Optional[Table]:
+        return self.tables.get((schema.lower(), table.lower()))
+
+    def neighbours(self, table: Table) -> List[Tuple[Table, ForeignKey]]:
+        return self._edges.get(table, [])
+
+    def shortest_path(
+        self, start: Table, goal: Table, max_hops: int = 6
+    ) -> Optional[List[Tuple[Table, Table, ForeignKey]]]:
+        """Breadth-first search for the fewest joins from ``start`` to ``goal``
+
+        Returns ``(from_table, to_table, foreign_key)`` steps, ``[]`` when the
+        tables are the same, or ``None`` if no path of at most ``max_hops``
+        joins exists. Ties are broken by table name so results are stable.
+        """
+        if start == goal:
+            return []
+        parents: Dict[Table, Tuple[Table, ForeignKey]] = {}
+        depth = {start: 0}
+        queue = deque([start])
+        while queue:
+            table = queue.popleft()
+            if depth[table] >= max_hops:
+                continue
+            for neighbour, fk in self.neighbours(table):
+                if neighbour in depth:
+                    continue
+                depth[neighbour] = depth[table] + 1
+                parents[neighbour] = (table, fk)
+                if neighbour == goal:
+                    steps = []
+                    node = goal
+                    while node != start:
+                        previous, edge = parents[node]
+                        steps.append((previous, node, edge))
+                        node = previous
+                    return list(reversed(steps))
+                queue.append(neighbour)
+        return None
+
+    def alternative_paths(
+        self,
+        start: Table,
+        goal: Table,
+        shortest: List[Tuple[Table, Table, ForeignKey]],
+        slack: int = 1,
+        limit: int = 3,
+    ) -> List[List[Tuple[Table, Table, ForeignKey]]]:
+        """Other simple paths at most ``slack`` joins longer than the shortest
+
+        Schemas often link two tables in more than one way (for example a
+        device's site organization versus its manufacturer), so the caller
+        gets to pick the one that matches the question.
+        """
+        max_hops = len(shortest) + slack
+        found: List[List[Tuple[Table, Table, ForeignKey]]] = []
+
+        def walk(table: Table, path: List[Tuple[Table, Table, ForeignKey]], visited: set) -> None:
+            if table == goal:
+                found.append(list(path))
+                return
+            if len(path) >= max_hops:
+                return
+            for neighbour, fk in self.neighbours(table):
+                if neighbour in visited:
+                    continue
+                visited.add(neighbour)
+                path.append((table, neighbour, fk))
+                walk(neighbour, path, visited)
+                path.pop()
+                visited.discard(neighbour)
+
+        walk(start, [], {start})
+        signature = [fk.name for _, _, fk in shortest]
+        found = [path for path in found if [fk.name for _, _, fk in path] != signature]
+        found.sort(key=lambda path: (len(path), [table_label(step[1]) for step in path]))
+        return found[:limit]
+
+
+def describe_path(steps: List[Tuple[Table, Table, ForeignKey]], start: Table) -> Dict[str, Any]:
+    """Join chain with predicates and a ready-to-use FROM ... JOIN clause"""
+    aliases = {start: "t0"}
+    joins = []
+    clause = [f"FROM {_quote(start[0])}.{_quote(start[1])} AS `t0`"]
+    for index, (left, right, fk) in enumerate(steps, start=1):
+        aliases[right] = f"t{index}"
+        if fk.source == left:
+            predicate = fk.predicate(aliases[left], aliases[right])
+        else:
+            predicate = fk.predicate(aliases[right], aliases[left])
+        joins.append(
+            {
+                "from_table": table_label(left),
+                "to_table": table_label(right),
+                "constraint_name": fk.name,
+                "direction": "child_to_parent" if fk.source == left else "parent_to_child",
+                "columns": [
+                    {
+                        "source": f"{table_label(fk.source)}.{source}",
+                        "target": f"{table_label(fk.target)}.{target}",
+                    }
+                    for source, target in fk.column_pairs
+                ],
+                "predicate": predicate,
+            }
+        )
+        clause.append(
+            f"JOIN {_quote(right[0])}.{_quote(right[1])} AS {_quote(aliases[right])} ON {predicate}"
+        )
+    return {
+        "hops": len(steps),
+        "tables": [table_label(start)] + [table_label(step[1]) for step in steps],
+        "aliases": {table_label(table): alias for table, alias in aliases.items()},
+        "joins": joins,
+        "sql": "\n".join(clause),
+    }
@@ -2,11 +2,42 @@
 MySQL Database Tools for Strands Agents MCP Server
 """
 
+import os
 import json
+import time
+import asyncio
 import logging
-from typing import Optional
+from typing import Optional, Dict, Any, List, Tuple, Callable
 from mcp.server.fastmcp import FastMCP
+from starlette.responses import PlainTextResponse
 from database import db
+from encoding import encode_rows_json
+from query_guard import QueryRejectedError
+from aggregation import (
+    AggregationSpecError,
+    ColumnCatalog,
+    compile_aggregation,
+    compile_partial_aggregation,
+    merge_partials,
+    order_and_limit,
+    resolve_aggregation,
+    split_range,
+)
+from sampling import SAMPLE_MODES, make_rng
+from shards import FanOutPlan, k_way_merge, merge_aggregates, select_shards, sort_key
+from search import SEARCH_MODES, VALUE_MATCHES, value_candidates, value_kinds, value_probe
+from catalog import CatalogError, CatalogQuery, load_catalog
+from query_stats import render_prometheus
+from join_graph import JoinGraph, describe_path
+from exports import ExportError
+from pagination import (
+    InvalidCursorError,
+    build_page_query,
+    decode_cursor,
+    keyset_columns_selected,
+    next_cursor,
+    parse_single_table,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +52,53 @@ mcp = FastMCP(
 )
 
 
+async def _gather_with_budget(
+    jobs: List[Tuple[Any, Callable, tuple]], time_budget_seconds: Optional[float]
+) -> Tuple[Dict[Any, Any], List[Any]]:
+    """Run blocking jobs concurrently on the query executor within a time budget
+
+    Concurrency is capped by ``db.summary_concurrency``. Returns the results
+    (or exceptions) keyed by job key, plus the keys that did not finish before
+    the budget ran out. Unfinished jobs that have not started are cancelled;
+    jobs already running on the executor cannot be, so they should bound
+    their own queries with ``_budget_deadline`` and ``_remaining_ms``.
+    """
+    semaphore = asyncio.Semaphore(db.summary_concurrency)
+
+    async def _run(func, args):
+        async with semaphore:
+            return await db.run(func, *args)
+
+    tasks = {
+        asyncio.ensure_future(_run(func, args)): key for key, func, args in jobs
+    }
+    if not tasks:
+        return {}, []
+    timeout = time_budget_seconds if time_budget_seconds and time_budget_seconds > 0 else None
+    done, pending = await asyncio.wait(tasks, timeout=timeout)
+    for task in pending:
+        task.cancel()
+
+    results = {}
+    for task in done:
+        results[tasks[task]] = task.exception() or task.result()
+    return results, [tasks[task] for task in pending]
+
+
+def _budget_deadline(time_budget_seconds: Optional[float], started: float) -> Optional[float]:
+    """Monotonic deadline for a time budget counted from ``started``, or None for no limit"""
+    if not time_budget_seconds or time_budget_seconds <= 0:
+        return None
+    return started + time_budget_seconds
+
+
+def _remaining_ms(deadline: Optional[float]) -> Optional[int]:
+    """MAX_EXECUTION_TIME left before ``deadline`` (at least 1 ms), or None for no limit"""
+    if deadline is None:
+        return None
+    return max(1, int((deadline - time.monotonic()) * 1000))
+
+
 @mcp.tool()
 async def test_mysql_connection() -> str:
     """
@@ -32,7 +110,7 @@ async def test_mysql_connection() -> str:
     print("🔌 TEST_MYSQL_CONNECTION called")
     logger.info("TEST_MYSQL_CONNECTION called")
     try:
-        if db.test_connection():
+        if await db.run(db.test_connection):
             print("✅ MySQL connection successful")
             return "✅ MySQL connection successful"
         else:
@@ -43,6 +121,89 @@ async def test_mysql_connection() -> str:
         return f"❌ MySQL connection error: {str(e)}"
 
 
+@mcp.tool()
+async def get_mysql_runtime_stats() -> str:
+    """
+    Get runtime statistics for the MySQL MCP server, including connection pool usage, exhaustion metrics and metadata/result cache hit/miss counters.
+
+    Returns:
+        str: JSON formatted runtime statistics
+    """
+    print("📈 GET_MYSQL_RUNTIME_STATS called")
+    logger.info("GET_MYSQL_RUNTIME_STATS called")
+    try:
+        stats = {
+            "pool": db.pool_stats(),
+            "replicas": db.replica_stats(),
+            "executor": db.executor_stats(),
+            "metadata_cache": db.metadata_cache_stats(),
+            "result_cache": db.result_cache_stats(),
+            "prepared_statements": db.prepared_statement_stats(),
+            "query_stats": db.query_stats_summary(),
+        }
+        if db.shards:
+            stats["shards"] = db.shard_stats()
+        print(f"✅ Pool has {stats['pool']['in_use']} of {stats['pool']['max_size']} connections in use")
+        return json.dumps(stats, indent=2)
+    except Exception as e:
+        logger.error(f"Error getting runtime stats: {e}")
+        print(f"❌ Error getting runtime stats: {str(e)}")
+        return f"❌ Error getting runtime stats: {str(e)}"
+
+
+@mcp.tool()
+async def get_mysql_query_stats(top_n: int = 20, order_by: str = "total_ms") -> str:
+    """
+    Get per-statement query statistics and the most recent slow queries.
+
+    Statements are grouped by fingerprint (literals replaced with ?), with call counts,
+    errors, total/p50/p95/p99/max latency in milliseconds, rows returned and bytes
+    serialized. Slow queries include the EXPLAIN plan captured when they ran.
+
+    Args:
+        top_n (int): Number of statement digests to return (default: 20)
+        order_by (str): Digest field to sort by, descending: total_ms, count, p95_ms, p99_ms, max_ms, rows, bytes or errors
+
+    Returns:
+        str: JSON formatted digest statistics and slow query log
+    """
+    print(f"⏱️ GET_MYSQL_QUERY_STATS called with top_n: {top_n}, order_by: {order_by}")
+    logger.info(f"GET_MYSQL_QUERY_STATS called with top_n: {top_n}, order_by: {order_by}")
+    try:
+        if not db.query_stats.enabled:
+            return "❌ Query statistics are disabled (MYSQL_QUERY_STATS_MAX_DIGESTS=0)"
+        digests = db.query_stats.digests(order_by=order_by, limit=max(1, int(top_n)))
+        stats = {
+            "summary": db.query_stats.summary(),
+            "digests": digests,
+            "slow_queries": db.query_stats.slow_queries(),
+        }
+        print(f"✅ Returning {len(digests)} query digests")
+        return json.dumps(stats, indent=2, default=str)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return f"❌ {e}"
+    except Exception as e:
+        logger.error(f"Error getting query stats: {e}")
+        print(f"❌ Error getting query stats: {str(e)}")
+        return f"❌ Error getting query stats: {str(e)}"
+
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def metrics(request):
+    """Prometheus scrape endpoint served next to the SSE app"""
+    pool = db.pool_stats()
+    gauges = {
+        "mysql_mcp_pool_size": pool["size"],
+        "mysql_mcp_pool_in_use": pool["in_use"],
+        "mysql_mcp_pool_idle": pool["idle"],
+        "mysql_mcp_inflight_queries": db.executor_stats()["inflight"],
+        "mysql_mcp_slow_queries_logged": db.query_stats.summary()["slow_queries"],
+    }
+    body = await db.run(render_prometheus, db.query_stats, gauges)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+
 @mcp.tool()
 async def list_mysql_schemas() -> str:
     """
@@ -54,7 +215,7 @@ async def list_mysql_schemas() -> str:
     print("📋 LIST_MYSQL_SCHEMAS called")
     logger.info("LIST_MYSQL_SCHEMAS called")
     try:
-        schemas = db.list_schemas()
+        schemas = await db.run(db.list_schemas)
         result = json.dumps({"schemas": schemas, "count": len(schemas)}, indent=2)
         print(f"✅ Found {len(schemas)} schemas")
         return result
@@ -78,21 +239,23 @@ async def list_mysql_tables(schema_name: Optional[str] = None) -> str:
     print(f"📋 LIST_MYSQL_TABLES called with schema: {schema_name}")
     logger.info(f"LIST_MYSQL_TABLES called with schema: {schema_name}")
     try:
-        tables = db.list_tables(schema_name)    
+        tables = await db.run(db.list_tables, schema_name)    
         result = {"tables": tables, "count": len(tables)}
-        for table_name in tables:
-            if 'table_schemas' in result:
-                result['table_schemas'].append({
-                    "table_name": table_name,
-                    "table_schema": db.get_table_schema(table_name, schema_name),
-                    "database_schema_name": schema_name
-                })
-            else:
-                result['table_schemas']=[{
+        if tables:
+            # One catalog query for every table instead of one per table
+            target_schema = schema_name or db.config["database"]
+            columns_by_schema = await db.run(
+                db.get_table_schemas, {target_schema: tables}
+            )
+            table_columns = columns_by_schema.get(target_schema, {})
+            result['table_schemas'] = [
+                {
                     "table_name": table_name,
-                    "table_schema": db.get_table_schema(table_name, schema_name),
+                    "table_schema": table_columns.get(table_name, []),
                     "database_schema_name": schema_name
-                }]
+                }
+                for table_name in tables
+            ]
 
         if schema_name:
             result["schema"] = schema_name
@@ -118,23 +281,20 @@ async def list_mysql_tables_by_schema() -> str:
     logger.info("LIST_MYSQL_TABLES_BY_SCHEMA called")
     try:
         result = {}
-        tables_by_schema = db.list_tables_by_schema()
+        tables_by_schema = await db.run(db.list_tables_by_schema)
         print(f'Table Schema {tables_by_schema}')
 
+        # One catalog query across all schemas instead of one per table
+        columns_by_schema = await db.run(db.get_table_schemas, tables_by_schema)
+        result['table_schemas'] = []
         for schema_name, tables in tables_by_schema.items():
+            table_columns = columns_by_schema.get(schema_name, {})
             for table_name in tables:
-                if 'table_schemas' in result:
-                    result['table_schemas'].append({
-                        "table_name": table_name,
-                        "table_schema": db.get_table_schema(table_name, schema_name),
-                        "database_schema_name": schema_name
-                    })
-                else:
-                    result['table_schemas']=[{
-                        "table_name": table_name,
-                        "table_schema": db.get_table_schema(table_name, schema_name),
-                        "database_schema_name": schema_name
-                    }]
+                result['table_schemas'].append({
+                    "table_name": table_name,
+                    "table_schema": table_columns.get(table_name, []),
+                    "database_schema_name": schema_name
+                })
         total_tables = sum(len(tables) for tables in tables_by_schema.values())
         print(
             f"✅ Found {len(tables_by_schema)} schemas with {total_tables} total tables"
@@ -176,7 +336,7 @@ async def describe_mysql_table(
         f"DESCRIBE_MYSQL_TABLE called for table: {table_name}, schema: {schema_name}"
     )
     try:
-        table_info = db.get_table_info(table_name, schema_name)
+        table_info = await db.run(db.get_table_info, table_name, schema_name)
         if not table_info:
             print(
                 f"❌ Table '{table_name}' not found in schema '{schema_name or db.config['database']}'"
@@ -191,14 +351,141 @@ async def describe_mysql_table(
         return f"❌ Error describing table '{table_name}': {str(e)}"
 
 
+def _page_key_columns(query: str) -> Optional[List[str]]:
+    """Ordered unique key usable for keyset pagination of a query, if any"""
+    parsed = parse_single_table(query)
+    if not parsed:
+        return None
+    schema_name, table_name, select_items = parsed
+    key_columns = db.get_unique_key(table_name, schema_name)
+    if key_columns and keyset_columns_selected(select_items, key_columns):
+        return key_columns
+    return None
+
+
+# MySQL error raised when MAX_EXECUTION_TIME interrupts a statement
+_ER_QUERY_TIMEOUT = 3024
+
+
+def _is_select(query: str) -> bool:
+    return query.strip().upper().startswith("SELECT")
+
+
+def _apply_limit(query: str, limit: Optional[int]) -> str:
+    """Append a LIMIT (capped at 1000) unless the query already has one"""
+    if limit and "LIMIT" not in query.upper():
+        return f"{query.rstrip(';')} LIMIT {min(limit, 1000)}"
+    return query
+
+
+def _error_message(e: Exception) -> str:
+    if isinstance(e, QueryRejectedError):
+        return f"Query rejected by cost guard: {e.reason}"
+    if getattr(e, "errno", None) == _ER_QUERY_TIMEOUT:
+        return f"Query exceeded the {db.query_guard.max_execution_time_ms} ms execution time limit"
+    return str(e)
+
+
+def _rejected_response(e: QueryRejectedError) -> str:
+    print(f"❌ Query rejected by cost guard: {e.reason}")
+    return (
+        f"❌ Query rejected by cost guard: {e.reason}\n"
+        + json.dumps({"plan": e.plan}, indent=2, default=str)
+    )
+
+
+def _query_error_response(e: Exception) -> str:
+    if getattr(e, "errno", None) == _ER_QUERY_TIMEOUT:
+        limit_ms = db.query_guard.max_execution_time_ms
+        print(f"❌ Query exceeded the {limit_ms} ms execution time limit")
+        return (
+            f"❌ Query exceeded the {limit_ms} ms execution time limit; "
+            "add selective filters or aggregate fewer rows"
+        )
+    logger.error(f"Error executing query: {e}")
+    print(f"❌ Query execution error: {str(e)}")
+    return f"❌ Query execution error: {str(e)}"
+
+
+async def _execute_mysql_query_page(
+    query: str, page_size: Optional[int], cursor: Optional[str], format: str = "rows"
+) -> str:
+    """Fetch one page of a SELECT using keyset pagination where possible"""
+    try:
+        state = decode_cursor(cursor, query) if cursor else None
+    except InvalidCursorError as e:
+        print(f"❌ Invalid cursor: {e}")
+        return f"❌ Invalid cursor: {e}"
+
+    page_size = min(int(page_size or (state or {}).get("n") or 100), 1000)
+    if state and state.get("m") != "keyset":
+        key_columns = None
+    else:
+        key_columns = await db.run(_page_key_columns, query)
+        if state and not key_columns:
+            return "❌ Invalid cursor: the table's key has changed, restart without a cursor"
+
+    page_query, params = build_page_query(query, page_size, key_columns, state)
+    page_query, plan = await db.run(db.guard_query, page_query, params)
+    rows = await db.run(db.fetch_page, page_query, params, page_size + 1)
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    token = (
+        next_cursor(query, page_size, rows, key_columns, state) if has_more else None
+    )
+    print(f"✅ Query page returned {len(rows)} rows, has_more={has_more}")
+
+    header = {
+        "query": query,
+        "pagination": "keyset" if key_columns else "offset",
+        "page_size": page_size,
+        "has_more": has_more,
+        "next_cursor": token,
+    }
+    if plan:
+        header["plan"] = plan
+    result, _ = encode_rows_json(
+        header,
+        [rows],
+        "results",
+        "row_count",
+        format,
+    )
+    db.query_stats.record_bytes(page_query, len(result))
+    return result
+
+
 @mcp.tool()
-async def execute_mysql_query(query: str, limit: Optional[int] = 100) -> str:
+async def execute_mysql_query(
+    query: str,
+    limit: Optional[int] = 100,
+    page_size: Optional[int] = None,
+    cursor: Optional[str] = None,
+    format: str = "rows",
+    shards: Optional[List[str]] = None,
+) -> str:
     """
     Execute a SELECT query against the MySQL database.
 
+    Pass page_size to page through large results: the response includes a next_cursor
+    token; call again with the same query and that cursor to get the next page.
+
+    Queries are checked with EXPLAIN before they run. Plans that scan too many rows are
+    rejected with the plan summary so the query can be narrowed, and every query runs
+    under a server-side execution time limit.
+
+    Pass shards to run the query on several shards (MYSQL_SHARDS) concurrently. Rows are
+    merged in ORDER BY order with the LIMIT applied globally, and each row gets a _shard
+    column. GROUP BY queries whose select list only has grouping columns and COUNT, SUM,
+    MIN or MAX are combined into one set of groups; other aggregates come back per shard.
+
     Args:
         query (str): SQL SELECT query to execute
         limit (int, optional): Maximum number of rows to return (default: 100, max: 1000)
+        page_size (int, optional): Rows per page; enables pagination (max: 1000)
+        cursor (str, optional): next_cursor token from the previous page of this query
+        format (str): "rows" for a list of objects, or "columnar" for a columns list plus row arrays (smaller)
+        shards (list, optional): Shard names to fan out to, or ["*"] for every shard
 
     Returns:
         str: JSON formatted query results
@@ -211,35 +498,402 @@ async def execute_mysql_query(query: str, limit: Optional[int] = 100) -> str:
     )
     try:
         # Security check - only allow SELECT queries
-        query_upper = query.strip().upper()
-        if not query_upper.startswith("SELECT"):
+        if not _is_select(query):
             print("❌ Only SELECT queries are allowed for security reasons")
             return "❌ Only SELECT queries are allowed for security reasons"
 
-        # Apply limit if not already present
-        if limit and "LIMIT" not in query_upper:
-            # Ensure limit doesn't exceed maximum
-            limit = min(limit, 1000)
-            query = f"{query.rstrip(';')} LIMIT {limit}"
+        if shards:
+            if page_size or cursor:
+                return "❌ Pagination is not supported across shards; use LIMIT ... OFFSET"
+            return await _execute_mysql_query_fan_out(
+                _apply_limit(query, limit), select_shards(list(db.shards), shards), format
+            )
 
-        results = db.execute_query(query)
-        print(f"✅ Query executed successfully, returned {len(results)} rows")
+        if page_size or cursor:
+            return await _execute_mysql_query_page(query, page_size, cursor, format)
 
-        return json.dumps(
-            {"query": query, "row_count": len(results), "results": results},
-            indent=2,
-            default=str,
+        query = _apply_limit(query, limit)
+
+        guarded_query, plan = await db.run(db.guard_query, query)
+        header = {"query": query}
+        if plan:
+            header["plan"] = plan
+
+        # Streamed either way; small results are also kept for the result cache
+        batches, cache_info = db.iter_query_cached(guarded_query, batch_size=db.stream_batch_size)
+        if db.result_cache.enabled:
+            header["cache"] = cache_info
+
+        result, row_count = await db.run(
+            encode_rows_json, header, batches, "results", "row_count", format
+        )
+        db.query_stats.record_bytes(guarded_query, len(result))
+        print(f"✅ Query executed successfully, returned {row_count} rows")
+        return result
+
+    except QueryRejectedError as e:
+        return _rejected_response(e)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return f"❌ {e}"
+    except Exception as e:
+        return _query_error_response(e)
+
+
+async def _fan_out(queries: Dict[str, Tuple[str, Tuple]]) -> List[Dict[str, Any]]:
+    """Run a SELECT on each shard concurrently, checking its plan on that shard
+
+    ``queries`` maps shard names to ``(query, params)``. Returns, in order,
+    ``{"shard", "rows", "elapsed_ms"}`` or ``{"shard", "error", "elapsed_ms"}``
+    per shard; one shard failing does not fail the others.
+    """
+
+    async def _run(name: str, query: str, params: Tuple) -> Dict[str, Any]:
+        start = time.monotonic()
+        outcome: Dict[str, Any] = {"shard": name}
+        try:
+            guarded_query, plan = await db.run(db.guard_query, query, params, name)
+            if plan:
+                outcome["plan"] = plan
+            outcome["rows"] = await db.run(db.execute_query, guarded_query, params, name)
+        except Exception as e:
+            logger.error(f"Shard '{name}' query failed: {e}")
+            outcome["error"] = e
+        outcome["elapsed_ms"] = round((time.monotonic() - start) * 1000, 2)
+        return outcome
+
+    return await asyncio.gather(
+        *(_run(name, query, params) for name, (query, params) in queries.items())
+    )
+
+
+def _shard_summary(outcomes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    summary = []
+    for outcome in outcomes:
+        entry = {"shard": outcome["shard"], "elapsed_ms": outcome["elapsed_ms"]}
+        if "error" in outcome:
+            entry["error"] = _error_message(outcome["error"])
+        else:
+            entry["row_count"] = len(outcome["rows"])
+        summary.append(entry)
+    return summary
+
+
+def _all_shards_failed(outcomes: List[Dict[str, Any]]) -> str:
+    errors = "; ".join(f"{o['shard']}: {_error_message(o['error'])}" for o in outcomes)
+    print(f"❌ Query failed on every shard: {errors}")
+    return f"❌ Query failed on every shard: {errors}"
+
+
+async def _execute_mysql_query_fan_out(
+    query: str, shard_names: List[str], format: str = "rows"
+) -> str:
+    """Run a SELECT on several shards and merge the results"""
+    plan = FanOutPlan(query)
+    shard_query = plan.shard_query()
+    outcomes = await _fan_out({name: (shard_query, ()) for name in shard_names})
+    succeeded = [outcome for outcome in outcomes if "rows" in outcome]
+    if not succeeded:
+        return _all_shards_failed(outcomes)
+
+    header: Dict[str, Any] = {
+        "query": query,
+        "shard_query": shard_query,
+        "shards": _shard_summary(outcomes),
+        "complete": len(succeeded) == len(outcomes),
+    }
+    columns = next((list(o["rows"][0]) for o in succeeded if o["rows"]), [])
+    if plan.merged_aggregate and columns and len(columns) != len(plan.functions):
+        plan.functions = None
+        plan.unmergeable_reason = "the select list could not be matched to the result columns"
+
+    if plan.merged_aggregate:
+        rows = merge_aggregates([o["rows"] for o in succeeded], columns, plan.functions)
+        order = plan.order_columns(columns)
+        if order is None:
+            # Without the order a LIMIT would keep arbitrary groups, so keep them all
+            header["warning"] = (
+                "ORDER BY is not a selected column, so merged groups are unordered and not limited"
+            )
+        else:
+            if order:
+                rows.sort(key=sort_key(order))
+            stop = None if plan.count is None else plan.offset + plan.count
+            rows = rows[plan.offset:stop]
+        header["merge"] = "aggregate"
+    else:
+        tagged = [[dict(row, _shard=o["shard"]) for row in o["rows"]] for o in succeeded]
+        if plan.aggregate:
+            rows = [row for shard_rows in tagged for row in shard_rows]
+            header["merge"] = "per_shard"
+            header["warning"] = f"{plan.unmergeable_reason}; rows are per shard (see _shard)"
+        else:
+            order = plan.order_columns(columns) if plan.order else []
+            if order is None:
+                # Each shard applied its own ORDER BY and LIMIT; a global LIMIT
+                # over rows that cannot be merged in order would drop real top rows
+                header["warning"] = (
+                    "ORDER BY is not a selected column, so rows are per shard "
+                    "(see _shard) with each shard's own LIMIT"
+                )
+                rows = [row for shard_rows in tagged for row in shard_rows]
+                header["merge"] = "per_shard"
+            else:
+                rows = k_way_merge(tagged, order, plan.offset, plan.count)
+                header["merge"] = "k_way_merge" if order else "concatenate"
+
+    result, row_count = await db.run(
+        encode_rows_json, header, [rows], "results", "row_count", format
+    )
+    print(
+        f"✅ Query ran on {len(succeeded)}/{len(outcomes)} shards, returned {row_count} rows "
+        f"({header['merge']})"
+    )
+    return result
+
+
+async def _run_batch_query(name: str, guarded_query: str) -> Dict[str, Any]:
+    start = time.monotonic()
+    try:
+        if db.result_cache.enabled:
+            rows, cache_info = await db.run(db.execute_query_cached, guarded_query)
+            outcome = {"rows": rows, "cache": cache_info}
+        else:
+            outcome = {"rows": await db.run(db.execute_query, guarded_query)}
+    except Exception as e:
+        logger.error(f"Batch query '{name}' failed: {e}")
+        outcome = {"error": e}
+    outcome["elapsed_ms"] = round((time.monotonic() - start) * 1000, 2)
+    return outcome
+
+
+@mcp.tool()
+async def execute_mysql_batch(
+    queries: List[Dict[str, str]],
+    consistent: bool = False,
+    limit: Optional[int] = 100,
+    format: str = "rows",
+) -> str:
+    """
+    Execute several named SELECT queries in one call, e.g. all widgets of a dashboard.
+
+    By default the queries run concurrently on pooled connections. With consistent=True
+    they run one after another inside a single START TRANSACTION WITH CONSISTENT SNAPSHOT,
+    so every result reflects the same point in time.
+
+    Args:
+        queries (list): Objects like {"name": "revenue_by_day", "query": "SELECT ..."} (max: 20)
+        consistent (bool): Run all queries on one consistent snapshot (default: False)
+        limit (int, optional): Row limit added to queries without one (default: 100, max: 1000)
+        format (str): "rows" for a list of objects, or "columnar" for a columns list plus row arrays (smaller)
+
+    Returns:
+        str: JSON with one entry per query holding its results or error and its timing
+    """
+    print(f"📦 EXECUTE_MYSQL_BATCH called with {len(queries or [])} queries, consistent: {consistent}")
+    logger.info(f"EXECUTE_MYSQL_BATCH called with {len(queries or [])} queries, consistent: {consistent}")
+    try:
+        if not queries:
+            return "❌ No queries given"
+        if len(queries) > 20:
+            return "❌ At most 20 queries can be batched"
+
+        names: List[str] = []
+        statements: List[str] = []
+        for index, entry in enumerate(queries):
+            if not isinstance(entry, dict) or not entry.get("query"):
+                return f"❌ Batch entry {index} needs a 'query'"
+            name = str(entry.get("name") or f"query_{index + 1}")
+            if name in names:
+                return f"❌ Duplicate query name '{name}'"
+            if not _is_select(entry["query"]):
+                return f"❌ Only SELECT queries are allowed for security reasons ('{name}')"
+            names.append(name)
+            statements.append(_apply_limit(entry["query"], limit))
+
+        start = time.monotonic()
+        # EXPLAIN every query up front so a rejected one never runs
+        guarded = await asyncio.gather(
+            *(db.run(db.guard_query, statement) for statement in statements),
+            return_exceptions=True,
+        )
+        runnable = [i for i, g in enumerate(guarded) if not isinstance(g, Exception)]
+        outcomes: Dict[int, Dict[str, Any]] = {
+            i: {"error": g, "elapsed_ms": 0.0}
+            for i, g in enumerate(guarded)
+            if isinstance(g, Exception)
+        }
+
+        if consistent:
+            snapshot = await db.run(
+                db.execute_snapshot, [guarded[i][0] for i in runnable]
+            )
+            outcomes.update(zip(runnable, snapshot))
+        else:
+            results = await asyncio.gather(
+                *(_run_batch_query(names[i], guarded[i][0]) for i in runnable)
+            )
+            outcomes.update(zip(runnable, results))
+
+        parts = []
+        failed = 0
+        for index, (name, statement) in enumerate(zip(names, statements)):
+            outcome = outcomes[index]
+            header: Dict[str, Any] = {
+                "name": name,
+                "query": statement,
+                "elapsed_ms": outcome["elapsed_ms"],
+            }
+            if index in runnable and guarded[index][1]:
+                header["plan"] = guarded[index][1]
+            if "error" in outcome:
+                failed += 1
+                error = outcome["error"]
+                header["error"] = _error_message(error)
+                if isinstance(error, QueryRejectedError):
+                    header["plan"] = error.plan
+                parts.append(json.dumps(header, separators=(",", ":"), default=str))
+                continue
+            if "cache" in outcome:
+                header["cache"] = outcome["cache"]
+            encoded, _ = encode_rows_json(
+                header, [outcome["rows"]], "results", "row_count", format
+            )
+            db.query_stats.record_bytes(guarded[index][0], len(encoded))
+            parts.append(encoded)
+
+        summary = json.dumps(
+            {
+                "mode": "consistent_snapshot" if consistent else "concurrent",
+                "query_count": len(names),
+                "failed": failed,
+                "elapsed_ms": round((time.monotonic() - start) * 1000, 2),
+            },
+            separators=(",", ":"),
+        )
+        print(f"✅ Batch of {len(names)} queries finished, {failed} failed")
+        return summary[:-1] + ',"queries":[' + ",".join(parts) + "]}"
+
+    except Exception as e:
+        logger.error(f"Error executing batch: {e}")
+        print(f"❌ Batch execution error: {str(e)}")
+        return f"❌ Batch execution error: {str(e)}"
+
+
+@mcp.tool()
+async def export_mysql_query(query: str, format: str = "auto") -> str:
+    """
+    Stream a SELECT of any size to a local Parquet or CSV file instead of returning rows.
+
+    Use this when a result is larger than execute_mysql_query's 1000-row cap. The response
+    is a handle with the row count, column types and file size; read slices or aggregates
+    of it with read_mysql_export.
+
+    Args:
+        query (str): SQL SELECT query to export (no LIMIT needed)
+        format (str): "parquet" (needs pyarrow), "csv", or "auto" for Parquet when available (default)
+
+    Returns:
+        str: JSON formatted export handle and metadata
+    """
+    print(f"📦 EXPORT_MYSQL_QUERY called with query: {query[:100]}{'...' if len(query) > 100 else ''}, format: {format}")
+    logger.info(f"EXPORT_MYSQL_QUERY called with query length: {len(query)}, format: {format}")
+    try:
+        if not _is_select(query):
+            print("❌ Only SELECT queries are allowed for security reasons")
+            return "❌ Only SELECT queries are allowed for security reasons"
+
+        meta = await db.run(db.export_query, query, format)
+        print(
+            f"✅ Exported {meta['row_count']} rows to {meta['format']} handle {meta['handle']} "
+            f"({meta['bytes']} bytes)"
+        )
+        return json.dumps(meta, indent=2)
+
+    except ExportError as e:
+        print(f"❌ {e}")
+        return f"❌ {e}"
+    except Exception as e:
+        return _query_error_response(e)
+
+
+@mcp.tool()
+async def read_mysql_export(
+    handle: str,
+    offset: int = 0,
+    limit: int = 100,
+    columns: Optional[List[str]] = None,
+    metrics: Optional[List[Dict[str, Any]]] = None,
+    group_by: Optional[List[str]] = None,
+    order_by: Optional[str] = None,
+    descending: bool = True,
+    format: str = "rows",
+) -> str:
+    """
+    Read a slice of an export, or aggregate it, without loading it into context.
+
+    Without metrics or group_by, returns rows offset..offset+limit. With them, runs a
+    GROUP BY over the whole export file locally, with no query against MySQL.
+
+    Args:
+        handle (str): Handle returned by export_mysql_query
+        offset (int): First row of the slice (default: 0)
+        limit (int): Rows or groups to return (default: 100, max: 1000)
+        columns (list, optional): Columns to include in a slice (default: all)
+        metrics (list, optional): Objects like {"fn": "sum", "column": "amount", "alias": "revenue"};
+            fn is one of count, sum, avg, min, max, count_distinct
+        group_by (list, optional): Columns to group by
+        order_by (str, optional): Output column to sort groups by (default: first metric)
+        descending (bool): Sort direction for order_by (default: True)
+        format (str): "rows" for a list of objects, or "columnar" for a columns list plus row arrays (smaller)
+
+    Returns:
+        str: JSON formatted rows from the export
+    """
+    print(f"📦 READ_MYSQL_EXPORT called for handle: {handle}, offset: {offset}, limit: {limit}")
+    logger.info(f"READ_MYSQL_EXPORT called for handle: {handle}")
+    try:
+        limit = max(1, min(int(limit), 1000))
+        if metrics or group_by:
+            meta, rows = await db.run(
+                db.exports.aggregate, handle, metrics, group_by, order_by, descending, limit
+            )
+            header = {"handle": handle, "mode": "aggregate", "source_rows": meta["row_count"]}
+        else:
+            meta, rows = await db.run(db.exports.read_slice, handle, offset, limit, columns)
+            header = {
+                "handle": handle,
+                "mode": "slice",
+                "offset": int(offset),
+                "total_rows": meta["row_count"],
+                "has_more": int(offset) + len(rows) < meta["row_count"],
+            }
+
+        result, row_count = await db.run(
+            encode_rows_json, header, [rows], "results", "row_count", format
         )
+        print(f"✅ Read {row_count} rows from export {handle}")
+        return result
 
+    except (ExportError, AggregationSpecError) as e:
+        print(f"❌ {e}")
+        return f"❌ {e}"
     except Exception as e:
-        logger.error(f"Error executing query: {e}")
-        print(f"❌ Query execution error: {str(e)}")
-        return f"❌ Query execution error: {str(e)}"
+        logger.error(f"Error reading export: {e}")
+        print(f"❌ Error reading export '{handle}': {str(e)}")
+        return f"❌ Error reading export '{handle}': {str(e)}"
 
 
 @mcp.tool()
 async def get_mysql_table_sample(
-    schema_name: str, table_name: str, limit: int = 5
+    schema_name: str,
+    table_name: str,
+    limit: int = 5,
+    format: str = "rows",
+    mode: str = "auto",
+    seed: Optional[int] = None,
+    stratify_by: Optional[str] = None,
+    time_budget_seconds: float = 5,
 ) -> str:
     """
     Get a sample of data from a MySQL table.
@@ -247,29 +901,106 @@ async def get_mysql_table_sample(
     Args:
         table_name (str): Name of the table to sample
         limit (int): Number of sample rows to return (default: 5, max: 50)
+        format (str): "rows" for a list of objects, or "columnar" for a columns list plus row arrays (smaller)
+        mode (str): "auto" (random key-range sampling when the table has an integer key,
+            reservoir otherwise), "pk_range", "reservoir", "stratified" or "first" (first rows in
+            storage order, the fastest but biased)
+        seed (int, optional): Random seed; the response reports the seed used so a sample can be repeated
+        stratify_by (str, optional): Column whose most common values each get an equal share of the sample
+        time_budget_seconds (float): Scan time limit for reservoir sampling (default: 5)
 
     Returns:
         str: JSON formatted sample data
     """
     print(
-        f"📊 GET_MYSQL_TABLE_SAMPLE called for {schema_name}.{table_name}, limit: {limit}"
+        f"📊 GET_MYSQL_TABLE_SAMPLE called for {schema_name}.{table_name}, limit: {limit}, mode: {mode}"
     )
     logger.info(
-        f"GET_MYSQL_TABLE_SAMPLE called for {schema_name}.{table_name}, limit: {limit}"
+        f"GET_MYSQL_TABLE_SAMPLE called for {schema_name}.{table_name}, limit: {limit}, mode: {mode}"
     )
     try:
         # Ensure limit doesn't exceed maximum
         limit = min(limit, 50)
-
-        query = f"SELECT * FROM `{schema_name}`.`{table_name}` LIMIT {limit}"
-        results = db.execute_query(query)
-        print(f"✅ Retrieved {len(results)} sample rows from {table_name}")
-
-        return json.dumps(
-            {"table": table_name, "sample_size": len(results), "data": results},
-            indent=2,
-            default=str,
+        mode = (mode or "auto").lower()
+        if mode not in SAMPLE_MODES:
+            return f"❌ Unknown sampling mode '{mode}', expected one of {SAMPLE_MODES}"
+        if mode == "auto" and stratify_by:
+            mode = "stratified"
+
+        if mode == "first":
+            query = f"SELECT * FROM `{schema_name}`.`{table_name}` LIMIT {limit}"
+            result, sample_size = await db.run(
+                encode_rows_json,
+                {"table": table_name, "sampling": {"mode": "first"}},
+                db.iter_query(query, batch_size=db.stream_batch_size),
+                "data",
+                "sample_size",
+                format,
+            )
+            print(f"✅ Retrieved {sample_size} sample rows from {table_name}")
+            return result
+
+        rng, seed = make_rng(seed)
+        key_column = await db.run(db.get_sampling_key, table_name, schema_name)
+        if mode == "auto":
+            mode = "pk_range" if key_column else "reservoir"
+        sampling: Dict[str, Any] = {"mode": mode, "seed": seed}
+
+        if mode == "pk_range":
+            if not key_column:
+                return (
+                    f"❌ pk_range sampling needs a single-column integer primary key; "
+                    f"'{table_name}' has none, use mode='reservoir'"
+                )
+            rows = await db.run(
+                db.sample_pk_range, table_name, schema_name, key_column, limit, rng
+            )
+            sampling["key_column"] = key_column
+        elif mode == "reservoir":
+            rows, scanned, complete = await db.run(
+                db.sample_reservoir,
+                table_name,
+                schema_name,
+                limit,
+                rng,
+                time_budget_seconds,
+            )
+            sampling.update({"rows_scanned": scanned, "complete": complete})
+        else:
+            if not stratify_by:
+                return "❌ stratified sampling needs stratify_by"
+            columns = await db.run(db.get_table_schema, table_name, schema_name)
+            column = next(
+                (
+                    c["COLUMN_NAME"]
+                    for c in columns
+                    if c["COLUMN_NAME"].lower() == stratify_by.lower()
+                ),
+                None,
+            )
+            if not column:
+                return f"❌ Column '{stratify_by}' not found in '{table_name}'"
+            rows, strata, plan = await db.run(
+                db.sample_stratified,
+                table_name,
+                schema_name,
+                column,
+                limit,
+                rng,
+                key_column,
+            )
+            sampling.update({"stratify_by": column, "strata": strata, **plan})
+
+        result, sample_size = await db.run(
+            encode_rows_json,
+            {"table": table_name, "sampling": sampling},
+            [rows],
+            "data",
+            "sample_size",
+            format,
         )
+        print(f"✅ Retrieved {sample_size} sample rows from {table_name} ({mode})")
+        return result
 
     except Exception as e:
         logger.error(f"Error getting table sample: {e}")
@@ -278,12 +1009,83 @@ async def get_mysql_table_sample(
 
 
 @mcp.tool()
-async def get_mysql_table_count(schema_name: str, table_name: str) -> str:
+async def get_mysql_table_changes(
+    schema_name: str,
+    table_name: str,
+    watermark: Optional[str] = None,
+    change_column: Optional[str] = None,
+    limit: int = 1000,
+    from_now: bool = False,
+    format: str = "rows",
+) -> str:
+    """
+    Get only the rows added or changed since a watermark, plus the new watermark.
+
+    The change column is detected from the schema: an updated_at-style timestamp
+    (new and changed rows), else a created_at-style timestamp or an auto-increment
+    key (new rows only). Store the returned watermark and pass it on the next call;
+    while has_more is true, call again straight away. Deleted rows are not reported.
+
+    Args:
+        schema_name (str): Schema containing the table
+        table_name (str): Name of the table
+        watermark (str, optional): Watermark from the previous call (omit for the first call)
+        change_column (str, optional): Timestamp or increasing integer column to use instead of detection
+        limit (int): Maximum rows per call (default: 1000, max: 1000)
+        from_now (bool): On the first call, return no rows and a watermark at the current end of the table
+        format (str): "rows" for a list of objects, or "columnar" for a columns list plus row arrays (smaller)
+
+    Returns:
+        str: JSON formatted changed rows and the new watermark
+    """
+    print(
+        f"🔄 GET_MYSQL_TABLE_CHANGES called for {schema_name}.{table_name}, "
+        f"watermark: {'yes' if watermark else 'no'}, limit: {limit}"
+    )
+    logger.info(f"GET_MYSQL_TABLE_CHANGES called for {schema_name}.{table_name}")
+    try:
+        limit = max(1, min(int(limit), 1000))
+        changes = await db.run(
+            db.get_changes, table_name, schema_name, watermark, change_column, limit, from_now
+        )
+        rows = changes.pop("rows")
+        if not changes["plan"]:
+            changes.pop("plan")
+        header = {"schema": schema_name, "table": table_name, **changes}
+        result, row_count = await db.run(
+            encode_rows_json, header, [rows], "results", "row_count", format
+        )
+        print(f"✅ Returned {row_count} changed rows using {changes['strategy']} column {changes['change_column']}")
+        return result
+
+    except InvalidCursorError as e:
+        print(f"❌ Invalid watermark: {e}")
+        return f"❌ Invalid watermark: {e}"
+    except QueryRejectedError as e:
+        return _rejected_response(e)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return f"❌ {e}"
+    except Exception as e:
+        return _query_error_response(e)
+
+
+@mcp.tool()
+async def get_mysql_table_count(
+    schema_name: str,
+    table_name: str,
+    approximate: bool = False,
+    error_bound: float = 0.05,
+) -> str:
     """
     Get the row count for a MySQL table.
 
     Args:
         table_name (str): Name of the table to count
+        approximate (bool): Estimate from sampled primary-key blocks with a 95% interval
+            instead of a full COUNT(*); falls back to the InnoDB TABLE_ROWS estimate when
+            the table has no integer key (default: False)
+        error_bound (float): Target relative error when approximate (default: 0.05)
 
     Returns:
         str: JSON formatted count result
@@ -291,8 +1093,51 @@ async def get_mysql_table_count(schema_name: str, table_name: str) -> str:
     print(f"🔢 GET_MYSQL_TABLE_COUNT called for {schema_name}.{table_name}")
     logger.info(f"GET_MYSQL_TABLE_COUNT called for {schema_name}.{table_name}")
     try:
+        if approximate:
+            key = await db.run(db.get_sampling_key, table_name, schema_name)
+            if not key:
+                estimate, _ = await db.run(db.get_row_count, table_name, schema_name)
+                print(f"✅ Table {table_name} has ~{estimate} rows (TABLE_ROWS estimate)")
+                return json.dumps(
+                    {
+                        "table": table_name,
+                        "row_count": estimate,
+                        "approximation": {
+                            "method": "table_rows_estimate",
+                            "exact": False,
+                            "note": "No integer primary key to sample; InnoDB statistics can be off by 40-50%",
+                        },
+                    },
+                    indent=2,
+                )
+            columns = await db.run(db.get_table_schema, table_name, schema_name)
+            estimates, approximation = await db.run(
+                db.approximate_aggregate,
+                table_name,
+                schema_name,
+                columns,
+                [{"fn": "count", "alias": "row_count"}],
+                None,
+                None,
+                None,
+                None,
+                max(0.001, error_bound),
+            )
+            estimate = estimates[0]
+            print(f"✅ Table {table_name} has ~{estimate['row_count']} rows")
+            return json.dumps(
+                {
+                    "table": table_name,
+                    "row_count": estimate["row_count"],
+                    "row_count_low": estimate.get("row_count_low"),
+                    "row_count_high": estimate.get("row_count_high"),
+                    "approximation": approximation,
+                },
+                indent=2,
+            )
+
         query = f"SELECT COUNT(*) as row_count FROM `{schema_name}`.`{table_name}`"
-        results = db.execute_query(query)
+        results, cache_info = await db.run(db.execute_query_cached, query)
         row_count = results[0]["row_count"] if results else 0
         print(f"✅ Table {table_name} has {row_count} rows")
 
@@ -300,6 +1145,7 @@ async def get_mysql_table_count(schema_name: str, table_name: str) -> str:
             {
                 "table": table_name,
                 "row_count": row_count,
+                "cache": cache_info,
             },
             indent=2,
         )
@@ -310,13 +1156,436 @@ async def get_mysql_table_count(schema_name: str, table_name: str) -> str:
         return f"❌ Error counting rows in table '{table_name}': {str(e)}"
 
 
+# Shards per worker, so one slow range does not hold up the whole aggregate
+_SHARDS_PER_WORKER = 4
+
+
+async def _aggregate_in_shards(
+    schema_name: str,
+    table_name: str,
+    columns: List[Dict[str, Any]],
+    spec: Dict[str, Any],
+    parallelism: int,
+) -> Tuple[Optional[List[Dict[str, Any]]], Dict[str, Any]]:
+    """Run an aggregate as concurrent range-shard queries and merge the partials
+
+    Returns ``(rows, execution)``, or ``(None, execution)`` with the reason
+    when the aggregate should run as a single query instead.
+    """
+    degree = max(1, min(int(parallelism), db.max_inflight))
+    if degree <= 1:
+        return None, {"mode": "serial", "reason": "parallelism is 1"}
+    if any(
+        str(metric.get("fn") or metric.get("function") or "").lower() == "count_distinct"
+        for metric in spec.get("metrics") or []
+    ):
+        return None, {"mode": "serial", "reason": "count_distinct cannot be merged across shards"}
+
+    estimate, _ = await db.run(db.get_row_count, table_name, schema_name)
+    if estimate < db.parallel_aggregate_min_rows:
+        return None, {
+            "mode": "serial",
+            "reason": f"~{estimate} rows is below the {db.parallel_aggregate_min_rows}-row threshold",
+        }
+    shard = await db.run(db.get_shard_range, table_name, schema_name, spec.get("time_column"))
+    if not shard:
+        return None, {"mode": "serial", "reason": "no NOT NULL integer key or indexed time column to split on"}
+
+    shard_column, low, high = shard
+    ranges = split_range(low, high, degree * _SHARDS_PER_WORKER)
+    semaphore = asyncio.Semaphore(degree)
+
+    async def _run_shard(lower: Any, upper: Any, inclusive: bool):
+        sql, params, group_items, metric_items = compile_partial_aggregation(
+            schema_name,
+            table_name,
+            columns,
+            shard_column,
+            inclusive,
+            metrics=spec.get("metrics"),
+            group_by=spec.get("group_by"),
+            filters=spec.get("filters"),
+            time_column=spec.get("time_column"),
+            time_bucket=spec.get("time_bucket"),
+        )
+        async with semaphore:
+            start = time.monotonic()
+            rows = await db.run(
+                db.execute_query, db.query_guard.add_time_limit(sql), params + (lower, upper)
+            )
+        return rows, group_items, metric_items, round((time.monotonic() - start) * 1000, 2)
+
+    start = time.monotonic()
+    outcomes = await asyncio.gather(*(_run_shard(*bounds) for bounds in ranges))
+    group_items, metric_items = outcomes[0][1], outcomes[0][2]
+    merged = merge_partials([outcome[0] for outcome in outcomes], group_items, metric_items)
+    rows = order_and_limit(
+        merged,
+        [alias for _, alias in group_items],
+        [alias for _, _, alias in metric_items],
+        spec.get("order_by"),
+        spec.get("descending", True),
+        spec.get("time_bucket"),
+        spec.get("limit", 100),
+    )
+    return rows, {
+        "mode": "parallel",
+        "shard_column": shard_column,
+        "shards": len(ranges),
+        "parallelism": degree,
+        "elapsed_ms": round((time.monotonic() - start) * 1000, 2),
+        "slowest_shard_ms": max(outcome[3] for outcome in outcomes),
+    }
+
+
+async def _aggregate_across_shards(
+    schema_name: str,
+    table_name: str,
+    columns: List[Dict[str, Any]],
+    shard_names: List[str],
+    spec: Dict[str, Any],
+    format: str = "rows",
+) -> str:
+    """Run an aggregate on each shard and merge the partial groups
+
+    A shard configured with its own database uses it in place of the
+    default schema, so per-region database names still line up.
+    """
+    queries = {}
+    for name in shard_names:
+        shard_schema = schema_name
+        if schema_name == db.config["database"]:
+            shard_schema = db.shards[name].pool.config.get("database") or schema_name
+        sql, params, group_items, metric_items = compile_partial_aggregation(
+            shard_schema,
+            table_name,
+            columns,
+            None,
+            False,
+            metrics=spec["metrics"],
+            group_by=spec["group_by"],
+            filters=spec["filters"],
+            time_column=spec["time_column"],
+            time_bucket=spec["time_bucket"],
+        )
+        queries[name] = (db.query_guard.add_time_limit(sql), params)
+
+    outcomes = await _fan_out(queries)
+    succeeded = [outcome for outcome in outcomes if "rows" in outcome]
+    if not succeeded:
+        return _all_shards_failed(outcomes)
+
+    merged = merge_partials([o["rows"] for o in succeeded], group_items, metric_items)
+    results = order_and_limit(
+        merged,
+        [alias for _, alias in group_items],
+        [alias for _, _, alias in metric_items],
+        spec["order_by"],
+        spec["descending"],
+        spec["time_bucket"],
+        spec["limit"],
+    )
+    result, group_count = await db.run(
+        encode_rows_json,
+        {
+            "table": table_name,
+            "query": sql,
+            "params": list(params),
+            "execution": {
+                "mode": "shard_fan_out",
+                "shards": _shard_summary(outcomes),
+                "complete": len(succeeded) == len(outcomes),
+            },
+        },
+        [results],
+        "results",
+        "group_count",
+        format,
+    )
+    print(f"✅ Aggregated {table_name} across {len(succeeded)}/{len(outcomes)} shards into {group_count} groups")
+    return result
+
+
+@mcp.tool()
+async def aggregate_mysql_table(
+    schema_name: str,
+    table_name: str,
+    metrics: Optional[List[Dict[str, Any]]] = None,
+    group_by: Optional[List[str]] = None,
+    filters: Optional[List[Dict[str, Any]]] = None,
+    time_column: Optional[str] = None,
+    time_bucket: Optional[str] = None,
+    order_by: Optional[str] = None,
+    descending: bool = True,
+    limit: int = 100,
+    format: str = "rows",
+    parallelism: Optional[int] = None,
+    approximate: bool = False,
+    error_bound: float = 0.05,
+    shards: Optional[List[str]] = None,
+) -> str:
+    """
+    Aggregate a MySQL table on the server (GROUP BY) instead of fetching raw rows.
+
+    On large tables the aggregate is split into primary-key (or indexed time column)
+    range shards that run concurrently, and the partial results are merged.
+
+    With approximate=True only random primary-key blocks are read, in growing rounds,
+    until every count, sum and avg metric is within error_bound of its estimate at 95% confidence
+    (or MYSQL_APPROXIMATE_TIME_BUDGET_SECONDS runs out). count, sum and avg come back
+    with <alias>_low/<alias>_high bounds; min and max are sample extremes.
+
+    With shards, the aggregate runs on each shard (MYSQL_SHARDS) concurrently and the
+    partial groups are merged before ordering and limiting.
+
+    Args:
+        schema_name (str): Schema containing the table
+        table_name (str): Name of the table to aggregate
+        metrics (list, optional): Objects like {"fn": "sum", "column": "amount", "alias": "revenue"};
+            fn is one of count, sum, avg, min, max, count_distinct (default: [{"fn": "count"}])
+        group_by (list, optional): Column names to group by
+        filters (list, optional): Objects like {"column": "status", "op": "=", "value": "paid"};
+            op is one of =, !=, <, <=, >, >=, in, not_in, between, like, is_null, is_not_null
+        time_column (str, optional): DATE/DATETIME column to bucket
+        time_bucket (str, optional): minute, hour, day, week, month, quarter or year
+        order_by (str, optional): Output column to sort by (default: time bucket, else first metric)
+        descending (bool): Sort direction for order_by (default: True)
+        limit (int): Maximum number of groups to return (default: 100, max: 1000)
+        format (str): "rows" for a list of objects, or "columnar" for a columns list plus row arrays (smaller)
+        parallelism (int, optional): Concurrent shard queries; 1 runs a single query (default: MYSQL_AGGREGATE_PARALLELISM)
+        approximate (bool): Estimate from sampled key blocks instead of scanning the table (default: False)
+        error_bound (float): Target relative error of each count/sum/avg metric when approximate (default: 0.05)
+        shards (list, optional): Shard names to aggregate across, or ["*"] for every shard
+
+    Returns:
+        str: JSON formatted aggregate rows
+    """
+    print(
+        f"📈 AGGREGATE_MYSQL_TABLE called for {schema_name}.{table_name}, "
+        f"group_by: {group_by}, time_bucket: {time_bucket}"
+    )
+    logger.info(f"AGGREGATE_MYSQL_TABLE called for {schema_name}.{table_name}")
+    try:
+        columns = await db.run(db.get_table_schema, table_name, schema_name)
+        if not columns:
+            return f"❌ Table '{schema_name}.{table_name}' not found or has no columns"
+
+        query, params, _ = compile_aggregation(
+            schema_name,
+            table_name,
+            columns,
+            metrics=metrics,
+            group_by=group_by,
+            filters=filters,
+            time_column=time_column,
+            time_bucket=time_bucket,
+            order_by=order_by,
+            descending=descending,
+            limit=limit,
+        )
+        spec = {
+            "metrics": metrics,
+            "group_by": group_by,
+            "filters": filters,
+            "time_column": time_column,
+            "time_bucket": time_bucket,
+            "order_by": order_by,
+            "descending": descending,
+            "limit": limit,
+        }
+        if shards:
+            if approximate:
+                return "❌ approximate and shards cannot be combined"
+            return await _aggregate_across_shards(
+                schema_name,
+                table_name,
+                columns,
+                select_shards(list(db.shards), shards),
+                spec,
+                format,
+            )
+
+        if approximate:
+            estimates, approximation = await db.run(
+                db.approximate_aggregate,
+                table_name,
+                schema_name,
+                columns,
+                metrics,
+                group_by,
+                filters,
+                time_column,
+                time_bucket,
+                max(0.001, error_bound),
+            )
+            group_items, metric_items = resolve_aggregation(
+                ColumnCatalog(columns), metrics, group_by, time_column, time_bucket
+            )
+            results = order_and_limit(
+                estimates,
+                [alias for _, alias in group_items],
+                [alias for _, _, alias in metric_items],
+                order_by,
+                descending,
+                time_bucket,
+                limit,
+            )
+            result, group_count = await db.run(
+                encode_rows_json,
+                {"table": table_name, "approximation": approximation},
+                [results],
+                "results",
+                "group_count",
+                format,
+            )
+            print(
+                f"✅ Estimated {table_name} into {group_count} groups from "
+                f"{approximation['blocks_sampled']}/{approximation['blocks_total']} blocks"
+            )
+            return result
+
+        header = {"table": table_name, "query": query, "params": list(params)}
+        results, execution = await _aggregate_in_shards(
+            schema_name,
+            table_name,
+            columns,
+            spec,
+            db.aggregate_parallelism if parallelism is None else parallelism,
+        )
+        if results is None:
+            results, header["cache"] = await db.run(
+                db.execute_query_cached, db.query_guard.add_time_limit(query), params
+            )
+        header["execution"] = execution
+        result, group_count = await db.run(
+            encode_rows_json,
+            header,
+            [results],
+            "results",
+            "group_count",
+            format,
+        )
+        print(f"✅ Aggregated {table_name} into {group_count} groups")
+        return result
+
+    except AggregationSpecError as e:
+        print(f"❌ Invalid aggregation spec: {e}")
+        return f"❌ Invalid aggregation spec: {e}"
+    except ValueError as e:
+        print(f"❌ {e}")
+        return f"❌ {e}"
+    except Exception as e:
+        return _query_error_response(e)
+
+
+@mcp.tool()
+async def profile_mysql_table(
+    schema_name: str,
+    table_name: str,
+    columns: Optional[List[str]] = None,
+    histogram_bins: int = 10,
+    top_k: int = 10,
+    max_rows: int = 1000000,
+) -> str:
+    """
+    Profile the columns of a MySQL table to help choose visualizations.
+
+    For each column returns the null ratio, distinct count, min and max, the most
+    common values of low-cardinality columns and an equal-width histogram of numeric
+    columns. Distinct counts are exact over the profiled rows. Profiles are cached until
+    the table changes.
+
+    Args:
+        schema_name (str): Schema containing the table
+        table_name (str): Name of the table to profile
+        columns (list, optional): Column names to profile (default: all columns)
+        histogram_bins (int): Bins per numeric histogram (default: 10, max: 50)
+        top_k (int): Most common values returned per low-cardinality column (default: 10, max: 50)
+        max_rows (int): Profile larger tables from a random sample of about max_rows rows (default: 1000000)
+
+    Returns:
+        str: JSON formatted column profiles
+    """
+    print(f"🧮 PROFILE_MYSQL_TABLE called for {schema_name}.{table_name}")
+    logger.info(f"PROFILE_MYSQL_TABLE called for {schema_name}.{table_name}")
+    try:
+        start = time.monotonic()
+        profile = await db.run(
+            db.profile_table,
+            table_name,
+            schema_name,
+            columns,
+            max(1, min(histogram_bins, 50)),
+            max(1, min(top_k, 50)),
+            max_rows,
+        )
+        if not profile:
+            return f"❌ Table '{schema_name}.{table_name}' not found or has no matching columns"
+
+        print(f"✅ Profiled {len(profile['columns'])} columns of {table_name}")
+        return json.dumps(
+            {
+                "schema": schema_name,
+                "table": table_name,
+                **profile,
+                "elapsed_seconds": round(time.monotonic() - start, 3),
+            },
+            separators=(",", ":"),
+            default=str,
+        )
+
+    except Exception as e:
+        logger.error(f"Error profiling table: {e}")
+        print(f"❌ Error profiling table '{table_name}': {str(e)}")
+        return f"❌ Error profiling table '{table_name}': {str(e)}"
+
+
+def _collect_table_detail(
+    schema_name: str,
+    table_name: str,
+    exact_counts: bool,
+    sample_size: int = 0,
+    deadline: Optional[float] = None,
+) -> Optional[Dict[str, Any]]:
+    """Gather metadata, row count and optional sample rows for one table
+
+    With a ``deadline``, the COUNT(*) and sample queries carry a
+    MAX_EXECUTION_TIME of the time left, so a job the budget gave up on
+    does not keep scanning in the background.
+    """
+    table_info = db.get_table_info(table_name, schema_name)
+    if not table_info:
+        return None
+
+    row_count, is_exact = db.get_row_count(
+        table_name, schema_name, exact=exact_counts, max_execution_time_ms=_remaining_ms(deadline)
+    )
+    detail = {
+        "table_info": table_info,
+        "row_count": row_count,
+        "row_count_exact": is_exact,
+    }
+    if sample_size:
+        query = f"SELECT * FROM `{schema_name}`.`{table_name}` LIMIT {int(sample_size)}"
+        if deadline is not None:
+            query = db.query_guard.add_time_limit(query, _remaining_ms(deadline))
+        detail["sample_data"] = db.execute_query(query)
+    return detail
+
+
 @mcp.tool()
-async def get_mysql_schema_info(schema_name: str) -> str:
+async def get_mysql_schema_info(
+    schema_name: str,
+    exact_counts: bool = False,
+    time_budget_seconds: float = 30,
+) -> str:
     """
     Get detailed information about a specific schema including all tables, their columns, and relationships.
 
     Args:
         schema_name (str): Name of the schema to analyze
+        exact_counts (bool): Run COUNT(*) per table instead of using the TABLE_ROWS estimate (default: False)
+        time_budget_seconds (float): Return partial results after this many seconds (default: 30, 0 for no limit)
 
     Returns:
         str: JSON formatted schema information
@@ -333,29 +1602,46 @@ async def get_mysql_schema_info(schema_name: str) -> str:
         FROM INFORMATION_SCHEMA.SCHEMATA 
         WHERE SCHEMA_NAME = %s
         """
-        schema_info = db.execute_query(schema_info_query, (schema_name,))
+        schema_info = await db.run(db.execute_query, schema_info_query, (schema_name,))
 
         if not schema_info:
             return f"❌ Schema '{schema_name}' not found"
 
         # Get all tables in schema
-        tables = db.list_tables(schema_name)
+        tables = await db.run(db.list_tables, schema_name)
+
+        # Collect table details concurrently within the time budget
+        deadline = _budget_deadline(time_budget_seconds, time.monotonic())
+        details, unfinished = await _gather_with_budget(
+            [
+                (
+                    table_name,
+                    _collect_table_detail,
+                    (schema_name, table_name, exact_counts, 0, deadline),
+                )
+                for table_name in tables
+            ],
+            time_budget_seconds,
+        )
 
-        # Get detailed info for each table
         tables_detail = []
         for table_name in tables:
-            table_info = db.get_table_info(table_name, schema_name)
-            if table_info:
-                # Get row count
-                count_result = db.execute_query(
-                    f"SELECT COUNT(*) as count FROM `{schema_name}`.`{table_name}`"
+            if table_name in unfinished:
+                tables_detail.append(
+                    {"name": table_name, "status": "incomplete", "error": "Time budget exceeded"}
                 )
-                row_count = count_result[0]["count"] if count_result else 0
-
+                continue
+            detail = details.get(table_name)
+            if isinstance(detail, Exception):
+                tables_detail.append({"name": table_name, "error": str(detail)})
+                continue
+            if detail:
+                table_info = detail["table_info"]
                 tables_detail.append(
                     {
                         "name": table_name,
-                        "row_count": row_count,
+                        "row_count": detail["row_count"],
+                        "row_count_exact": detail["row_count_exact"],
                         "columns": table_info["columns"],
                         "indexes": table_info["indexes"],
                         "foreign_keys": table_info["foreign_keys"],
@@ -367,6 +1653,8 @@ async def get_mysql_schema_info(schema_name: str) -> str:
         result = {
             "schema_info": schema_info[0],
             "table_count": len(tables),
+            "complete": not unfinished,
+            "incomplete_tables": len(unfinished),
             "tables": tables_detail,
         }
 
@@ -381,16 +1669,28 @@ async def get_mysql_schema_info(schema_name: str) -> str:
 
 @mcp.tool()
 async def search_mysql_table(
-    schema_name: str, table_name: str, column: str, search_term: str, limit: int = 20
+    schema_name: str,
+    table_name: str,
+    column: str,
+    search_term: str,
+    limit: int = 20,
+    format: str = "rows",
+    mode: str = "auto",
 ) -> str:
     """
     Search for records in a MySQL table where a column contains a specific term.
 
+    Uses a FULLTEXT index (relevance ordered) when the column has one, then an index
+    prefix match, and only then a substring scan over a capped number of rows. The
+    response reports which strategy was used.
+
     Args:
         table_name (str): Name of the table to search
         column (str): Column name to search in
         search_term (str): Term to search for
         limit (int): Maximum number of results to return (default: 20, max: 100)
+        format (str): "rows" for a list of objects, or "columnar" for a columns list plus row arrays (smaller)
+        mode (str): "auto", or force "fulltext", "prefix" (values starting with the term) or "contains"
 
     Returns:
         str: JSON formatted search results
@@ -404,24 +1704,36 @@ async def search_mysql_table(
     try:
         # Ensure limit doesn't exceed maximum
         limit = min(limit, 100)
+        mode = (mode or "auto").lower()
+        if mode not in SEARCH_MODES:
+            return f"❌ Unknown search mode '{mode}', expected one of {SEARCH_MODES}"
+
+        columns = await db.run(db.get_table_schema, table_name, schema_name)
+        column_name = next(
+            (c["COLUMN_NAME"] for c in columns if c["COLUMN_NAME"].lower() == column.lower()),
+            None,
+        )
+        if not column_name:
+            return f"❌ Column '{column}' not found in '{table_name}'"
 
-        query = f"SELECT * FROM `{schema_name}`.`{table_name}` WHERE `{column}` LIKE %s LIMIT {limit}"
-        search_pattern = f"%{search_term}%"
-
-        results = db.execute_query(query, (search_pattern,))
-        print(f"✅ Search found {len(results)} matching records")
-
-        return json.dumps(
+        rows, strategy = await db.run(
+            db.search_table, table_name, schema_name, column_name, search_term, limit, mode
+        )
+        result, result_count = await db.run(
+            encode_rows_json,
             {
                 "table": table_name,
-                "column": column,
+                "column": column_name,
                 "search_term": search_term,
-                "result_count": len(results),
-                "results": results,
+                **strategy,
             },
-            indent=2,
-            default=str,
+            [rows],
+            "results",
+            "result_count",
+            format,
         )
+        print(f"✅ Search found {result_count} matching records ({strategy['strategy']})")
+        return result
 
     except Exception as e:
         logger.error(f"Error searching table: {e}")
@@ -429,6 +1741,144 @@ async def search_mysql_table(
         return f"❌ Error searching table '{table_name}': {str(e)}"
 
 
+@mcp.tool()
+async def find_value_in_mysql_schema(
+    value: str,
+    schema_name: Optional[str] = None,
+    tables: Optional[List[str]] = None,
+    match: str = "exact",
+    include_unindexed: bool = True,
+    max_probes: int = 200,
+    time_budget_seconds: Optional[float] = None,
+) -> str:
+    """
+    Find which tables and columns of a MySQL schema contain a value, in one call.
+
+    Candidate columns are chosen from the cached schema metadata by type: strings
+    only go to text columns long enough to hold them (and ENUMs that list them),
+    numbers to numeric columns, dates to temporal columns. Columns leading an index
+    are probed first as index lookups; others scan a capped number of rows. Every
+    probe is a LIMIT 1 query, and probes run concurrently within one time budget.
+
+    Args:
+        value (str): Value to look for, e.g. an email, order number or id
+        schema_name (str, optional): Schema to search (default: the configured database)
+        tables (list, optional): Restrict the search to these tables
+        match (str): "exact", "prefix" (values starting with it) or "contains" (text columns only)
+        include_unindexed (bool): Also probe columns without an index, scanning at most
+            MYSQL_FULL_SCAN_ROW_LIMIT rows each (default: True)
+        max_probes (int): Maximum number of columns to probe (default: 200, max: 1000)
+        time_budget_seconds (float, optional): Overall time limit (default: MYSQL_VALUE_SEARCH_TIME_BUDGET_SECONDS)
+
+    Returns:
+        str: JSON formatted matching table/column pairs with one sample row each
+    """
+    target_schema = schema_name or db.config["database"]
+    print(f"🔎 FIND_VALUE_IN_MYSQL_SCHEMA called for {target_schema}, value: {value}, match: {match}")
+    logger.info(f"FIND_VALUE_IN_MYSQL_SCHEMA called for {target_schema}, match: {match}")
+    try:
+        match = (match or "exact").lower()
+        if match not in VALUE_MATCHES:
+            return f"❌ Unknown match '{match}', expected one of {VALUE_MATCHES}"
+        if not value:
+            return "❌ value must not be empty"
+
+        table_names = await db.run(db.list_tables, target_schema)
+        if tables:
+            by_lower = {name.lower(): name for name in table_names}
+            unknown = [name for name in tables if name.lower() not in by_lower]
+            if unknown:
+                return f"❌ Tables not found in '{target_schema}': {', '.join(unknown)}"
+            table_names = [by_lower[name.lower()] for name in tables]
+        if not table_names:
+            return f"❌ No tables found in schema '{target_schema}'"
+
+        columns_by_schema = await db.run(db.get_table_schemas, {target_schema: table_names})
+        leading_indexes = await db.run(db.get_leading_index_columns, target_schema)
+        kinds = value_kinds(value)
+        candidates = value_candidates(
+            columns_by_schema.get(target_schema) or {},
+            leading_indexes,
+            kinds,
+            match,
+            include_unindexed,
+        )
+        max_probes = max(1, min(int(max_probes), 1000))
+        over_limit = len(candidates) - max_probes
+        candidates = candidates[:max_probes]
+
+        row_cap = db.query_guard.full_scan_row_limit
+        budget = db.value_search_time_budget if time_budget_seconds is None else time_budget_seconds
+        deadline = time.monotonic() + max(0.1, float(budget))
+        semaphore = asyncio.Semaphore(db.max_inflight)
+
+        async def _probe(candidate: Dict[str, Any]) -> Tuple[Dict[str, Any], str, Any]:
+            async with semaphore:
+                remaining_ms = int((deadline - time.monotonic()) * 1000)
+                if remaining_ms <= 0:
+                    return candidate, "not_run", None
+                query, params = value_probe(target_schema, candidate, kinds, match, row_cap)
+                try:
+                    rows = await db.run(
+                        db.execute_query,
+                        db.query_guard.add_time_limit(query, remaining_ms),
+                        params,
+                    )
+                except Exception as e:
+                    if getattr(e, "errno", None) == _ER_QUERY_TIMEOUT:
+                        return candidate, "timed_out", None
+                    return candidate, "error", str(e)
+                return candidate, ("found" if rows else "not_found"), rows[0] if rows else None
+
+        start = time.monotonic()
+        outcomes = await asyncio.gather(*(_probe(candidate) for candidate in candidates))
+
+        matches = []
+        unchecked = []
+        capped = 0
+        for candidate, status, detail in outcomes:
+            location = {"table": candidate["table"], "column": candidate["column"]}
+            if status == "found":
+                matches.append(
+                    {
+                        **location,
+                        "index": candidate["index"],
+                        "sample": detail,
+                    }
+                )
+            elif status in ("timed_out", "not_run", "error"):
+                unchecked.append({**location, "reason": status if status != "error" else detail})
+            elif not candidate["index"]:
+                capped += 1
+
+        print(
+            f"✅ Found '{value}' in {len(matches)} of {len(candidates)} probed columns "
+            f"({len(unchecked)} unchecked)"
+        )
+        return json.dumps(
+            {
+                "schema": target_schema,
+                "value": value,
+                "match": match,
+                "matches": matches,
+                "match_count": len(matches),
+                "probed": len(candidates) - len(unchecked),
+                "candidates": len(candidates) + max(0, over_limit),
+                "not_probed_over_max_probes": max(0, over_limit),
+                "unchecked": unchecked,
+                "capped_scans_without_match": capped,
+                "capped_scan_rows": row_cap,
+                "complete": not unchecked and capped == 0 and over_limit <= 0,
+                "elapsed_seconds": round(time.monotonic() - start, 3),
+            },
+            indent=2,
+            default=str,
+        )
+
+    except Exception as e:
+        return _query_error_response(e)
+
+
 @mcp.tool()
 async def get_mysql_schema_relationships(schema_name: str) -> str:
     """
@@ -443,26 +1893,8 @@ async def get_mysql_schema_relationships(schema_name: str) -> str:
     print(f"🔗 GET_MYSQL_SCHEMA_RELATIONSHIPS called for schema: {schema_name}")
     logger.info(f"GET_MYSQL_SCHEMA_RELATIONSHIPS called for schema: {schema_name}")
     try:
-        # Get all foreign key relationships in the schema
-        fk_query = """
-        SELECT 
-            kcu.TABLE_NAME as source_table,
-            kcu.COLUMN_NAME as source_column,
-            kcu.REFERENCED_TABLE_NAME as target_table,
-            kcu.REFERENCED_COLUMN_NAME as target_column,
-            kcu.CONSTRAINT_NAME as constraint_name,
-            rc.UPDATE_RULE,
-            rc.DELETE_RULE
-        FROM INFORMATION_SCHEMA.KEY_COLUMN_USAGE kcu
-        JOIN INFORMATION_SCHEMA.REFERENTIAL_CONSTRAINTS rc 
-            ON kcu.CONSTRAINT_NAME = rc.CONSTRAINT_NAME 
-            AND kcu.CONSTRAINT_SCHEMA = rc.CONSTRAINT_SCHEMA
-        WHERE kcu.TABLE_SCHEMA = %s 
-        AND kcu.REFERENCED_TABLE_NAME IS NOT NULL
-        ORDER BY kcu.TABLE_NAME, kcu.CONSTRAINT_NAME
-        """
-
-        relationships = db.execute_query(fk_query, (schema_name,))
+        # Foreign keys are cached with the schema metadata
+        relationships = await db.run(db.get_foreign_keys, schema_name)
 
         # Organize relationships by table
         tables_with_fks = {}
@@ -502,6 +1934,75 @@ async def get_mysql_schema_relationships(schema_name: str) -> str:
         return f"❌ Error getting relationships for schema '{schema_name}': {str(e)}"
 
 
+def _split_table_name(name: str, default_schema: str) -> Tuple[str, str]:
+    schema, _, table = name.strip().strip("`").rpartition(".")
+    return (schema.strip("`") or default_schema), table.strip("`")
+
+
+@mcp.tool()
+async def find_mysql_join_path(
+    from_table: str,
+    to_table: str,
+    schema_name: Optional[str] = None,
+    max_hops: int = 6,
+) -> str:
+    """
+    Find the shortest chain of foreign-key joins between two tables.
+
+    Returns each hop with its join predicate plus a ready-to-use FROM ... JOIN clause,
+    so multi-table questions need no exploration of the schema. When tables are linked
+    in more than one way, other paths up to one hop longer are listed as alternatives.
+    Uses a cached foreign-key graph of the schema.
+
+    Args:
+        from_table (str): Starting table, as "table" or "schema.table"
+        to_table (str): Target table, as "table" or "schema.table"
+        schema_name (str, optional): Schema for unqualified table names (uses default if not provided)
+        max_hops (int): Longest join chain to consider (default: 6)
+
+    Returns:
+        str: JSON formatted join path
+    """
+    print(f"🧭 FIND_MYSQL_JOIN_PATH called from {from_table} to {to_table}")
+    logger.info(f"FIND_MYSQL_JOIN_PATH called from {from_table} to {to_table}")
+    try:
+        default_schema = schema_name or db.config["database"]
+        start_name = _split_table_name(from_table, default_schema)
+        goal_name = _split_table_name(to_table, default_schema)
+
+        schemas = sorted({start_name[0], goal_name[0]})
+        graphs = [await db.run(db.get_join_graph, schema) for schema in schemas]
+        graph = graphs[0] if len(graphs) == 1 else JoinGraph.merge(graphs)
+
+        start = graph.resolve(*start_name)
+        goal = graph.resolve(*goal_name)
+        for name, table in ((start_name, start), (goal_name, goal)):
+            if table is None:
+                label = ".".join(name)
+                print(f"❌ Table '{label}' has no foreign key relationships")
+                return f"❌ Table '{label}' has no foreign key relationships"
+
+        steps = graph.shortest_path(start, goal, max_hops=max(1, int(max_hops)))
+        if steps is None:
+            print(f"❌ No join path within {max_hops} hops")
+            return (
+                f"❌ No foreign-key join path from '{from_table}' to '{to_table}' "
+                f"within {max_hops} hops"
+            )
+
+        result = describe_path(steps, start)
+        alternatives = graph.alternative_paths(start, goal, steps)
+        if alternatives:
+            result["alternatives"] = [describe_path(path, start) for path in alternatives]
+        print(f"✅ Found join path with {result['hops']} hops: {' -> '.join(result['tables'])}")
+        return json.dumps(result, indent=2)
+
+    except Exception as e:
+        logger.error(f"Error finding join path: {e}")
+        print(f"❌ Error finding join path from '{from_table}' to '{to_table}': {str(e)}")
+        return f"❌ Error finding join path from '{from_table}' to '{to_table}': {str(e)}"
+
+
 @mcp.tool()
 async def debug_mysql_schema_query() -> str:
     """
@@ -525,12 +2026,12 @@ async def debug_mysql_schema_query() -> str:
         
         # Test 2: Current database
         current_db_query = "SELECT DATABASE() as current_database"
-        current_db = db.execute_query(current_db_query)
+        current_db = await db.run(db.execute_query, current_db_query)
         debug_info["current_database"] = current_db
         
         # Test 3: All schemas (no filtering)
         all_schemas_query = "SELECT SCHEMA_NAME FROM INFORMATION_SCHEMA.SCHEMATA ORDER BY SCHEMA_NAME"
-        all_schemas = db.execute_query(all_schemas_query)
+        all_schemas = await db.run(db.execute_query, all_schemas_query)
         debug_info["all_schemas"] = all_schemas
         
         # Test 4: User schemas (filtered)
@@ -540,7 +2041,7 @@ async def debug_mysql_schema_query() -> str:
         WHERE SCHEMA_NAME NOT IN ('information_schema', 'performance_schema', 'mysql', 'sys')
         ORDER BY SCHEMA_NAME
         """
-        user_schemas = db.execute_query(user_schemas_query)
+        user_schemas = await db.run(db.execute_query, user_schemas_query)
         debug_info["user_schemas"] = user_schemas
         
         # Test 5: All tables (no filtering)
@@ -550,7 +2051,7 @@ async def debug_mysql_schema_query() -> str:
         ORDER BY TABLE_SCHEMA, TABLE_NAME 
         LIMIT 20
         """
-        all_tables = db.execute_query(all_tables_query)
+        all_tables = await db.run(db.execute_query, all_tables_query)
         debug_info["sample_tables"] = all_tables
         
         # Test 6: Base tables only
@@ -561,7 +2062,7 @@ async def debug_mysql_schema_query() -> str:
         ORDER BY TABLE_SCHEMA, TABLE_NAME 
         LIMIT 20
         """
-        base_tables = db.execute_query(base_tables_query)
+        base_tables = await db.run(db.execute_query, base_tables_query)
         debug_info["sample_base_tables"] = base_tables
         
         # Test 7: User base tables (filtered)
@@ -572,13 +2073,13 @@ async def debug_mysql_schema_query() -> str:
         AND TABLE_TYPE = 'BASE TABLE'
         ORDER BY TABLE_SCHEMA, TABLE_NAME
         """
-        user_base_tables = db.execute_query(user_base_tables_query)
+        user_base_tables = await db.run(db.execute_query, user_base_tables_query)
         debug_info["user_base_tables"] = user_base_tables
         
         # Test 8: Check privileges
         privileges_query = "SHOW GRANTS FOR CURRENT_USER()"
         try:
-            privileges = db.execute_query(privileges_query)
+            privileges = await db.run(db.execute_query, privileges_query)
             debug_info["user_privileges"] = privileges
         except Exception as e:
             debug_info["user_privileges_error"] = str(e)
@@ -592,17 +2093,24 @@ async def debug_mysql_schema_query() -> str:
         return f"❌ Error in debug query: {str(e)}"
 
 @mcp.tool()
-async def get_mysql_database_summary() -> str:
+async def get_mysql_database_summary(
+    exact_counts: bool = False, time_budget_seconds: float = 30
+) -> str:
     """
     Gets the table schemas, sample data per table and summary of the MySQL database including all tables and their basic information.
 
+    Args:
+        exact_counts (bool): Run COUNT(*) per table instead of using the TABLE_ROWS estimate (default: False)
+        time_budget_seconds (float): Return partial results after this many seconds (default: 30, 0 for no limit)
+
     Returns:
         str: JSON formatted database summary
     """
     print("📋 GET_MYSQL_DATABASE_SUMMARY called")
     logger.info("GET_MYSQL_DATABASE_SUMMARY called")
     try:
-        schemas_with_tables = db.list_tables_by_schema()
+        started = time.monotonic()
+        schemas_with_tables = await db.run(db.list_tables_by_schema)
         total_tables = sum(len(tables) for tables in schemas_with_tables.values())
 
         summary = {
@@ -615,6 +2123,25 @@ async def get_mysql_database_summary() -> str:
             "schemas_detail": {},
         }
 
+        # Fan out over every table in every schema on the connection pool
+        deadline = _budget_deadline(time_budget_seconds, started)
+        remaining_budget = (
+            max(0.001, deadline - time.monotonic()) if deadline is not None else None
+        )
+        details, unfinished = await _gather_with_budget(
+            [
+                (
+                    (schema_name, table_name),
+                    _collect_table_detail,
+                    (schema_name, table_name, exact_counts, 3, deadline),
+                )
+                for schema_name, table_names in schemas_with_tables.items()
+                for table_name in table_names
+            ],
+            remaining_budget,
+        )
+        unfinished = set(unfinished)
+
         # Process each schema
         for schema_name, table_names in schemas_with_tables.items():
             schema_detail = {
@@ -624,56 +2151,61 @@ async def get_mysql_database_summary() -> str:
             }
 
             for table_name in table_names:
-                try:
-                    # Get comprehensive table info including schema and indexes
-                    table_info = db.get_table_info(table_name, schema_name)
-                    if not table_info:
-                        schema_detail["tables"].append(
-                            {
-                                "name": table_name,
-                                "schema": schema_name,
-                                "error": "Table not found or no information available",
-                            }
-                        )
-                        continue
-
-                    # Get row count
-                    count_result = db.execute_query(
-                        f"SELECT COUNT(*) as count FROM `{schema_name}`.`{table_name}`"
+                key = (schema_name, table_name)
+                if key in unfinished:
+                    schema_detail["tables"].append(
+                        {
+                            "name": table_name,
+                            "schema": schema_name,
+                            "status": "incomplete",
+                            "error": "Time budget exceeded",
+                        }
                     )
-                    row_count = count_result[0]["count"] if count_result else 0
+                    continue
 
-                    # Get sample data
-                    sample_query = (
-                        f"SELECT * FROM `{schema_name}`.`{table_name}` LIMIT 3"
+                detail = details.get(key)
+                if isinstance(detail, Exception):
+                    logger.warning(
+                        f"Error getting info for table {schema_name}.{table_name}: {detail}"
                     )
-                    sample_results = db.execute_query(sample_query)
-
                     schema_detail["tables"].append(
                         {
                             "name": table_name,
                             "schema": schema_name,
-                            "row_count": row_count,
-                            "table_info": table_info["table_info"],
-                            "columns": table_info["columns"],
-                            "indexes": table_info["indexes"],
-                            "sample_data": sample_results,
+                            "error": str(detail),
                         }
                     )
-                except Exception as table_error:
-                    logger.warning(
-                        f"Error getting info for table {schema_name}.{table_name}: {table_error}"
-                    )
+                    continue
+                if not detail:
                     schema_detail["tables"].append(
                         {
                             "name": table_name,
                             "schema": schema_name,
-                            "error": str(table_error),
+                            "error": "Table not found or no information available",
                         }
                     )
+                    continue
+
+                table_info = detail["table_info"]
+                schema_detail["tables"].append(
+                    {
+                        "name": table_name,
+                        "schema": schema_name,
+                        "row_count": detail["row_count"],
+                        "row_count_exact": detail["row_count_exact"],
+                        "table_info": table_info["table_info"],
+                        "columns": table_info["columns"],
+                        "indexes": table_info["indexes"],
+                        "sample_data": detail["sample_data"],
+                    }
+                )
 
             summary["schemas_detail"][schema_name] = schema_detail
 
+        summary["complete"] = not unfinished
+        summary["incomplete_tables"] = len(unfinished)
+        summary["elapsed_seconds"] = round(time.monotonic() - started, 3)
+
         print(
             f"✅ Generated database summary with {len(schemas_with_tables)} schemas and {total_tables} total tables"
         )
@@ -685,7 +2217,83 @@ async def get_mysql_database_summary() -> str:
         return f"❌ Error getting database summary: {str(e)}"
 
 
+def _make_catalog_tool(entry: CatalogQuery) -> Callable:
+    """Build an async tool function whose signature mirrors the catalog entry"""
+
+    async def run_catalog_query(**arguments) -> str:
+        print(f"📚 Catalog query {entry.name} called with {arguments}")
+        logger.info(f"Catalog query {entry.name} called")
+        try:
+            params = entry.bind(arguments)
+            start = time.monotonic()
+            statement = db.query_guard.add_time_limit(entry.sql)
+            rows = await db.run(db.execute_prepared, entry.name, statement, params)
+            result, row_count = await db.run(
+                encode_rows_json,
+                {
+                    "catalog_query": entry.name,
+                    "params": arguments,
+                    "elapsed_ms": round((time.monotonic() - start) * 1000, 2),
+                },
+                [rows],
+                "results",
+                "row_count",
+            )
+            db.query_stats.record_bytes(statement, len(result))
+            print(f"✅ Catalog query {entry.name} returned {row_count} rows")
+            return result
+        except Exception as e:
+            return _query_error_response(e)
+
+    run_catalog_query.__name__ = entry.name
+    run_catalog_query.__doc__ = entry.docstring()
+    run_catalog_query.__signature__ = entry.signature()
+    return run_catalog_query
+
+
+def register_catalog_tools(path: Optional[str]) -> List[str]:
+    """Expose each query in the catalog file as its own MCP tool"""
+    if not path:
+        return []
+    try:
+        entries = load_catalog(path)
+    except CatalogError as e:
+        logger.error(f"Query catalog not loaded: {e}")
+        print(f"❌ Query catalog not loaded: {e}")
+        return []
+
+    existing = {tool.name for tool in mcp._tool_manager.list_tools()}
+    registered = []
+    for entry in entries:
+        if entry.name in existing:
+            logger.error(f"Catalog query '{entry.name}' clashes with a built-in tool, skipped")
+            continue
+        mcp.add_tool(
+            _make_catalog_tool(entry),
+            name=entry.name,
+            description=entry.docstring()
+            + "\n\nCurated catalog query: prefer it over writing SQL or exploring the schema.",
+        )
+        registered.append(entry.name)
+    print(f"📚 Registered {len(registered)} catalog queries from {path}")
+    return registered
+
+
+register_catalog_tools(os.getenv("MYSQL_QUERY_CATALOG"))
+
+
 def main():
+    try:
+        db.pool.prefill()
+    except Exception as e:
+        logger.warning(f"Could not pre-open MySQL pool connections: {e}")
+    db.router.prefill()
+    db.router.start()
+    for shard in db.shards.values():
+        try:
+            shard.pool.prefill()
+        except Exception as e:
+            logger.warning(f"Could not pre-open connections to shard {shard.name}: {e}")
     mcp.run(transport="sse")
 
 
@@ -0,0 +1,132 @@
+"""
+Continuation-token pagination for agent SELECT queries
+"""
+
+import re
+import json
+import base64
+import hashlib
+from typing import Dict, List, Any, Optional, Tuple
+
+_IDENT = r"`[^`]+`|\w+"
+_SIMPLE_SELECT = re.compile(
+    rf"^\s*SELECT\s+(?P<columns>.+?)\s+FROM\s+(?P<table>(?:{_IDENT})(?:\s*\.\s*(?:{_IDENT}))?)"
+    rf"(?:\s+(?:AS\s+)?(?P<alias>(?!WHERE\b){_IDENT}))?"
+    r"(?P<rest>\s+WHERE\s+.*)?\s*$",
+    re.IGNORECASE | re.DOTALL,
+)
+# Anything that changes row identity or order rules out keyset pagination
+_NOT_KEYSET_SAFE = re.compile(
+    r"\b(JOIN|GROUP\s+BY|ORDER\s+BY|LIMIT|HAVING|UNION|DISTINCT|OFFSET|FOR\s+UPDATE)\b|\(\s*SELECT\b",
+    re.IGNORECASE,
+)
+_HAS_LIMIT = re.compile(r"\bLIMIT\b", re.IGNORECASE)
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a continuation token is malformed or belongs to another query"""
+
+
+def _unquote(identifier: str) -> str:
+    return identifier.strip().strip("`")
+
+
+def query_fingerprint(query: str) -> str:
+    normalized = " ".join(query.strip().rstrip(";").split())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+def encode_cursor(state: Dict[str, Any]) -> str:
+    payload = json.dumps(state, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, query: str) -> Dict[str, Any]:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception:
+        raise InvalidCursorError("Malformed cursor")
+    if not isinstance(state, dict) or state.get("q") != query_fingerprint(query):
+        raise InvalidCursorError("Cursor does not belong to this query")
+    return state
+
+
+def parse_single_table(query: str) -> Optional[Tuple[Optional[str], str, List[str]]]:
+    """Return ``(schema, table, select_items)`` for keyset-safe single-table SELECTs"""
+    body = query.strip().rstrip(";")
+    match = _SIMPLE_SELECT.match(body)
+    if not match:
+        return None
+    if _NOT_KEYSET_SAFE.search(match.group("columns")) or _NOT_KEYSET_SAFE.search(
+        match.group("rest") or ""
+    ):
+        return None
+
+    parts = [_unquote(part) for part in match.group("table").split(".")]
+    schema, table = (parts[0], parts[1]) if len(parts) == 2 else (None, parts[0])
+    return schema, table, [item.strip() for item in match.group("columns").split(",")]
+
+
+def keyset_columns_selected(select_items: List[str], key_columns: List[str]) -> bool:
+    """Whether every key column comes back under its own name"""
+    if select_items == ["*"] or any(item.endswith(".*") for item in select_items):
+        return True
+    selected = set()
+    for item in select_items:
+        if re.search(r"\s|\(", item):
+            continue  # expressions or aliased columns
+        selected.add(_unquote(item.split(".")[-1]).lower())
+    return all(column.lower() in selected for column in key_columns)
+
+
+def build_page_query(
+    query: str,
+    page_size: int,
+    key_columns: Optional[List[str]],
+    state: Optional[Dict[str, Any]],
+) -> Tuple[str, Tuple]:
+    """Rewrite a SELECT to fetch one page (plus one look-ahead row)"""
+    body = query.strip().rstrip(";")
+    fetch = page_size + 1
+
+    if key_columns:
+        quoted = ", ".join(f"`{column}`" for column in key_columns)
+        where = ""
+        params: Tuple = ()
+        if state and state.get("k") is not None:
+            placeholders = ", ".join(["%s"] * len(key_columns))
+            if len(key_columns) == 1:
+                where = f" WHERE {quoted} > {placeholders}"
+            else:
+                where = f" WHERE ({quoted}) > ({placeholders})"
+            params = tuple(state["k"])
+        return (
+            f"SELECT * FROM ({body}) AS _page{where} ORDER BY {quoted} LIMIT {fetch}",
+            params,
+        )
+
+    offset = int(state.get("o", 0)) if state else 0
+    if _HAS_LIMIT.search(body):
+        return f"SELECT * FROM ({body}) AS _page LIMIT {fetch} OFFSET {offset}", ()
+    return f"{body} LIMIT {fetch} OFFSET {offset}", ()
+
+
+def next_cursor(
+    query: str,
+    page_size: int,
+    rows: List[Dict[str, Any]],
+    key_columns: Optional[List[str]],
+    state: Optional[Dict[str, Any]],
+) -> str:
+    """Build the continuation token that follows ``rows``"""
+    token = {"v": 1, "q": query_fingerprint(query), "n": page_size}
+    if key_columns:
+        # Result keys follow the case the query used, not the catalog's
+        last = {name.lower(): value for name, value in rows[-1].items()}
+        token["m"] = "keyset"
+        token["k"] = [last[column.lower()] for column in key_columns]
+    else:
+        token["m"] = "offset"
+        token["o"] = (int(state.get("o", 0)) if state else 0) + len(rows)
+    return encode_cursor(token)
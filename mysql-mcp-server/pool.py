@@ -0,0 +1,259 @@
+"""
+MySQL Connection Pool
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, Any
+import mysql.connector
+from mysql.connector.errors import PoolError
+
+logger = logging.getLogger(__name__)
+
+
+class _PooledConnection:
+    """A physical connection plus the bookkeeping the pool needs"""
+
+    __slots__ = ("connection", "created_at", "last_used", "statements")
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        # Server-side prepared statement cursors, by catalog query name
+        self.statements: Dict[str, Any] = {}
+
+
+class ConnectionPool:
+    """Thread-safe MySQL connection pool with health checks and metrics
+
+    Connections are handed out LIFO so the warmest connection is reused first
+    and surplus connections above ``min_size`` age out through the idle timeout.
+    """
+
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        min_size: int = 1,
+        max_size: int = 10,
+        idle_timeout: float = 300.0,
+        acquire_timeout: float = 30.0,
+        health_check_interval: float = 30.0,
+        max_lifetime: float = 3600.0,
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.config = config
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+        self.max_lifetime = max_lifetime
+
+        self._idle = deque()
+        self._size = 0
+        self._in_use = 0
+        self._lock = threading.Condition(threading.Lock())
+
+        self._metrics = {
+            "connections_created": 0,
+            "connections_closed": 0,
+            "acquired": 0,
+            "released": 0,
+            "health_checks": 0,
+            "health_check_failures": 0,
+            "exhausted": 0,
+            "acquire_timeouts": 0,
+            "total_wait_seconds": 0.0,
+            "max_wait_seconds": 0.0,
+        }
+
+    def _connect(self) -> _PooledConnection:
+        connection = mysql.connector.connect(**self.config)
+        with self._lock:
+            self._metrics["connections_created"] += 1
+        logger.debug(
+            f"Opened pooled MySQL connection to {self.config.get('host')}:{self.config.get('port')}"
+        )
+        return _PooledConnection(connection)
+
+    def _close(self, pooled: _PooledConnection) -> None:
+        try:
+            connection = pooled.connection
+            if connection.unread_result:
+                # Abandoned mid-stream: drop the socket instead of draining rows
+                connection.shutdown()
+            else:
+                connection.close()
+        except Exception as e:
+            logger.debug(f"Error closing pooled connection: {e}")
+        with self._lock:
+            self._metrics["connections_closed"] += 1
+
+    def _is_healthy(self, pooled: _PooledConnection) -> bool:
+        """Check a connection on borrow; pings only if it sat idle long enough"""
+        now = time.monotonic()
+        if self.max_lifetime and now - pooled.created_at > self.max_lifetime:
+            return False
+        if now - pooled.last_used < self.health_check_interval:
+            return True
+        with self._lock:
+            self._metrics["health_checks"] += 1
+        try:
+            pooled.connection.ping(reconnect=False)
+            return True
+        except Exception as e:
+            logger.info(f"Discarding unhealthy pooled connection: {e}")
+            with self._lock:
+                self._metrics["health_check_failures"] += 1
+            return False
+
+    def _evict_idle(self) -> list:
+        """Pop idle connections past the idle timeout (caller holds the lock)"""
+        expired = []
+        if not self.idle_timeout:
+            return expired
+        now = time.monotonic()
+        # Oldest idle connections sit at the left end of the deque
+        while self._idle and self._size > self.min_size:
+            if now - self._idle[0].last_used <= self.idle_timeout:
+                break
+            expired.append(self._idle.popleft())
+            self._size -= 1
+        return expired
+
+    def acquire(self) -> _PooledConnection:
+        """Borrow a connection, opening a new one or waiting when at capacity"""
+        deadline = time.monotonic() + self.acquire_timeout
+        wait_started = None
+        while True:
+            pooled = None
+            create = False
+            with self._lock:
+                expired = self._evict_idle()
+                if self._idle:
+                    pooled = self._idle.pop()
+                    self._in_use += 1
+                elif self._size < self.max_size:
+                    self._size += 1
+                    self._in_use += 1
+                    create = True
+                else:
+                    if wait_started is None:
+                        wait_started = time.monotonic()
+                        self._metrics["exhausted"] += 1
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._metrics["acquire_timeouts"] += 1
+                        raise PoolError(
+                            f"MySQL connection pool exhausted ({self.max_size} connections in use)"
+                        )
+                    self._lock.wait(remaining)
+                    continue
+
+            for stale in expired:
+                self._close(stale)
+
+            if create:
+                try:
+                    pooled = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._size -= 1
+                        self._in_use -= 1
+                        self._lock.notify()
+                    raise
+            elif not self._is_healthy(pooled):
+                self._close(pooled)
+                with self._lock:
+                    self._size -= 1
+                    self._in_use -= 1
+                    self._lock.notify()
+                continue
+
+            with self._lock:
+                self._metrics["acquired"] += 1
+                if wait_started is not None:
+                    waited = time.monotonic() - wait_started
+                    self._metrics["total_wait_seconds"] += waited
+                    self._metrics["max_wait_seconds"] = max(
+                        self._metrics["max_wait_seconds"], waited
+                    )
+            return pooled
+
+    def release(self, pooled: _PooledConnection, discard: bool = False) -> None:
+        """Return a borrowed connection, dropping it if it is no longer usable"""
+        if not discard:
+            try:
+                connection = pooled.connection
+                if connection.unread_result:
+                    connection.consume_results()
+                if connection.in_transaction:
+                    connection.rollback()
+            except Exception as e:
+                logger.debug(f"Discarding connection that failed cleanup: {e}")
+                discard = True
+
+        with self._lock:
+            self._in_use -= 1
+            self._metrics["released"] += 1
+            if discard:
+                self._size -= 1
+            else:
+                pooled.last_used = time.monotonic()
+                self._idle.append(pooled)
+            self._lock.notify()
+
+        if discard:
+            self._close(pooled)
+
+    def prefill(self) -> None:
+        """Open connections up to ``min_size``"""
+        while True:
+            with self._lock:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                pooled = self._connect()
+            except Exception:
+                with self._lock:
+                    self._size -= 1
+                raise
+            with self._lock:
+                self._idle.append(pooled)
+                self._lock.notify()
+
+    def close_all(self) -> None:
+        """Close every idle connection; borrowed ones close when released"""
+        with self._lock:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+        for pooled in idle:
+            self._close(pooled)
+
+    @property
+    def in_use(self) -> int:
+        with self._lock:
+            return self._in_use
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of pool sizing and counters"""
+        with self._lock:
+            stats = dict(self._metrics)
+            stats.update(
+                {
+                    "min_size": self.min_size,
+                    "max_size": self.max_size,
+                    "size": self._size,
+                    "in_use": self._in_use,
+                    "idle": len(self._idle),
+                }
+            )
+        stats["total_wait_seconds"] = round(stats["total_wait_seconds"], 3)
+        stats["max_wait_seconds"] = round(stats["max_wait_seconds"], 3)
+        return stats
@@ -0,0 +1,208 @@
+"""
+Column profiling queries for profile_mysql_table
+"""
+
+import math
+import random
+from typing import Dict, List, Any, Optional, Tuple
+
+from aggregation import NUMERIC_TYPES, TEMPORAL_TYPES
+from approximate import MAX_BLOCKS, MAX_RANGES_PER_QUERY, block_layout, key_ranges, sample_order
+
+# Columns whose values are too large or opaque to compare or group cheaply
+OPAQUE_TYPES = {
+    "tinyblob", "blob", "mediumblob", "longblob",
+    "tinytext", "text", "mediumtext", "longtext",
+    "binary", "varbinary", "json", "geometry", "point", "linestring",
+    "polygon", "multipoint", "multilinestring", "multipolygon", "geometrycollection",
+}
+
+# Columns with at most this many distinct values get top-k value counts
+LOW_CARDINALITY = 50
+
+
+def _quote(identifier: str) -> str:
+    return "`" + identifier.replace("`", "``") + "`"
+
+
+def column_kind(data_type: str) -> str:
+    data_type = (data_type or "").lower()
+    if data_type in NUMERIC_TYPES and data_type not in ("bit", "year"):
+        return "numeric"
+    if data_type in TEMPORAL_TYPES:
+        return "temporal"
+    if data_type in OPAQUE_TYPES:
+        return "opaque"
+    return "string"
+
+
+def build_summary_query(source_sql: str, columns: List[Dict[str, Any]]) -> str:
+    """One aggregate pass: row count plus nulls, distinct count, min and max per column"""
+    select = ["COUNT(*) AS `row_count`"]
+    for index, column in enumerate(columns):
+        column_sql = _quote(column["COLUMN_NAME"])
+        select.append(f"SUM({column_sql} IS NULL) AS `c{index}_nulls`")
+        if column_kind(column.get("DATA_TYPE")) != "opaque":
+            select.append(f"COUNT(DISTINCT {column_sql}) AS `c{index}_distinct`")
+            select.append(f"MIN({column_sql}) AS `c{index}_min`")
+            select.append(f"MAX({column_sql}) AS `c{index}_max`")
+    return f"SELECT {', '.join(select)} FROM {source_sql}"
+
+
+def parse_summary(
+    row: Dict[str, Any], columns: List[Dict[str, Any]]
+) -> Tuple[int, List[Dict[str, Any]]]:
+    """Turn the summary row into ``(row_count, column_profiles)``"""
+    row_count = int(row.get("row_count") or 0)
+    profiles = []
+    for index, column in enumerate(columns):
+        kind = column_kind(column.get("DATA_TYPE"))
+        nulls = int(row.get(f"c{index}_nulls") or 0)
+        profile: Dict[str, Any] = {
+            "column": column["COLUMN_NAME"],
+            "data_type": column.get("DATA_TYPE"),
+            "kind": kind,
+            "null_count": nulls,
+            "null_ratio": round(nulls / row_count, 4) if row_count else 0.0,
+        }
+        if kind != "opaque":
+            profile["distinct_count"] = int(row.get(f"c{index}_distinct") or 0)
+            profile["min"] = row.get(f"c{index}_min")
+            profile["max"] = row.get(f"c{index}_max")
+        profiles.append(profile)
+    return row_count, profiles
+
+
+def histogram_edges(low: float, high: float, bins: int) -> List[float]:
+    width = (high - low) / bins
+    return [low + width * step for step in range(bins)] + [high]
+
+
+def build_histogram_query(
+    source_sql: str, profiles: List[Dict[str, Any]], bins: int
+) -> Tuple[Optional[str], Tuple, List[Tuple[int, List[float]]]]:
+    """One aggregate pass counting every numeric column into equal-width bins
+
+    Returns the SQL (``None`` if no column needs a histogram), its
+    parameters and ``(profile_index, edges)`` for each histogrammed column.
+    """
+    select: List[str] = []
+    params: List[Any] = []
+    layout: List[Tuple[int, List[float]]] = []
+    for index, profile in enumerate(profiles):
+        if profile["kind"] != "numeric" or profile.get("min") is None:
+            continue
+        low, high = float(profile["min"]), float(profile["max"])
+        if low == high or profile.get("distinct_count", 0) <= LOW_CARDINALITY:
+            continue  # top-k values describe these better
+        edges = histogram_edges(low, high, bins)
+        column_sql = _quote(profile["column"])
+        for bin_index in range(bins):
+            upper = "<=" if bin_index == bins - 1 else "<"
+            select.append(
+                f"SUM({column_sql} >= %s AND {column_sql} {upper} %s) "
+                f"AS `h{index}_{bin_index}`"
+            )
+            params.extend([edges[bin_index], edges[bin_index + 1]])
+        layout.append((index, edges))
+    if not select:
+        return None, (), []
+    return f"SELECT {', '.join(select)} FROM {source_sql}", tuple(params), layout
+
+
+def apply_histograms(
+    row: Dict[str, Any], profiles: List[Dict[str, Any]], layout: List[Tuple[int, List[float]]]
+) -> None:
+    for index, edges in layout:
+        profiles[index]["histogram"] = [
+            {
+                "low": edges[bin_index],
+                "high": edges[bin_index + 1],
+                "count": int(row.get(f"h{index}_{bin_index}") or 0),
+            }
+            for bin_index in range(len(edges) - 1)
+        ]
+
+
+def source_columns(columns: List[Dict[str, Any]]) -> str:
+    """Select list for a derived profiling source: only what the profile reads
+
+    Opaque (BLOB/TEXT/JSON/...) columns are only null-counted, so they are
+    projected as a 1/NULL marker instead of their contents.
+    """
+    select = []
+    for column in columns:
+        column_sql = _quote(column["COLUMN_NAME"])
+        if column_kind(column.get("DATA_TYPE")) == "opaque":
+            select.append(f"IF({column_sql} IS NULL, NULL, 1) AS {column_sql}")
+        else:
+            select.append(column_sql)
+    return ", ".join(select)
+
+
+def block_sample_source(
+    table_sql: str,
+    columns: List[Dict[str, Any]],
+    key: str,
+    low: int,
+    high: int,
+    fraction: float,
+    rng: random.Random,
+) -> Tuple[str, Tuple]:
+    """Derived table over random primary-key blocks holding about ``fraction`` of the rows
+
+    Blocks are coarse enough that the sample stays within one statement's
+    worth of OR'ed key ranges, and each is a clustered-index range read.
+    """
+    max_blocks = min(MAX_BLOCKS, max(1, int(MAX_RANGES_PER_QUERY / fraction)))
+    width, block_count = block_layout(low, high, max_blocks)
+    blocks = sample_order(block_count, rng)[: max(1, math.ceil(block_count * fraction))]
+    range_sql, params = key_ranges(key, low, width, blocks)
+    return (
+        f"(SELECT {source_columns(columns)} FROM {table_sql} WHERE {range_sql}) AS _profile",
+        params,
+    )
+
+
+def build_top_values_query(source_sql: str, profiles: List[Dict[str, Any]]) -> Optional[str]:
+    """Value counts of every low-cardinality column in one pass over the source
+
+    The columns are unpivoted by joining each source row to one row per
+    column, so a single ``GROUP BY column, value`` counts them all.
+    STRAIGHT_JOIN keeps the source as the outer table, read once. Each
+    column has at most LOW_CARDINALITY values, so all groups come back and
+    ``apply_top_values`` keeps the top ``k``.
+    """
+    indexes = []
+    cases = []
+    for index, profile in enumerate(profiles):
+        if profile["kind"] == "opaque":
+            continue
+        if not 0 < profile.get("distinct_count", 0) <= LOW_CARDINALITY:
+            continue
+        indexes.append(index)
+        cases.append(f"WHEN {index} THEN CAST({_quote(profile['column'])} AS CHAR)")
+    if not indexes:
+        return None
+    unpivot = " UNION ALL ".join(f"SELECT {index} AS `_index`" for index in indexes)
+    return (
+        f"SELECT `_columns`.`_index` AS `profile_index`, "
+        f"CASE `_columns`.`_index` {' '.join(cases)} END AS `value`, COUNT(*) AS `count` "
+        f"FROM {source_sql} STRAIGHT_JOIN ({unpivot}) AS `_columns` "
+        f"GROUP BY `profile_index`, `value` HAVING `value` IS NOT NULL "
+        f"ORDER BY `profile_index`, `count` DESC"
+    )
+
+
+def apply_top_values(
+    rows: List[Dict[str, Any]], profiles: List[Dict[str, Any]], top_k: int
+) -> None:
+    for row in rows:
+        profile = profiles[int(row["profile_index"])]
+        profile.setdefault("top_values", []).append(
+            {"value": row["value"], "count": int(row["count"])}
+        )
+    for profile in profiles:
+        if "top_values" in profile:
+            profile["top_values"].sort(key=lambda entry: -entry["count"])
+            del profile["top_values"][top_k:]
@@ -0,0 +1,145 @@
+"""
+EXPLAIN-based cost guard for agent-generated SELECT queries
+"""
+
+import re
+from typing import Dict, List, Any, Optional, Tuple
+
+GUARD_MODES = ("reject", "warn", "off")
+
+_LEADING_SELECT = re.compile(r"^\s*SELECT\b", re.IGNORECASE)
+_HAS_TIME_HINT = re.compile(r"MAX_EXECUTION_TIME\s*\(", re.IGNORECASE)
+_LIMIT = re.compile(r"\bLIMIT\s+(\d+)(?:\s*,\s*(\d+))?(?:\s+OFFSET\s+(\d+))?\s*;?\s*$", re.IGNORECASE)
+# Shapes that have to read every qualifying row before returning the first one
+_NEEDS_FULL_INPUT = re.compile(
+    r"\b(GROUP\s+BY|DISTINCT|HAVING|COUNT|SUM|AVG|MIN|MAX|GROUP_CONCAT|STDDEV|VARIANCE)\b",
+    re.IGNORECASE,
+)
+
+
+class QueryRejectedError(Exception):
+    """Raised when a query's estimated cost exceeds the guard's thresholds"""
+
+    def __init__(self, reason: str, plan: Dict[str, Any]):
+        super().__init__(reason)
+        self.reason = reason
+        self.plan = plan
+
+
+def _number(value: Any, default: float) -> float:
+    try:
+        return float(value) if value is not None else default
+    except (TypeError, ValueError):
+        return default
+
+
+class QueryGuard:
+    """Pre-flight EXPLAIN checks and execution-time limits for SELECTs
+
+    ``mode`` is ``reject`` (refuse queries over a threshold), ``warn``
+    (run them but report warnings) or ``off``.
+    """
+
+    def __init__(
+        self,
+        mode: str = "reject",
+        full_scan_row_limit: int = 100_000,
+        max_examined_rows: int = 10_000_000,
+        max_execution_time_ms: int = 30_000,
+    ):
+        if mode not in GUARD_MODES:
+            raise ValueError(f"Unknown cost guard mode '{mode}', expected one of {GUARD_MODES}")
+        self.mode = mode
+        self.full_scan_row_limit = full_scan_row_limit
+        self.max_examined_rows = max_examined_rows
+        self.max_execution_time_ms = max_execution_time_ms
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def add_time_limit(self, query: str, max_execution_time_ms: Optional[int] = None) -> str:
+        """Inject a MAX_EXECUTION_TIME optimizer hint into a top-level SELECT"""
+        limit_ms = self.max_execution_time_ms if max_execution_time_ms is None else max_execution_time_ms
+        if not limit_ms or _HAS_TIME_HINT.search(query):
+            return query
+        match = _LEADING_SELECT.match(query)
+        if not match:
+            return query
+        hint = f" /*+ MAX_EXECUTION_TIME({int(limit_ms)}) */"
+        return query[: match.end()] + hint + query[match.end():]
+
+    def summarize(self, query: str, plan_rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Condense tabular EXPLAIN output into what an agent needs to rewrite a query"""
+        tables = []
+        full_scans = []
+        examined = 0.0
+        prefix_by_select: Dict[Any, float] = {}
+        needs_sort = False
+
+        for row in plan_rows:
+            rows = _number(row.get("rows"), 0.0)
+            filtered = _number(row.get("filtered"), 100.0) / 100.0
+            extra = row.get("Extra") or ""
+            access = row.get("type")
+            select_id = row.get("id")
+
+            # Nested-loop estimate: each table is read once per row produced
+            # by the tables joined before it in the same SELECT
+            prefix = prefix_by_select.get(select_id, 1.0)
+            examined += prefix * rows
+            prefix_by_select[select_id] = prefix * max(rows * filtered, 1.0)
+
+            if "Using filesort" in extra or "Using temporary" in extra:
+                needs_sort = True
+            table = {
+                "table": row.get("table"),
+                "access_type": access,
+                "key": row.get("key"),
+                "rows": int(rows),
+                "filtered": round(filtered * 100, 2),
+            }
+            if extra:
+                table["extra"] = extra
+            tables.append(table)
+            if access in ("ALL", "index"):
+                full_scans.append(
+                    {"table": row.get("table"), "access_type": access, "rows": int(rows)}
+                )
+
+        # A streaming plan stops once the LIMIT is satisfied
+        limit_match = _LIMIT.search(query)
+        if limit_match and not needs_sort and not _NEEDS_FULL_INPUT.search(query):
+            count = int(limit_match.group(2) or limit_match.group(1))
+            offset = int(limit_match.group(3) or (limit_match.group(1) if limit_match.group(2) else 0))
+            first = plan_rows[0] if plan_rows else {}
+            selectivity = max(_number(first.get("filtered"), 100.0) / 100.0, 0.01)
+            examined = min(examined, (count + offset) / selectivity)
+
+        return {
+            "estimated_rows_examined": int(examined),
+            "full_scans": full_scans,
+            "uses_filesort_or_temporary": needs_sort,
+            "tables": tables,
+        }
+
+    def check(self, summary: Dict[str, Any]) -> Tuple[Optional[str], List[str]]:
+        """Return ``(rejection_reason, warnings)`` for a plan summary"""
+        problems = []
+        for scan in summary["full_scans"]:
+            # A scan that a LIMIT cuts short only reads as far as the estimate
+            if min(scan["rows"], summary["estimated_rows_examined"]) > self.full_scan_row_limit:
+                problems.append(
+                    f"full {'index ' if scan['access_type'] == 'index' else ''}scan of "
+                    f"'{scan['table']}' (~{scan['rows']} rows, limit {self.full_scan_row_limit}); "
+                    "add a selective WHERE on an indexed column or aggregate with a narrower filter"
+                )
+        if summary["estimated_rows_examined"] > self.max_examined_rows:
+            problems.append(
+                f"estimated {summary['estimated_rows_examined']} rows examined "
+                f"(limit {self.max_examined_rows}); narrow the filters or join order"
+            )
+
+        if problems and self.mode == "reject":
+            return "; ".join(problems), []
+        return None, problems
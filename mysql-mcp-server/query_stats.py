@@ -0,0 +1,207 @@
+"""
+Per-digest query statistics and a slow-query ring buffer
+"""
+
+import re
+import math
+import time
+import hashlib
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, List, Any, Optional, Tuple
+
+_COMMENT = re.compile(r"/\*.*?\*/|--[^\n]*|#[^\n]*", re.DOTALL)
+_STRING = re.compile(r"""'(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.|"")*\"""")
+_NUMBER = re.compile(r"(?<![\w`.])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+_HEX = re.compile(r"\b0x[0-9a-fA-F]+\b|\bX'[0-9a-fA-F]*'", re.IGNORECASE)
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_VALUES_LIST = re.compile(r"(\(\.\.\.\))(?:\s*,\s*\(\.\.\.\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+# Latency samples kept per digest for percentiles
+_SAMPLES = 1024
+
+
+def normalize_query(query: str) -> str:
+    """Replace literals with ``?`` so queries differing only in values match"""
+    text = _HEX.sub("?", query)
+    text = _STRING.sub("?", text)
+    text = _COMMENT.sub(" ", text)
+    text = _NUMBER.sub("?", text)
+    text = text.replace("%s", "?")
+    text = _PLACEHOLDER_LIST.sub("(...)", text)
+    text = _VALUES_LIST.sub(r"\1", text)
+    return _WHITESPACE.sub(" ", text).strip().rstrip(";").strip()
+
+
+def fingerprint(query: str) -> Tuple[str, str]:
+    """``(digest, normalized_text)`` for a statement"""
+    normalized = normalize_query(query)
+    digest = hashlib.sha1(normalized.lower().encode("utf-8")).hexdigest()[:16]
+    return digest, normalized
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class _Digest:
+    __slots__ = (
+        "text", "count", "errors", "total_ms", "max_ms", "rows", "bytes",
+        "samples", "first_seen", "last_seen",
+    )
+
+    def __init__(self, text: str):
+        self.text = text
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.samples: deque = deque(maxlen=_SAMPLES)
+        self.first_seen = time.time()
+        self.last_seen = self.first_seen
+
+
+class QueryStats:
+    """Aggregates latency, rows and bytes per normalized statement
+
+    At most ``max_digests`` statements are tracked; the least recently seen
+    is dropped first. Statements slower than ``slow_query_ms`` are also kept
+    in a ring buffer of the last ``slow_log_size`` occurrences.
+    """
+
+    def __init__(self, max_digests: int = 500, slow_query_ms: float = 1000.0, slow_log_size: int = 50):
+        self.max_digests = max_digests
+        self.slow_query_ms = slow_query_ms
+        self._digests: "OrderedDict[str, _Digest]" = OrderedDict()
+        self._slow: deque = deque(maxlen=max(1, slow_log_size))
+        self._lock = threading.Lock()
+        self._evicted = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_digests > 0
+
+    def _entry(self, digest: str, text: str) -> _Digest:
+        entry = self._digests.get(digest)
+        if entry is None:
+            entry = self._digests[digest] = _Digest(text)
+            while len(self._digests) > self.max_digests:
+                self._digests.popitem(last=False)
+                self._evicted += 1
+        self._digests.move_to_end(digest)
+        return entry
+
+    def record(
+        self, query: str, elapsed_ms: float, rows: int = 0, error: bool = False
+    ) -> bool:
+        """Record one execution; returns whether it counts as a slow query"""
+        if not self.enabled:
+            return False
+        digest, text = fingerprint(query)
+        with self._lock:
+            entry = self._entry(digest, text)
+            entry.count += 1
+            entry.errors += int(error)
+            entry.total_ms += elapsed_ms
+            entry.max_ms = max(entry.max_ms, elapsed_ms)
+            entry.rows += rows
+            entry.samples.append(elapsed_ms)
+            entry.last_seen = time.time()
+        return bool(self.slow_query_ms) and elapsed_ms >= self.slow_query_ms
+
+    def record_bytes(self, query: str, size: int) -> None:
+        """Add the size of a serialized tool response to a statement's digest"""
+        if not self.enabled:
+            return
+        digest, text = fingerprint(query)
+        with self._lock:
+            self._entry(digest, text).bytes += size
+
+    def record_slow(
+        self, query: str, elapsed_ms: float, rows: int, explain: Optional[List[Dict[str, Any]]]
+    ) -> None:
+        digest, _ = fingerprint(query)
+        with self._lock:
+            self._slow.append(
+                {
+                    "at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                    "digest": digest,
+                    "query": query[:2000],
+                    "elapsed_ms": round(elapsed_ms, 2),
+                    "rows": rows,
+                    "explain": explain,
+                }
+            )
+
+    def digests(self, order_by: str = "total_ms", limit: int = 20) -> List[Dict[str, Any]]:
+        with self._lock:
+            entries = [
+                (digest, entry, sorted(entry.samples)) for digest, entry in self._digests.items()
+            ]
+        rows = []
+        for digest, entry, samples in entries:
+            rows.append(
+                {
+                    "digest": digest,
+                    "query": entry.text,
+                    "count": entry.count,
+                    "errors": entry.errors,
+                    "total_ms": round(entry.total_ms, 2),
+                    "mean_ms": round(entry.total_ms / entry.count, 2) if entry.count else 0.0,
+                    "p50_ms": round(percentile(samples, 0.50), 2),
+                    "p95_ms": round(percentile(samples, 0.95), 2),
+                    "p99_ms": round(percentile(samples, 0.99), 2),
+                    "max_ms": round(entry.max_ms, 2),
+                    "rows": entry.rows,
+                    "bytes": entry.bytes,
+                    "last_seen": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(entry.last_seen)),
+                }
+            )
+        if rows and order_by not in rows[0]:
+            raise ValueError(f"Cannot order digests by '{order_by}'")
+        rows.sort(key=lambda row: row[order_by], reverse=True)
+        return rows[:limit]
+
+    def slow_queries(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(reversed(self._slow))
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "digests": len(self._digests),
+                "evicted_digests": self._evicted,
+                "slow_queries": len(self._slow),
+                "slow_query_ms": self.slow_query_ms,
+            }
+
+
+def render_prometheus(stats: QueryStats, gauges: Dict[str, float], limit: int = 100) -> str:
+    """Prometheus text exposition of per-digest counters plus server gauges"""
+    lines = []
+    for name, value in gauges.items():
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {value}")
+
+    digests = stats.digests(order_by="total_ms", limit=limit)
+    series = [
+        ("mysql_mcp_query_count", "counter", "count"),
+        ("mysql_mcp_query_errors", "counter", "errors"),
+        ("mysql_mcp_query_time_ms_total", "counter", "total_ms"),
+        ("mysql_mcp_query_rows_total", "counter", "rows"),
+        ("mysql_mcp_query_bytes_total", "counter", "bytes"),
+        ("mysql_mcp_query_p95_ms", "gauge", "p95_ms"),
+        ("mysql_mcp_query_p99_ms", "gauge", "p99_ms"),
+    ]
+    for metric, kind, field in series:
+        lines.append(f"# TYPE {metric} {kind}")
+        for row in digests:
+            lines.append(f'{metric}{{digest="{row["digest"]}"}} {row[field]}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,219 @@
+"""
+Read-replica routing for the MySQL connection pools
+"""
+
+import time
+import logging
+import threading
+from typing import Dict, List, Any, Optional, Tuple
+from mysql.connector import Error
+from pool import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+BALANCE_STRATEGIES = ("round_robin", "least_connections")
+
+
+def parse_replica_hosts(value: Optional[str], default_port: int) -> List[Tuple[str, int, int]]:
+    """Parse ``host[:port][=weight]`` entries separated by commas"""
+    replicas = []
+    for entry in (value or "").split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        address, _, weight = entry.partition("=")
+        host, _, port = address.partition(":")
+        replicas.append(
+            (host.strip(), int(port) if port else default_port, int(weight) if weight else 1)
+        )
+    return replicas
+
+
+class Replica:
+    """One read replica: its pool, balancing weight and last known health"""
+
+    def __init__(self, pool: ConnectionPool, weight: int = 1):
+        self.pool = pool
+        self.weight = max(1, weight)
+        self.name = f"{pool.config.get('host')}:{pool.config.get('port')}"
+        self.healthy = False  # out of rotation until its first check passes
+        self.lag_seconds: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.last_check = 0.0
+        self.current_weight = 0
+        self.selected = 0
+
+
+class ReplicaRouter:
+    """Chooses the pool for each read: a healthy replica, else the primary
+
+    Replicas are balanced by smooth weighted round-robin or by fewest
+    in-use connections per unit of weight. A replica is skipped while its
+    ``Seconds_Behind_Source`` exceeds ``max_lag_seconds``, replication is
+    stopped, or it cannot be reached. A background thread re-checks each
+    replica every ``check_interval`` seconds, so reads never wait on a
+    health check and use the last known state. Replicas start out of
+    rotation, so reads go to the primary until a replica's first check
+    passes.
+    """
+
+    def __init__(
+        self,
+        primary: ConnectionPool,
+        replicas: List[Replica],
+        strategy: str = "round_robin",
+        max_lag_seconds: float = 30.0,
+        check_interval: float = 5.0,
+    ):
+        if strategy not in BALANCE_STRATEGIES:
+            raise ValueError(
+                f"Unknown replica balancing '{strategy}', expected one of {BALANCE_STRATEGIES}"
+            )
+        self.primary = primary
+        self.replicas = replicas
+        self.strategy = strategy
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._primary_fallbacks = 0
+        self._monitor: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def _replication_lag(self, replica: Replica) -> Optional[float]:
+        """Seconds behind the source; raises if replication is not running"""
+        pooled = replica.pool.acquire()
+        discard = False
+        try:
+            cursor = pooled.connection.cursor(dictionary=True)
+            try:
+                cursor.execute("SHOW REPLICA STATUS")
+            except Error:
+                # Servers before 8.0.22 only know the old syntax
+                cursor.execute("SHOW SLAVE STATUS")
+            status = cursor.fetchall()
+            cursor.close()
+        except Error:
+            discard = not pooled.connection.is_connected()
+            raise
+        finally:
+            replica.pool.release(pooled, discard=discard)
+
+        if not status:
+            return None  # not configured as a replica: nothing to lag behind
+        row = status[0]
+        lag = row.get("Seconds_Behind_Source", row.get("Seconds_Behind_Master"))
+        if lag is None:
+            raise RuntimeError("replication is not running")
+        return float(lag)
+
+    def _check(self, replica: Replica) -> None:
+        try:
+            lag = self._replication_lag(replica)
+            healthy = lag is None or lag <= self.max_lag_seconds
+            error = None if healthy else f"lag {lag}s exceeds {self.max_lag_seconds}s"
+        except Exception as e:
+            lag, healthy, error = None, False, str(e)
+
+        with self._lock:
+            first_check = replica.last_check == 0.0
+            changed = healthy != replica.healthy
+            replica.healthy, replica.lag_seconds, replica.last_error = healthy, lag, error
+            replica.last_check = time.monotonic()
+        if changed or (first_check and not healthy):
+            logger.warning(
+                f"Replica {replica.name} is now {'healthy' if healthy else 'out of rotation'}"
+                + (f": {error}" if error else "")
+            )
+
+    def mark_failed(self, pool: ConnectionPool, error: Exception) -> None:
+        """Take a replica out of rotation until its next check"""
+        for replica in self.replicas:
+            if replica.pool is pool:
+                with self._lock:
+                    replica.healthy = False
+                    replica.last_error = str(error)
+                    replica.last_check = time.monotonic()
+                logger.warning(f"Replica {replica.name} failed, reading from primary: {error}")
+
+    def _run_checks(self) -> None:
+        while not self._stop.is_set():
+            now = time.monotonic()
+            with self._lock:
+                due = [
+                    replica for replica in self.replicas
+                    if now - replica.last_check >= self.check_interval
+                ]
+            for replica in due:
+                self._check(replica)
+            self._stop.wait(self.check_interval)
+
+    def start(self) -> None:
+        """Start the background health checks (once); the first pass runs at once"""
+        if not self.replicas:
+            return
+        with self._lock:
+            if self._monitor is not None:
+                return
+            self._monitor = threading.Thread(
+                target=self._run_checks, name="mysql-replica-check", daemon=True
+            )
+        self._monitor.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def choose(self) -> ConnectionPool:
+        """Pool to serve the next read from"""
+        if not self.replicas:
+            return self.primary
+        if self._monitor is None:
+            self.start()
+
+        with self._lock:
+            candidates = [replica for replica in self.replicas if replica.healthy]
+            if not candidates:
+                self._primary_fallbacks += 1
+                return self.primary
+
+            if self.strategy == "least_connections":
+                chosen = min(
+                    candidates, key=lambda r: (r.pool.in_use / r.weight, -r.weight)
+                )
+            else:
+                # Smooth weighted round-robin: spreads picks evenly by weight
+                total = sum(replica.weight for replica in candidates)
+                for replica in candidates:
+                    replica.current_weight += replica.weight
+                chosen = max(candidates, key=lambda r: r.current_weight)
+                chosen.current_weight -= total
+            chosen.selected += 1
+            return chosen.pool
+
+    def prefill(self) -> None:
+        for replica in self.replicas:
+            try:
+                replica.pool.prefill()
+            except Exception as e:
+                logger.warning(f"Could not pre-open connections to replica {replica.name}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            replicas = [
+                {
+                    "host": replica.name,
+                    "weight": replica.weight,
+                    "healthy": replica.healthy,
+                    "lag_seconds": replica.lag_seconds,
+                    "last_error": replica.last_error,
+                    "selected": replica.selected,
+                    "in_use": replica.pool.in_use,
+                }
+                for replica in self.replicas
+            ]
+            fallbacks = self._primary_fallbacks
+        return {
+            "strategy": self.strategy,
+            "max_lag_seconds": self.max_lag_seconds,
+            "primary_fallbacks": fallbacks,
+            "replicas": replicas,
+        }
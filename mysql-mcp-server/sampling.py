@@ -0,0 +1,105 @@
+"""
+Random sampling helpers for get_mysql_table_sample
+"""
+
+import random
+from typing import Dict, List, Any, Optional, Tuple
+
+from search import group_indexes
+
+SAMPLE_MODES = ("auto", "first", "pk_range", "reservoir", "stratified")
+
+# Most distinct values of the stratify_by column that get their own stratum
+MAX_STRATA = 20
+
+
+def make_rng(seed: Optional[int]) -> Tuple[random.Random, int]:
+    """Seeded RNG plus the seed used, so unseeded samples can be replayed"""
+    if seed is None:
+        seed = random.SystemRandom().randrange(2**31)
+    return random.Random(seed), int(seed)
+
+
+def random_points(rng: random.Random, low: int, high: int, count: int) -> List[int]:
+    """``count`` uniform integers in ``[low, high]``, sorted for index locality"""
+    return sorted(rng.randint(low, high) for _ in range(count))
+
+
+def probe_union_query(
+    table_sql: str, key_sql: str, count: int, condition: str = "", per_probe: int = 1
+) -> str:
+    """UNION ALL of ``count`` seeks of the form ``key >= %s ORDER BY key LIMIT n``
+
+    Each seek is a primary-key range lookup, so the query costs
+    ``count`` index dives no matter how large the table is.
+    """
+    where = f"{condition} AND " if condition else ""
+    probe = (
+        f"(SELECT * FROM {table_sql} WHERE {where}{key_sql} >= %s "
+        f"ORDER BY {key_sql} LIMIT {per_probe})"
+    )
+    return " UNION ALL ".join([probe] * count)
+
+
+def stratum_index(
+    indexes: List[Dict[str, Any]], column: str, key_column: Optional[str]
+) -> Tuple[Optional[str], bool]:
+    """B-tree index leading with ``column`` and whether it orders rows by ``key_column``
+
+    Returns ``(index_name, seekable)``. InnoDB secondary indexes end with the
+    primary key, so an index on ``column`` alone or on ``(column, key)``
+    serves the per-stratum key seeks as range reads.
+    """
+    found = None
+    for name, (index_type, columns) in group_indexes(indexes).items():
+        columns = [c.lower() for c in columns]
+        if index_type == "FULLTEXT" or columns[0] != column.lower():
+            continue
+        if key_column and (len(columns) == 1 or columns[1] == key_column.lower()):
+            return name, True
+        found = found or name
+    return found, False
+
+
+def stratum_condition(column_sql: str, value: Any) -> Tuple[str, List[Any]]:
+    """WHERE condition selecting one stratum, and its parameters"""
+    if value is None:
+        return f"{column_sql} IS NULL", []
+    return f"{column_sql} = %s", [value]
+
+
+def stratum_key(value: Any) -> Any:
+    # Default collations compare strings case-insensitively, as GROUP BY did
+    return value.casefold() if isinstance(value, str) else value
+
+
+def allocate_strata(sample_size: int, strata: int) -> List[int]:
+    """Rows per stratum, most common first: equal shares so rare values are still represented
+
+    Shares add up to exactly ``sample_size``; the remainder goes to the most
+    common strata. With more strata than rows, the least common strata get
+    no rows.
+    """
+    if strata <= 0 or sample_size <= 0:
+        return [0] * max(strata, 0)
+    share, remainder = divmod(sample_size, strata)
+    return [share + (1 if index < remainder else 0) for index in range(strata)]
+
+
+class Reservoir:
+    """Uniform fixed-size sample over a stream of unknown length (Algorithm R)"""
+
+    def __init__(self, size: int, rng: random.Random):
+        self.size = size
+        self.rng = rng
+        self.rows: List[Dict[str, Any]] = []
+        self.seen = 0
+
+    def add(self, row: Dict[str, Any]) -> None:
+        self.seen += 1
+        if len(self.rows) < self.size:
+            self.rows.append(row)
+            return
+        slot = self.rng.randrange(self.seen)
+        if slot < self.size:
+            self.rows[slot] = row
@@ -0,0 +1,235 @@
+"""
+Index-aware query strategies for search_mysql_table and find_value_in_mysql_schema
+"""
+
+import re
+import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Dict, List, Any, Optional, Tuple
+
+SEARCH_MODES = ("auto", "fulltext", "prefix", "contains")
+
+VALUE_MATCHES = ("exact", "prefix", "contains")
+
+_STRING_TYPES = {"char", "varchar", "tinytext", "text", "mediumtext", "longtext", "enum", "set"}
+_INTEGER_TYPES = {"tinyint", "smallint", "mediumint", "int", "integer", "bigint"}
+_DECIMAL_TYPES = {"decimal", "numeric", "float", "double", "real"}
+_DATE_TYPES = {"date", "datetime", "timestamp"}
+_ENUM_VALUE = re.compile(r"'((?:[^']|'')*)'")
+
+# Words shorter than innodb_ft_min_token_size (3 by default) are not indexed
+FULLTEXT_MIN_TOKEN = 3
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def _quote(identifier: str) -> str:
+    return "`" + identifier.replace("`", "``") + "`"
+
+
+def escape_like(term: str) -> str:
+    """Escape LIKE wildcards so the term matches literally"""
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def group_indexes(indexes: List[Dict[str, Any]]) -> Dict[str, Tuple[str, List[str]]]:
+    """``{index_name: (index_type, columns_in_order)}`` from STATISTICS rows"""
+    grouped: Dict[str, Tuple[str, List[str]]] = {}
+    for row in indexes:
+        name = row["INDEX_NAME"]
+        if name not in grouped:
+            grouped[name] = ((row.get("INDEX_TYPE") or "BTREE").upper(), [])
+        grouped[name][1].append(row["COLUMN_NAME"])
+    return grouped
+
+
+def fulltext_index(
+    indexes: List[Dict[str, Any]], column: str
+) -> Optional[Tuple[str, List[str]]]:
+    """FULLTEXT index covering ``column`` as ``(name, columns)``
+
+    MATCH() must name exactly the columns of one FULLTEXT index, so an index
+    on the column alone is preferred over a multi-column one.
+    """
+    candidates = [
+        (name, columns)
+        for name, (index_type, columns) in group_indexes(indexes).items()
+        if index_type == "FULLTEXT" and column.lower() in (c.lower() for c in columns)
+    ]
+    if not candidates:
+        return None
+    return min(candidates, key=lambda candidate: len(candidate[1]))
+
+
+def leading_btree_index(indexes: List[Dict[str, Any]], column: str) -> Optional[str]:
+    """Name of a B-tree index whose first column is ``column``"""
+    for name, (index_type, columns) in group_indexes(indexes).items():
+        if index_type != "FULLTEXT" and columns[0].lower() == column.lower():
+            return name
+    return None
+
+
+def fulltext_searchable(term: str) -> bool:
+    return any(len(word) >= FULLTEXT_MIN_TOKEN for word in _WORD.findall(term))
+
+
+def fulltext_query(
+    table_sql: str, match_columns: List[str], limit: int
+) -> str:
+    """Relevance-ordered MATCH ... AGAINST query; takes the term twice"""
+    match = f"MATCH({', '.join(_quote(c) for c in match_columns)}) AGAINST (%s IN NATURAL LANGUAGE MODE)"
+    return (
+        f"SELECT *, {match} AS `_relevance` FROM {table_sql} "
+        f"WHERE {match} ORDER BY `_relevance` DESC LIMIT {limit}"
+    )
+
+
+def prefix_query(table_sql: str, column: str, limit: int) -> str:
+    """Index range scan for values starting with the term
+
+    Ordering by the column follows the index, so an exact match comes first
+    and no filesort is needed.
+    """
+    column_sql = _quote(column)
+    return f"SELECT * FROM {table_sql} WHERE {column_sql} LIKE %s ORDER BY {column_sql} LIMIT {limit}"
+
+
+def scan_query(table_sql: str, column: str, limit: int, row_cap: int) -> str:
+    """Substring scan over at most ``row_cap`` rows, best matches first
+
+    Takes the parameters ``(contains_pattern, term, prefix_pattern, term)``.
+    """
+    column_sql = _quote(column)
+    return (
+        f"SELECT * FROM (SELECT * FROM {table_sql} LIMIT {int(row_cap)}) AS _scan "
+        f"WHERE {column_sql} LIKE %s "
+        f"ORDER BY {column_sql} = %s DESC, {column_sql} LIKE %s DESC, "
+        f"LOCATE(%s, {column_sql}), CHAR_LENGTH({column_sql}) LIMIT {limit}"
+    )
+
+
+def value_kinds(value: str) -> Dict[str, Any]:
+    """Typed forms of a search value: ``string`` always, plus ``integer``,
+    ``decimal`` and ``date`` when the text parses as one"""
+    kinds: Dict[str, Any] = {"string": value}
+    text = value.strip()
+    try:
+        number = Decimal(text)
+        if number.is_finite():
+            kinds["decimal"] = number
+            if number == number.to_integral_value() and re.fullmatch(r"[+-]?\d+", text):
+                kinds["integer"] = int(text)
+    except InvalidOperation:
+        pass
+    if len(text) >= 10:
+        try:
+            datetime.datetime.fromisoformat(text)
+            kinds["date"] = text
+        except ValueError:
+            pass
+    return kinds
+
+
+def _column_kind(column: Dict[str, Any], kinds: Dict[str, Any], match: str) -> Optional[str]:
+    """Which typed form of the value ``column`` can be compared with, if any"""
+    data_type = (column.get("DATA_TYPE") or "").lower()
+    if data_type in _STRING_TYPES:
+        value = kinds["string"]
+        max_length = column.get("CHARACTER_MAXIMUM_LENGTH")
+        if max_length and match != "contains" and len(value) > int(max_length):
+            return None
+        if data_type == "enum" and match == "exact":
+            allowed = [v.replace("''", "'") for v in _ENUM_VALUE.findall(column.get("COLUMN_TYPE") or "")]
+            if allowed and value.lower() not in (v.lower() for v in allowed):
+                return None
+        return "string"
+    if match != "exact":
+        return None
+    if data_type in _INTEGER_TYPES:
+        if "integer" not in kinds:
+            return None
+        if kinds["integer"] < 0 and "unsigned" in (column.get("COLUMN_TYPE") or "").lower():
+            return None
+        return "integer"
+    if data_type in _DECIMAL_TYPES:
+        return "decimal" if "decimal" in kinds else None
+    if data_type in _DATE_TYPES:
+        return "date" if "date" in kinds else None
+    return None
+
+
+def value_candidates(
+    columns_by_table: Dict[str, List[Dict[str, Any]]],
+    leading_indexes: Dict[str, Dict[str, str]],
+    kinds: Dict[str, Any],
+    match: str,
+    include_unindexed: bool,
+) -> List[Dict[str, Any]]:
+    """Columns worth probing for a value, cheapest and most likely first
+
+    A column qualifies when its type can hold the value: strings must fit
+    the column length and be one of an ENUM's members, numbers only go to
+    numeric columns that can represent them, dates to temporal columns.
+    Columns leading a B-tree index come first (primary and unique keys
+    before others), since their probes are index lookups; a ``contains``
+    match cannot use an index, so every candidate is a capped scan.
+    """
+    candidates = []
+    for table_name, columns in columns_by_table.items():
+        table_indexes = leading_indexes.get(table_name) or {}
+        key_columns = [c["COLUMN_NAME"] for c in columns if c.get("COLUMN_KEY") == "PRI"]
+        for column in columns:
+            kind = _column_kind(column, kinds, match)
+            if not kind:
+                continue
+            index = table_indexes.get(column["COLUMN_NAME"].lower())
+            indexed = bool(index) and match != "contains"
+            if not indexed and not include_unindexed:
+                continue
+            candidates.append(
+                {
+                    "table": table_name,
+                    "column": column["COLUMN_NAME"],
+                    "kind": kind,
+                    "index": index if indexed else None,
+                    "key_columns": key_columns,
+                    "rank": (
+                        0 if indexed and index == "PRIMARY" else 1 if indexed else 2,
+                        0 if kind != "string" else 1,
+                        table_name,
+                        column.get("ORDINAL_POSITION") or 0,
+                    ),
+                }
+            )
+    candidates.sort(key=lambda candidate: candidate["rank"])
+    return candidates
+
+
+def value_probe(
+    schema_name: str,
+    candidate: Dict[str, Any],
+    kinds: Dict[str, Any],
+    match: str,
+    row_cap: int,
+) -> Tuple[str, Tuple]:
+    """``LIMIT 1`` query for one candidate column
+
+    Indexed columns get an equality or prefix lookup; anything else scans
+    at most ``row_cap`` rows, so a missing value cannot force a full scan.
+    """
+    column_sql = _quote(candidate["column"])
+    select = [column_sql] + [
+        _quote(name) for name in candidate["key_columns"] if name != candidate["column"]
+    ]
+    table_sql = f"{_quote(schema_name)}.{_quote(candidate['table'])}"
+    if match == "exact":
+        condition, param = f"{column_sql} = %s", kinds[candidate["kind"]]
+    elif match == "prefix":
+        condition, param = f"{column_sql} LIKE %s", escape_like(kinds["string"]) + "%"
+    else:
+        condition, param = f"{column_sql} LIKE %s", "%" + escape_like(kinds["string"]) + "%"
+    if candidate["index"]:
+        source = table_sql
+    else:
+        source = f"(SELECT {', '.join(select)} FROM {table_sql} LIMIT {int(row_cap)}) AS _scan"
+    return f"SELECT {', '.join(select)} FROM {source} WHERE {condition} LIMIT 1", (param,)
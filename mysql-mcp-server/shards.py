@@ -0,0 +1,349 @@
+"""
+Shard map and result merging for queries fanned out to several MySQL shards
+"""
+
+import re
+import heapq
+import threading
+from typing import Dict, List, Any, Optional, Tuple
+from pool import ConnectionPool
+
+# Shard selector meaning every configured shard
+ALL_SHARDS = "*"
+
+_QUOTED = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\"|`[^`]*`")
+_ORDER_BY = re.compile(r"\bORDER\s+BY\b", re.IGNORECASE)
+_LIMIT = re.compile(
+    r"\bLIMIT\s+(\d+)(?:\s*,\s*(\d+)|\s+OFFSET\s+(\d+))?\s*;?\s*$", re.IGNORECASE
+)
+_DIRECTION = re.compile(r"\s+(ASC|DESC)\s*$", re.IGNORECASE)
+_SELECT_LIST = re.compile(
+    r"^\s*SELECT\s+(?:(?:ALL|DISTINCT|DISTINCTROW|HIGH_PRIORITY|STRAIGHT_JOIN|SQL_\w+)\s+)*",
+    re.IGNORECASE,
+)
+_FROM = re.compile(r"\bFROM\b", re.IGNORECASE)
+_AGGREGATE_CALL = re.compile(
+    r"\b(COUNT|SUM|AVG|MIN|MAX|GROUP_CONCAT|STDDEV\w*|VAR\w*|BIT_\w+|JSON_\w*AGG)\s*\(",
+    re.IGNORECASE,
+)
+# Matched against a masked item, so the call's arguments are blank
+_MERGEABLE_ITEM = re.compile(
+    r"^(COUNT|SUM|MIN|MAX)\s*\(\s*\)(?:\s+(?:AS\s+)?(`[^`]+`|\w+))?$", re.IGNORECASE
+)
+_DISTINCT_ARGUMENT = re.compile(r"^\w+\s*\(\s*DISTINCT\b", re.IGNORECASE)
+_GROUP_OR_HAVING = re.compile(r"\b(GROUP\s+BY|HAVING)\b", re.IGNORECASE)
+_HAVING = re.compile(r"\bHAVING\b", re.IGNORECASE)
+_DISTINCT = re.compile(r"\bDISTINCT(ROW)?\b", re.IGNORECASE)
+_SET_OPERATION = re.compile(r"\b(UNION|INTERSECT|EXCEPT)\b", re.IGNORECASE)
+
+
+def parse_shard_map(
+    value: Optional[str], default_port: int, default_database: Optional[str]
+) -> List[Tuple[str, str, int, Optional[str]]]:
+    """Parse ``name=host[:port][/database]`` entries separated by commas"""
+    shards = []
+    for entry in (value or "").split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, separator, address = entry.partition("=")
+        if not separator or not name.strip() or not address.strip():
+            raise ValueError(f"Invalid MYSQL_SHARDS entry '{entry}', expected name=host[:port][/database]")
+        address, _, database = address.partition("/")
+        host, _, port = address.partition(":")
+        shards.append(
+            (
+                name.strip(),
+                host.strip(),
+                int(port) if port else default_port,
+                database.strip() or default_database,
+            )
+        )
+    names = [shard[0] for shard in shards]
+    if len(set(names)) != len(names):
+        raise ValueError("MYSQL_SHARDS contains duplicate shard names")
+    return shards
+
+
+class Shard:
+    """One shard: its own pool plus query and error counters"""
+
+    def __init__(self, name: str, pool: ConnectionPool):
+        self.name = name
+        self.pool = pool
+        self.host = f"{pool.config.get('host')}:{pool.config.get('port')}"
+        self.queries = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def record(self, error: Optional[Exception] = None) -> None:
+        with self._lock:
+            self.queries += 1
+            if error is not None:
+                self.errors += 1
+                self.last_error = str(error)
+
+
+def select_shards(configured: List[str], requested: Optional[List[str]]) -> List[str]:
+    """Shard names to fan out to; ``["*"]`` means all of them"""
+    if not configured:
+        raise ValueError("No shards configured; set MYSQL_SHARDS to name=host[:port][/database],...")
+    if not requested or ALL_SHARDS in requested:
+        return list(configured)
+    by_lower = {name.lower(): name for name in configured}
+    unknown = [name for name in requested if name.lower() not in by_lower]
+    if unknown:
+        raise ValueError(f"Unknown shards {unknown}, configured: {configured}")
+    selected = []
+    for name in requested:
+        if by_lower[name.lower()] not in selected:
+            selected.append(by_lower[name.lower()])
+    return selected
+
+
+def _mask(query: str) -> str:
+    """The query with quoted text and everything inside parentheses blanked out
+
+    Keeps positions intact (and the outermost parentheses), so keywords
+    and commas found in the mask are top-level ones and can be sliced out
+    of the original query.
+    """
+    masked = _QUOTED.sub(lambda m: " " * len(m.group(0)), query)
+    chars = list(masked)
+    depth = 0
+    for index, char in enumerate(chars):
+        if char == "(":
+            depth += 1
+            if depth > 1:
+                chars[index] = " "
+        elif char == ")":
+            depth = max(0, depth - 1)
+            if depth:
+                chars[index] = " "
+        elif depth:
+            chars[index] = " "
+    return "".join(chars)
+
+
+def _split_top_level(text: str, masked: str) -> List[str]:
+    items, start = [], 0
+    for index, char in enumerate(masked):
+        if char == ",":
+            items.append(text[start:index].strip())
+            start = index + 1
+    items.append(text[start:].strip())
+    return [item for item in items if item]
+
+
+def _unquote(identifier: str) -> str:
+    identifier = identifier.strip()
+    if identifier.startswith("`") and identifier.endswith("`"):
+        return identifier[1:-1].replace("``", "`")
+    return identifier
+
+
+class FanOutPlan:
+    """How a SELECT is rewritten for each shard and how the results are merged
+
+    Plain SELECTs run on every shard with their ORDER BY and a LIMIT of
+    ``offset + count`` rows, and the sorted shard results are k-way merged
+    before the global OFFSET/LIMIT is applied. Aggregate SELECTs whose
+    select list is only grouping expressions and COUNT/SUM/MIN/MAX (and
+    SELECT DISTINCT) run without ORDER BY and LIMIT, their groups are
+    combined, and then sorted and limited. Other aggregates (AVG,
+    COUNT(DISTINCT), HAVING) cannot be combined from per-shard results and
+    are returned per shard.
+    """
+
+    def __init__(self, query: str):
+        self.original = query.strip().rstrip(";").strip()
+        masked = _mask(self.original)
+        body_end = len(self.original)
+
+        self.offset, self.count = 0, None
+        limit = _LIMIT.search(masked)
+        if limit:
+            if limit.group(2) is not None:
+                self.offset, self.count = int(limit.group(1)), int(limit.group(2))
+            else:
+                self.offset, self.count = int(limit.group(3) or 0), int(limit.group(1))
+            body_end = limit.start()
+
+        self.order: List[Tuple[str, bool]] = []
+        orders = list(_ORDER_BY.finditer(masked[:body_end]))
+        if orders:
+            clause = self.original[orders[-1].end():body_end]
+            for item in _split_top_level(clause, masked[orders[-1].end():body_end]):
+                direction = _DIRECTION.search(item)
+                descending = bool(direction) and direction.group(1).upper() == "DESC"
+                expression = item[: direction.start()] if direction else item
+                self.order.append((expression.strip(), descending))
+            body_end = orders[-1].start()
+
+        self.body = self.original[:body_end].rstrip()
+        body_masked = masked[:body_end]
+        self.select_items = self._select_items(self.body, body_masked)
+        lead = _SELECT_LIST.match(self.body)
+        self.aggregate = bool(
+            (lead and _DISTINCT.search(lead.group(0)))
+            or _GROUP_OR_HAVING.search(body_masked)
+            or any(_AGGREGATE_CALL.search(_mask(item)) for item in self.select_items)
+        )
+        self.functions: Optional[List[Optional[str]]] = None
+        self.unmergeable_reason: Optional[str] = None
+        if self.aggregate:
+            self.functions, self.unmergeable_reason = self._classify(body_masked)
+
+    @staticmethod
+    def _select_items(body: str, masked: str) -> List[str]:
+        lead = _SELECT_LIST.match(body)
+        if not lead:
+            return []
+        source = _FROM.search(masked, lead.end())
+        end = source.start() if source else len(body)
+        return _split_top_level(body[lead.end():end], masked[lead.end():end])
+
+    def _classify(self, masked: str) -> Tuple[Optional[List[Optional[str]]], Optional[str]]:
+        """Merge function per select item (None for a grouping item), or why not"""
+        if _SET_OPERATION.search(masked):
+            return None, "UNION queries are not merged across shards"
+        if _HAVING.search(masked):
+            return None, "HAVING filters per-shard groups, so they cannot be combined"
+        functions: List[Optional[str]] = []
+        for item in self.select_items:
+            mergeable = _MERGEABLE_ITEM.match(_mask(item))
+            if mergeable and not _DISTINCT_ARGUMENT.match(item):
+                functions.append(mergeable.group(1).lower())
+            elif _AGGREGATE_CALL.search(_mask(item)) or item.strip() == "*":
+                return None, f"'{item}' cannot be combined from per-shard results"
+            else:
+                functions.append(None)
+        return functions, None
+
+    @property
+    def merged_aggregate(self) -> bool:
+        return self.functions is not None
+
+    def shard_query(self) -> str:
+        """The query each shard runs"""
+        if self.merged_aggregate:
+            return self.body
+        if self.aggregate:
+            return self.original
+        query = self.body
+        if self.order:
+            query += " ORDER BY " + ", ".join(
+                f"{expression}{' DESC' if descending else ''}" for expression, descending in self.order
+            )
+        if self.count is not None:
+            query += f" LIMIT {self.offset + self.count}"
+        return query
+
+    def order_columns(self, columns: List[str]) -> Optional[List[Tuple[str, bool]]]:
+        """ORDER BY as result columns, or None if an item is not a selected column
+
+        An item matches a column by name or alias (ignoring backticks and a
+        table qualifier), by the select item's text, or by position.
+        """
+        resolved = []
+        for expression, descending in self.order:
+            column = None
+            if expression.isdigit() and 0 < int(expression) <= len(columns):
+                column = columns[int(expression) - 1]
+            if column is None:
+                for index, item in enumerate(self.select_items[: len(columns)]):
+                    if item.lower() == expression.lower():
+                        column = columns[index]
+            if column is None:
+                name = _unquote(expression.split(".")[-1]).lower()
+                column = next((c for c in columns if c.lower() == name), None)
+            if column is None:
+                return None
+            resolved.append((column, descending))
+        return resolved
+
+
+class _Descending:
+    __slots__ = ("key",)
+
+    def __init__(self, key: Tuple):
+        self.key = key
+
+    def __lt__(self, other: "_Descending") -> bool:
+        return other.key < self.key
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, _Descending) and self.key == other.key
+
+
+def _value_key(value: Any) -> Tuple:
+    # MySQL puts NULLs first ascending; default collations ignore case
+    if value is None:
+        return (0,)
+    if isinstance(value, str):
+        return (1, value.casefold())
+    return (1, value)
+
+
+def sort_key(order: List[Tuple[str, bool]]):
+    def key(row: Dict[str, Any]) -> Tuple:
+        return tuple(
+            _Descending(_value_key(row[column])) if descending else _value_key(row[column])
+            for column, descending in order
+        )
+
+    return key
+
+
+def k_way_merge(
+    results: List[List[Dict[str, Any]]],
+    order: List[Tuple[str, bool]],
+    offset: int,
+    count: Optional[int],
+) -> List[Dict[str, Any]]:
+    """Merge per-shard results already sorted by ``order`` and apply OFFSET/LIMIT
+
+    Each shard returned at most ``offset + count`` rows, which is enough
+    for the global top rows, so only those rows are ever compared.
+    """
+    merged = heapq.merge(*results, key=sort_key(order)) if order else (
+        row for rows in results for row in rows
+    )
+    stop = None if count is None else offset + count
+    rows = []
+    for index, row in enumerate(merged):
+        if stop is not None and index >= stop:
+            break
+        if index >= offset:
+            rows.append(row)
+    return rows
+
+
+def merge_aggregates(
+    results: List[List[Dict[str, Any]]], columns: List[str], functions: List[Optional[str]]
+) -> List[Dict[str, Any]]:
+    """Combine per-shard groups: counts and sums add up, min and max take the extreme"""
+    group_columns = [column for column, fn in zip(columns, functions) if fn is None]
+    merged: Dict[Tuple, Dict[str, Any]] = {}
+    for rows in results:
+        for row in rows:
+            key = tuple(_value_key(row[column]) for column in group_columns)
+            target = merged.get(key)
+            if target is None:
+                merged[key] = dict(row)
+                continue
+            for column, fn in zip(columns, functions):
+                value = row[column]
+                if fn is None or value is None:
+                    continue
+                current = target[column]
+                if current is None:
+                    target[column] = value
+                elif fn in ("count", "sum"):
+                    target[column] = current + value
+                elif fn == "min":
+                    target[column] = min(current, value)
+                else:
+                    target[column] = max(current, value)
+    return list(merged.values())
@@ -0,0 +1,63 @@
+#!/bin/bash
+
+# Local shard harness: starts several MySQL containers loaded with the
+# sample data and prints the MYSQL_SHARDS value to point the server at them.
+#
+#   ./start_shards.sh [count] [first_port]    # default: 3 shards on 3307..3309
+#   ./start_shards.sh stop [count]
+#
+# Every shard holds the same sample data, so a fanned-out COUNT(*) should be
+# exactly count times the single-shard count and an ORDER BY ... LIMIT
+# should return each top row once per shard.
+
+set -e
+
+IMAGE=${MYSQL_SHARD_IMAGE:-mysql:8.0}
+ROOT_PASSWORD=${MYSQL_ROOT_PASSWORD:-rootpassword}
+DATABASE=${MYSQL_DATABASE:-testdb}
+USER=${MYSQL_USER:-testuser}
+PASSWORD=${MYSQL_PASSWORD:-testpassword}
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+
+if [ "$1" = "stop" ]; then
+    COUNT=${2:-3}
+    for i in $(seq 1 "$COUNT"); do
+        docker rm -f "mysql-shard-$i" >/dev/null 2>&1 && echo "🛑 Removed mysql-shard-$i"
+    done
+    exit 0
+fi
+
+COUNT=${1:-3}
+FIRST_PORT=${2:-3307}
+SHARDS=""
+
+for i in $(seq 1 "$COUNT"); do
+    PORT=$((FIRST_PORT + i - 1))
+    echo "🚀 Starting mysql-shard-$i on port $PORT..."
+    docker rm -f "mysql-shard-$i" >/dev/null 2>&1 || true
+    docker run -d --name "mysql-shard-$i" -p "$PORT:3306" \
+        -e MYSQL_ROOT_PASSWORD="$ROOT_PASSWORD" \
+        -e MYSQL_DATABASE="$DATABASE" \
+        -e MYSQL_USER="$USER" \
+        -e MYSQL_PASSWORD="$PASSWORD" \
+        -v "$SCRIPT_DIR/sample_data.sql:/docker-entrypoint-initdb.d/sample_data.sql:ro" \
+        "$IMAGE" >/dev/null
+    SHARDS="${SHARDS:+$SHARDS,}shard$i=127.0.0.1:$PORT"
+done
+
+for i in $(seq 1 "$COUNT"); do
+    # The entrypoint restarts mysqld after loading init scripts; wait for the final server
+    until docker logs "mysql-shard-$i" 2>&1 | grep -q "ready for connections.*port: 3306"; do
+        echo "Waiting for mysql-shard-$i to be ready..."
+        sleep 2
+    done
+    docker exec "mysql-shard-$i" mysql -uroot -p"$ROOT_PASSWORD" -e "
+        GRANT SELECT ON *.* TO '$USER'@'%';
+        GRANT SHOW DATABASES, PROCESS ON *.* TO '$USER'@'%';
+        FLUSH PRIVILEGES;" 2>/dev/null
+    echo "✅ mysql-shard-$i is ready"
+done
+
+echo ""
+echo "Add to .env (MYSQL_HOST can point at any shard for schema metadata):"
+echo "MYSQL_SHARDS=$SHARDS"
@@ -0,0 +1,35 @@
+"""
+Tests for block-sample estimation (no database needed)
+"""
+
+import math
+
+from approximate import BlockEstimator
+
+
+def _estimator(metric_items, rows):
+    estimator = BlockEstimator([], metric_items, block_count=100)
+    estimator.add([block for block, _ in rows], [dict(row, _block=block, _rows=1) for block, row in rows])
+    return estimator
+
+
+def test_relative_error_is_the_worst_estimable_metric():
+    # Counts are identical per block (no error); sums vary
+    rows = [(block, {"_p0": 10, "_p1": value}) for block, value in enumerate([1, 50, 3, 80, 5])]
+    estimator = _estimator([("count", None, "count"), ("sum", "x", "sum_x")], rows)
+    count_only = _estimator([("count", None, "count")], rows)
+    assert count_only.relative_error() == 0.0
+    assert estimator.relative_error() > 0.5
+
+
+def test_relative_error_skips_min_and_max():
+    rows = [(block, {"_p0": value, "_p1": 10}) for block, value in enumerate([1, 50, 3])]
+    estimator = _estimator([("min", "x", "min_x"), ("count", None, "count")], rows)
+    assert estimator.relative_error() == 0.0
+    only_extremes = _estimator([("min", "x", "min_x"), ("max", "x", "max_x")], [(0, {"_p0": 1, "_p1": 9})])
+    assert only_extremes.relative_error() == 0.0
+
+
+def test_relative_error_is_unbounded_with_one_block():
+    estimator = _estimator([("count", None, "count")], [(0, {"_p0": 10})])
+    assert estimator.relative_error() == math.inf
@@ -0,0 +1,26 @@
+"""
+Tests for the SELECT result cache (no database needed)
+"""
+
+from cache import ResultCache
+
+
+def test_streamed_result_is_stored_and_served():
+    cache = ResultCache(max_rows=2)
+    rows, info, generation = cache.lookup("SELECT 1", None)
+    assert rows is None and not info["hit"]
+    cache.store("SELECT  1", None, "db", [{"1": 1}], generation)
+    rows, info, _ = cache.lookup("SELECT 1", None)
+    assert rows == [{"1": 1}] and info["hit"]
+
+
+def test_oversized_or_invalidated_results_are_not_stored():
+    cache = ResultCache(max_rows=2)
+    _, _, generation = cache.lookup("SELECT * FROM t", None)
+    cache.store("SELECT * FROM t", None, "db", None, generation)
+    cache.store("SELECT * FROM t", None, "db", [{}, {}, {}], generation)
+    assert cache.stats()["uncacheable"] == 2
+
+    cache.invalidate_table("db", "t")
+    cache.store("SELECT * FROM t", None, "db", [{}], generation)
+    assert cache.lookup("SELECT * FROM t", None)[0] is None
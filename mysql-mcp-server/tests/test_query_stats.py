@@ -0,0 +1,20 @@
+"""
+Tests for query statistics helpers (no database needed)
+"""
+
+from query_stats import percentile
+
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 11))
+    assert percentile(values, 0.5) == 5
+    assert percentile(values, 0.9) == 9
+    assert percentile(values, 0.95) == 10
+    assert percentile(values, 0.99) == 10
+
+
+def test_percentile_clamps_to_the_list():
+    assert percentile([], 0.5) == 0.0
+    assert percentile([7], 0.99) == 7
+    assert percentile([1, 2, 3], 0.0) == 1
+    assert percentile([1, 2, 3], 1.0) == 3
@@ -0,0 +1,16 @@
+"""
+Tests for sampling helpers (no database needed)
+"""
+
+from sampling import allocate_strata
+
+
+def test_strata_shares_add_up_to_the_sample_size():
+    assert allocate_strata(5, 3) == [2, 2, 1]
+    assert allocate_strata(6, 3) == [2, 2, 2]
+
+
+def test_least_common_strata_are_dropped_when_rows_run_out():
+    assert allocate_strata(5, 20) == [1] * 5 + [0] * 15
+    assert allocate_strata(0, 2) == [0, 0]
+    assert allocate_strata(5, 0) == []
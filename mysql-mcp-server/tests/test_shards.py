@@ -0,0 +1,128 @@
+"""
+Tests for the shard fan-out rewriting and result merging (no database needed)
+"""
+
+from shards import FanOutPlan, k_way_merge, merge_aggregates
+
+
+class TestFanOutPlan:
+    def test_plain_select_pushes_order_and_limit_to_shards(self):
+        plan = FanOutPlan("SELECT id, name FROM users ORDER BY name DESC, id LIMIT 5 OFFSET 10;")
+        assert not plan.aggregate
+        assert plan.order == [("name", True), ("id", False)]
+        assert (plan.offset, plan.count) == (10, 5)
+        assert plan.shard_query() == "SELECT id, name FROM users ORDER BY name DESC, id LIMIT 15"
+
+    def test_mysql_offset_comma_limit(self):
+        plan = FanOutPlan("SELECT id FROM users ORDER BY id LIMIT 20, 10")
+        assert (plan.offset, plan.count) == (20, 10)
+        assert plan.shard_query().endswith("LIMIT 30")
+
+    def test_quoted_and_nested_text_is_not_parsed(self):
+        plan = FanOutPlan(
+            "SELECT id, 'a, b ORDER BY x' AS note FROM t "
+            "WHERE id IN (SELECT id FROM u ORDER BY id LIMIT 3) ORDER BY id"
+        )
+        assert plan.select_items == ["id", "'a, b ORDER BY x' AS note"]
+        assert plan.order == [("id", False)]
+        assert plan.count is None
+
+    def test_mergeable_aggregate_runs_without_order_and_limit(self):
+        plan = FanOutPlan(
+            "SELECT region, COUNT(*) AS n, SUM(amount), MIN(qty), MAX(amount) "
+            "FROM sales GROUP BY region ORDER BY n DESC LIMIT 3"
+        )
+        assert plan.merged_aggregate
+        assert plan.functions == [None, "count", "sum", "min", "max"]
+        assert plan.shard_query() == (
+            "SELECT region, COUNT(*) AS n, SUM(amount), MIN(qty), MAX(amount) "
+            "FROM sales GROUP BY region"
+        )
+
+    def test_select_distinct_merges_as_groups(self):
+        plan = FanOutPlan("SELECT DISTINCT region FROM sales")
+        assert plan.merged_aggregate
+        assert plan.functions == [None]
+
+    def test_unmergeable_aggregates_run_unchanged_per_shard(self):
+        for query, reason in [
+            ("SELECT region, AVG(amount) FROM sales GROUP BY region", "AVG(amount)"),
+            ("SELECT COUNT(DISTINCT region) FROM sales", "COUNT(DISTINCT region)"),
+            ("SELECT region, COUNT(*) FROM sales GROUP BY region HAVING COUNT(*) > 1", "HAVING"),
+        ]:
+            plan = FanOutPlan(query + " LIMIT 10")
+            assert plan.aggregate and not plan.merged_aggregate
+            assert reason in plan.unmergeable_reason
+            assert plan.shard_query() == query + " LIMIT 10"
+
+    def test_order_columns_resolves_alias_position_and_qualified_names(self):
+        plan = FanOutPlan("SELECT u.id, `name` AS who, COUNT(*) FROM users u GROUP BY u.id, `name` ORDER BY 3, who, u.id")
+        columns = ["id", "who", "COUNT(*)"]
+        assert plan.order_columns(columns) == [("COUNT(*)", False), ("who", False), ("id", False)]
+
+    def test_order_columns_is_none_for_unselected_expression(self):
+        plan = FanOutPlan("SELECT id FROM users ORDER BY created_at DESC LIMIT 2")
+        assert plan.order_columns(["id"]) is None
+
+
+class TestKWayMerge:
+    def test_applies_global_offset_and_count(self):
+        shard_a = [{"id": 1}, {"id": 4}, {"id": 6}]
+        shard_b = [{"id": 2}, {"id": 3}, {"id": 5}]
+        rows = k_way_merge([shard_a, shard_b], [("id", False)], 2, 3)
+        assert [row["id"] for row in rows] == [3, 4, 5]
+
+    def test_nulls_sort_first_ascending_and_last_descending(self):
+        ascending = k_way_merge(
+            [[{"v": None}, {"v": 2}], [{"v": 1}, {"v": 3}]], [("v", False)], 0, None
+        )
+        assert [row["v"] for row in ascending] == [None, 1, 2, 3]
+        descending = k_way_merge(
+            [[{"v": 3}, {"v": None}], [{"v": 2}, {"v": 1}]], [("v", True)], 0, None
+        )
+        assert [row["v"] for row in descending] == [3, 2, 1, None]
+
+    def test_mixed_directions_and_case_insensitive_strings(self):
+        shard_a = [{"g": "a", "n": 5}, {"g": "B", "n": 9}]
+        shard_b = [{"g": "A", "n": 7}, {"g": "b", "n": 1}]
+        rows = k_way_merge([shard_a, shard_b], [("g", False), ("n", True)], 0, None)
+        assert [(row["g"], row["n"]) for row in rows] == [("A", 7), ("a", 5), ("B", 9), ("b", 1)]
+
+    def test_without_order_concatenates(self):
+        rows = k_way_merge([[{"id": 2}], [{"id": 1}]], [], 0, 1)
+        assert rows == [{"id": 2}]
+
+
+class TestMergeAggregates:
+    def test_counts_and_sums_add_and_extremes_combine(self):
+        columns = ["region", "n", "total", "low", "high"]
+        functions = [None, "count", "sum", "min", "max"]
+        shard_a = [
+            {"region": "eu", "n": 2, "total": 10, "low": 1, "high": 8},
+            {"region": None, "n": 1, "total": None, "low": None, "high": None},
+        ]
+        shard_b = [
+            {"region": "EU", "n": 3, "total": 5, "low": 0, "high": 4},
+            {"region": "us", "n": 1, "total": 7, "low": 7, "high": 7},
+            {"region": None, "n": 4, "total": 2, "low": 2, "high": 2},
+        ]
+        merged = {
+            row["region"] and row["region"].lower(): row
+            for row in merge_aggregates([shard_a, shard_b], columns, functions)
+        }
+        assert merged["eu"] == {"region": "eu", "n": 5, "total": 15, "low": 0, "high": 8}
+        assert merged["us"]["n"] == 1
+        assert merged[None] == {"region": None, "n": 5, "total": 2, "low": 2, "high": 2}
+
+    def test_global_count_merges_into_one_row(self):
+        plan = FanOutPlan("SELECT COUNT(*) FROM sales")
+        rows = merge_aggregates(
+            [[{"COUNT(*)": 4}], [{"COUNT(*)": 6}], [{"COUNT(*)": 0}]], ["COUNT(*)"], plan.functions
+        )
+        assert rows == [{"COUNT(*)": 10}]
+
+    def test_avg_is_not_merged(self):
+        # Averaging per-shard averages would weight shards instead of rows
+        plan = FanOutPlan("SELECT region, AVG(amount) AS mean FROM sales GROUP BY region")
+        assert plan.functions is None
+        assert "AVG(amount)" in plan.unmergeable_reason
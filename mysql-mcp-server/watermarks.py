@@ -0,0 +1,174 @@
+"""
+Change-column detection and watermark queries for incremental table reads
+"""
+
+from typing import Dict, List, Any, Optional, Tuple
+
+from aggregation import TEMPORAL_TYPES
+from pagination import InvalidCursorError, decode_cursor, encode_cursor, query_fingerprint
+
+CHANGE_STRATEGIES = ("updated", "created", "auto_increment")
+
+_UPDATED_NAMES = (
+    "updated_at", "modified_at", "last_modified", "last_updated", "updated_on",
+    "modified_on", "changed_at", "update_time", "updated", "modified",
+)
+_CREATED_NAMES = (
+    "created_at", "inserted_at", "created_on", "create_time", "created",
+    "timestamp", "ts", "recorded_at", "event_time",
+)
+_INTEGER_TYPES = {"tinyint", "smallint", "mediumint", "int", "integer", "bigint"}
+
+
+def _quote(identifier: str) -> str:
+    return "`" + identifier.replace("`", "``") + "`"
+
+
+def _name_rank(name: str, candidates: Tuple[str, ...]) -> Optional[int]:
+    name = name.lower()
+    return candidates.index(name) if name in candidates else None
+
+
+def detect_change_column(
+    columns: List[Dict[str, Any]], key_columns: Optional[List[str]]
+) -> Optional[Tuple[str, str]]:
+    """Best column to detect new or changed rows, as ``(strategy, column)``
+
+    Prefers a timestamp maintained with ``ON UPDATE CURRENT_TIMESTAMP`` or
+    named like ``updated_at``, then an insert timestamp such as
+    ``created_at`` (new rows only), then an auto-increment primary key.
+    """
+    updated: List[Tuple[int, str]] = []
+    created: List[Tuple[int, str]] = []
+    for column in columns:
+        name = column["COLUMN_NAME"]
+        data_type = (column.get("DATA_TYPE") or "").lower()
+        if data_type not in TEMPORAL_TYPES:
+            continue
+        extra = (column.get("EXTRA") or "").lower()
+        default = str(column.get("COLUMN_DEFAULT") or "").lower()
+        if "on update current_timestamp" in extra:
+            updated.append((-1, name))
+        elif _name_rank(name, _UPDATED_NAMES) is not None:
+            updated.append((_name_rank(name, _UPDATED_NAMES), name))
+        elif _name_rank(name, _CREATED_NAMES) is not None:
+            created.append((_name_rank(name, _CREATED_NAMES), name))
+        elif default.startswith("current_timestamp"):
+            created.append((len(_CREATED_NAMES), name))
+    if updated:
+        return "updated", min(updated)[1]
+    if created:
+        return "created", min(created)[1]
+
+    if key_columns and len(key_columns) == 1:
+        for column in columns:
+            if (
+                column["COLUMN_NAME"].lower() == key_columns[0].lower()
+                and "auto_increment" in (column.get("EXTRA") or "").lower()
+                and (column.get("DATA_TYPE") or "").lower() in _INTEGER_TYPES
+            ):
+                return "auto_increment", column["COLUMN_NAME"]
+    return None
+
+
+def classify_change_column(column: Dict[str, Any]) -> Optional[str]:
+    """Strategy for a caller-chosen change column, or None if it cannot order changes"""
+    data_type = (column.get("DATA_TYPE") or "").lower()
+    if data_type in _INTEGER_TYPES:
+        return "auto_increment"
+    if data_type not in TEMPORAL_TYPES:
+        return None
+    extra = (column.get("EXTRA") or "").lower()
+    if "on update current_timestamp" in extra or _name_rank(column["COLUMN_NAME"], _UPDATED_NAMES) is not None:
+        return "updated"
+    return "created"
+
+
+def _scope(schema_name: str, table_name: str) -> str:
+    return f"{schema_name}.{table_name}".lower()
+
+
+def encode_watermark(
+    schema_name: str,
+    table_name: str,
+    strategy: str,
+    column: str,
+    key_columns: List[str],
+    row: Dict[str, Any],
+) -> str:
+    """Opaque token for the position just after ``row``"""
+    values = {name.lower(): value for name, value in row.items()}
+    return encode_cursor(
+        {
+            "v": 1,
+            "q": query_fingerprint(_scope(schema_name, table_name)),
+            "s": strategy,
+            "c": column,
+            "w": values[column.lower()],
+            "k": [values[name.lower()] for name in key_columns],
+        }
+    )
+
+
+def decode_watermark(token: str, schema_name: str, table_name: str) -> Dict[str, Any]:
+    """State of a watermark token, checked against the table it was issued for"""
+    try:
+        state = decode_cursor(token, _scope(schema_name, table_name))
+    except InvalidCursorError as e:
+        if "Malformed" in str(e):
+            raise InvalidCursorError("Malformed watermark")
+        raise InvalidCursorError("Watermark belongs to another table")
+    if state.get("s") not in CHANGE_STRATEGIES or not state.get("c"):
+        raise InvalidCursorError("Malformed watermark")
+    return state
+
+
+def build_changes_query(
+    table_sql: str,
+    column: str,
+    key_columns: List[str],
+    state: Optional[Dict[str, Any]],
+    limit: int,
+) -> Tuple[str, Tuple]:
+    """Rows after the watermark in ``(column, key...)`` order, plus one look-ahead row
+
+    The key breaks ties between rows sharing a timestamp, so a page can end
+    in the middle of a second without skipping or repeating rows. The
+    condition is written as ``col > w OR (col = w AND key > k)`` so MySQL
+    can use a range scan on an index over the change column.
+    """
+    order = [column] + [name for name in key_columns if name.lower() != column.lower()]
+    order_sql = ", ".join(_quote(name) for name in order)
+    params: List[Any] = []
+    if state is not None:
+        column_sql = _quote(column)
+        tie_keys = [name for name in key_columns if name.lower() != column.lower()]
+        if tie_keys and state.get("k"):
+            tie_values = [
+                value
+                for name, value in zip(key_columns, state["k"])
+                if name.lower() != column.lower()
+            ]
+            if len(tie_keys) == 1:
+                tie = f"{_quote(tie_keys[0])} > %s"
+            else:
+                quoted = ", ".join(_quote(name) for name in tie_keys)
+                tie = f"({quoted}) > ({', '.join(['%s'] * len(tie_keys))})"
+            where = f" WHERE {column_sql} > %s OR ({column_sql} = %s AND {tie})"
+            params = [state["w"], state["w"]] + tie_values
+        else:
+            where = f" WHERE {column_sql} > %s"
+            params = [state["w"]]
+    else:
+        where = f" WHERE {_quote(column)} IS NOT NULL"
+    return (
+        f"SELECT * FROM {table_sql}{where} ORDER BY {order_sql} LIMIT {int(limit) + 1}",
+        tuple(params),
+    )
+
+
+def build_latest_query(table_sql: str, column: str, key_columns: List[str]) -> str:
+    """The last row in watermark order, to start tracking from now"""
+    order = [column] + [name for name in key_columns if name.lower() != column.lower()]
+    order_sql = ", ".join(f"{_quote(name)} DESC" for name in order)
+    return f"SELECT * FROM {table_sql} WHERE {_quote(column)} IS NOT NULL ORDER BY {order_sql} LIMIT 1"
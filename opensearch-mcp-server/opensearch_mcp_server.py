@@ -3,7 +3,7 @@ OpenSearch Tools for Strands Agents MCP Server
 """
 import json
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from mcp.server.fastmcp import FastMCP
 from database import opensearch_client
 
@@ -82,14 +82,32 @@ async def describe_opensearch_index(index_name: str) -> str:
         print(f"❌ Error describing index '{index_name}': {str(e)}")
         return f"❌ Error describing index '{index_name}': {str(e)}"
 
+def _hits_to_columnar(hits: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Convert search hits to a columns list plus one value array per hit"""
+    columns = ["_id", "_score"]
+    seen = set(columns)
+    for hit in hits:
+        for field in hit.get("_source", {}):
+            if field not in seen:
+                seen.add(field)
+                columns.append(field)
+    rows = []
+    for hit in hits:
+        source = hit.get("_source", {})
+        rows.append(
+            [hit.get("_id"), hit.get("_score")] + [source.get(field) for field in columns[2:]]
+        )
+    return {"columns": columns, "rows": rows}
+
 @mcp.tool()
-async def search_opensearch_index(index_name: str, query) -> str:
+async def search_opensearch_index(index_name: str, query, format: str = "rows") -> str:
     """
     Execute a search query against an OpenSearch index.
     
     Args:
         index_name (str): Name of the index to search
         query: A JSON string of a well formed OpenSearch Query
+        format (str): "rows" for the raw hits, or "columnar" for a columns list plus one array per hit (smaller)
         
     Returns:
         str: JSON formatted search results
@@ -103,9 +121,22 @@ async def search_opensearch_index(index_name: str, query) -> str:
             # Parse the query JSON
             search_body = json.loads(query)
         
+        if format not in ("rows", "columnar"):
+            return f"❌ Unknown format '{format}', expected 'rows' or 'columnar'"
+
         results = opensearch_client.search_index(index_name, query=search_body)
         print(f"✅ Search executed successfully, found {results['total_hits']} total hits, returned {len(results['hits'])} results")
         
+        if format == "columnar":
+            return json.dumps({
+                "index": index_name,
+                "query": search_body,
+                "total_hits": results['total_hits'],
+                "max_score": results['max_score'],
+                "format": "columnar",
+                **_hits_to_columnar(results['hits'])
+            }, separators=(",", ":"), default=str)
+
         return json.dumps({
             "index": index_name,
             "query": search_body,